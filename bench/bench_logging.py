@@ -0,0 +1,104 @@
+# bench/bench_logging.py
+"""
+오류 폭주 중 이벤트 루프 지연 비교: 동기 print vs utils.log(QueueHandler).
+
+    python -m bench.bench_logging --errors 2000 --sink-delay-ms 0.3
+
+stdout이 느린 터미널/파이프일 때를 흉내 내기 위해 쓰기마다 sink-delay만큼 블로킹한다.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import io
+import logging
+import sys
+import time
+import traceback
+
+from utils.log import setup_logging, shutdown_logging, get_logger
+
+
+class SlowStream(io.TextIOBase):
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def write(self, s: str) -> int:
+        time.sleep(self.delay)
+        return len(s)
+
+    def flush(self) -> None:
+        pass
+
+
+async def probe(stop: asyncio.Event, lags: list[float], tick: float = 0.005):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(time.perf_counter() - t0 - tick)
+
+
+async def storm(n: int, emit):
+    for i in range(n):
+        try:
+            raise RuntimeError(f"db hiccup #{i}")
+        except RuntimeError as e:
+            emit(e)
+        if i % 20 == 0:
+            await asyncio.sleep(0)
+
+
+def _pct(vals: list[float], q: float) -> float:
+    vals = sorted(vals)
+    return vals[min(len(vals) - 1, int(q * (len(vals) - 1)))] if vals else 0.0
+
+
+async def run(n: int, emit) -> tuple[float, float, float]:
+    lags: list[float] = []
+    stop = asyncio.Event()
+    task = asyncio.create_task(probe(stop, lags))
+    await asyncio.sleep(0.05)
+    t0 = time.perf_counter()
+    await storm(n, emit)
+    elapsed = time.perf_counter() - t0
+    await asyncio.sleep(0.05)
+    stop.set()
+    await task
+    return elapsed, _pct(lags, 0.50), _pct(lags, 0.99)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--errors", type=int, default=2000)
+    ap.add_argument("--sink-delay-ms", type=float, default=0.3)
+    args = ap.parse_args()
+
+    real_stdout = sys.stdout
+    sys.stdout = SlowStream(args.sink_delay_ms / 1000)
+
+    def emit_print(e: Exception):
+        print(f"❌ 상태 업데이트 오류: {e}")
+        traceback.print_exception(e, file=sys.stdout)
+
+    print_res = asyncio.run(run(args.errors, emit_print))
+
+    setup_logging(level=logging.INFO)
+    log = get_logger("bench")
+
+    def emit_log(e: Exception):
+        log.error("❌ 상태 업데이트 오류", exc_info=e)
+
+    queue_res = asyncio.run(run(args.errors, emit_log))
+    t0 = time.perf_counter()
+    shutdown_logging()  # 큐 드레인(루프 밖)
+    drain = time.perf_counter() - t0
+    sys.stdout = real_stdout
+
+    print(f"errors={args.errors} sink_delay={args.sink_delay_ms}ms")
+    print(f"{'mode':<8}{'storm(s)':>10}{'lag p50(ms)':>14}{'lag p99(ms)':>14}")
+    for name, (el, p50, p99) in (("print", print_res), ("queue", queue_res)):
+        print(f"{name:<8}{el:>10.3f}{p50*1000:>14.2f}{p99*1000:>14.2f}")
+    print(f"queue drain after storm: {drain:.3f}s (listener thread)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench/fakes.py
+"""Discord 연결 없이 코그 명령을 호출하기 위한 최소 스텁"""
+from __future__ import annotations
+import itertools
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import discord
+
+_ids = itertools.count(10**15)
+
+
+class FakeResponse:
+    def __init__(self, inter: "FakeInteraction"):
+        self._inter = inter
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def send_message(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None, **kw):
+        self._done = True
+        self._inter.sent.append(SimpleNamespace(content=content, embed=embed, **kw))
+
+    async def defer(self, **kw):
+        self._done = True
+
+    async def edit_message(self, **kw):
+        self._done = True
+        self._inter.sent.append(SimpleNamespace(**{"content": None, "embed": None, **kw}))
+
+
+class FakeFollowup:
+    def __init__(self, inter: "FakeInteraction"):
+        self._inter = inter
+
+    async def send(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None, **kw):
+        self._inter.sent.append(SimpleNamespace(content=content, embed=embed, **kw))
+
+
+class FakeGuild:
+    def __init__(self, gid: int, name: str):
+        self.id = gid
+        self.name = name
+
+    def get_member(self, uid: int):
+        return None
+
+
+class FakeUser:
+    def __init__(self, uid: int, admin: bool = False):
+        self.id = uid
+        self.mention = f"<@{uid}>"
+        self.guild_permissions = SimpleNamespace(administrator=admin)
+
+    async def send(self, *a, **kw):
+        pass
+
+
+class FakeInteraction:
+    """코그가 사용하는 discord.Interaction 속성만 흉내 낸다"""
+
+    def __init__(self, guild: FakeGuild, user: FakeUser, channel_id: int, client: Any = None):
+        self.id = next(_ids)
+        self.guild = guild
+        self.guild_id = guild.id
+        self.user = user
+        self.channel_id = channel_id
+        self.client = client
+        self.created_at = datetime.now(timezone.utc)
+        self.type = discord.InteractionType.application_command
+        self.sent: list[SimpleNamespace] = []
+        self.response = FakeResponse(self)
+        self.followup = FakeFollowup(self)
+
+    async def original_response(self):
+        return SimpleNamespace(edit=self._edit_original)
+
+    async def _edit_original(self, **kw):
+        pass
+
+    @property
+    def last_embed(self) -> Optional[discord.Embed]:
+        for m in reversed(self.sent):
+            if m.embed is not None:
+                return m.embed
+        return None
+
+    @property
+    def rejected(self) -> bool:
+        """send_err로 응답했는지 (embeds.send_err의 제목 기준)"""
+        e = self.last_embed
+        return bool(e and e.title and e.title.startswith("⚠️"))
+
+
+class FakeBot:
+    def get_user(self, uid: int):
+        return None
+
+    def dispatch(self, *a, **kw):
+        pass
@@ -0,0 +1,278 @@
+# bench/loadgen.py
+"""
+경제 명령 합성 부하 생성기 + 종단간 벤치마크.
+
+    DATABASE_URL=postgres://... python -m bench.loadgen --guilds 4 --users 50 --ops 5000 --rate 500
+    python -m bench.loadgen --backend memory --ops 200000
+
+--backend cogs(기본): Discord 연결 없이 코그 명령 콜백을 FakeInteraction으로 직접 호출한다 (종단간).
+--backend postgres|memory: 코그를 건너뛰고 utils.repository 연산을 같은 작업 비율로 호출한다.
+  memory는 DB 없이 경제 로직만 최대 속도로 돌리는 가짜 백엔드.
+벤치용 국가는 BENCH_BASE 이상의 country_id를 쓰며, 시작 시 이전 실행분을 지운다.
+결과: 명령별 처리량, p50/p99 지연, 호출당 DB 왕복 수.
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import random
+import re
+import time
+from collections import defaultdict
+
+from bench.fakes import FakeBot, FakeGuild, FakeInteraction, FakeUser
+from cogs.economy import Economy, roll_harvest
+from cogs.government import Government
+from cogs.market import Market
+from cogs.rankings import Rankings
+from utils import catalog, claims, db, gameconfig, metrics, repository
+from utils.constants import RESOURCE_TYPES
+
+BENCH_BASE = 9_000_000_000_000_000  # 실제 길드 ID와 겹치지 않는 구간
+
+# 기본 작업 비율 (합이 1일 필요는 없음)
+DEFAULT_MIX = {
+    "claim": 30,
+    "inventory": 15,
+    "craft": 10,
+    "sell_res": 10,
+    "register": 10,
+    "list": 10,
+    "buy": 5,
+    "rank_server": 7,
+    "rank_global": 3,
+}
+
+
+# 메모리 백엔드엔 DB 카탈로그가 없으므로 기본 카탈로그(SEED_ITEMS/SEED_RECIPES)의 레시피/기준가를 쓴다
+_SEED = catalog.seed()
+RECIPES = {p: rc for p, rc in _SEED.recipes.items() if rc.active}
+BASE_PRICE = {i: it.base_price for i, it in _SEED.items.items() if it.typ == "resource"}
+START_TREASURY = 100_000
+
+
+class World:
+    def __init__(self, guilds: int, users: int, lands: int):
+        self.bot = FakeBot()
+        self.eco = Economy(self.bot)
+        self.gov = Government(self.bot)
+        self.mkt = Market(self.bot)
+        self.rank = Rankings(self.bot)
+        self.guilds = [FakeGuild(BENCH_BASE + g, f"bench-{g}") for g in range(guilds)]
+        self.users = [FakeUser(BENCH_BASE + u) for u in range(users)]
+        self.admin = FakeUser(BENCH_BASE - 1, admin=True)
+        self.lands = [BENCH_BASE + 10_000 + c for c in range(lands)]
+        self.listings: dict[int, list[int]] = defaultdict(list)  # guild → 등록ID
+
+    def inter(self, guild: FakeGuild, user: FakeUser, channel: int | None = None) -> FakeInteraction:
+        return FakeInteraction(guild, user, channel or self.lands[0], client=self.bot)
+
+    async def setup(self):
+        await db.execute("DELETE FROM countries WHERE country_id >= $1", (BENCH_BASE,))
+        for g in self.guilds:
+            await self.gov.create_country.callback(self.gov, self.inter(g, self.admin))
+            for ch in self.lands:
+                await self.gov.land_assign.callback(self.gov, self.inter(g, self.admin, ch), 1)
+
+    # ---------- 작업 ----------
+    async def op(self, kind: str, rng: random.Random) -> FakeInteraction:
+        g = rng.choice(self.guilds)
+        u = rng.choice(self.users)
+        it = self.inter(g, u, rng.choice(self.lands))
+        if kind == "claim":
+            await self.eco.claim.callback(self.eco, it)
+        elif kind == "inventory":
+            await self.eco.inventory.callback(self.eco, it)
+        elif kind == "craft":
+            await self.eco.craft.callback(self.eco, it, rng.choice(["iron_ingot", "toolkit", "healing_potion"]), 1)
+        elif kind == "sell_res":
+            await self.eco.sell_res.callback(self.eco, it, rng.choice(["iron", "wood", "stone", "herb", "water"]), 1)
+        elif kind == "register":
+            await self.mkt.register.callback(self.mkt, it, rng.choice(["iron", "wood", "stone"]), 1, rng.randint(15, 40))
+            e = it.last_embed
+            m = re.search(r"등록ID (\d+)", e.description or "") if e and not it.rejected else None
+            if m:
+                self.listings[g.id].append(int(m.group(1)))
+        elif kind == "list":
+            await self.mkt.list_open.callback(self.mkt, it, rng.choice(["iron", "wood", "stone"]))
+        elif kind == "buy":
+            pool = self.listings[g.id]
+            code = pool.pop(rng.randrange(len(pool))) if pool else 0
+            await self.mkt.buy.callback(self.mkt, it, code, 1)
+        elif kind == "rank_server":
+            await self.rank.rank_server_local.callback(self.rank, it, 10)
+        elif kind == "rank_global":
+            await self.rank.rank_users_global.callback(self.rank, it, 10)
+        else:
+            raise ValueError(kind)
+        return it
+
+
+class RepoWorld:
+    """코그 없이 저장소 연산만 호출 (World.op과 같은 작업 이름)"""
+
+    def __init__(self, repo: repository.Repository, guilds: int, users: int, lands: int):
+        self.repo = repo
+        self.guilds = [BENCH_BASE + g for g in range(guilds)]
+        self.users = [BENCH_BASE + u for u in range(users)]
+        self.lands = [BENCH_BASE + 10_000 + c for c in range(lands)]
+        self.listings: dict[int, list[int]] = defaultdict(list)
+        self.n_lands = lands
+
+    async def setup(self):
+        if isinstance(self.repo, repository.MemoryRepository):
+            rng = random.Random(0)
+            for g in self.guilds:
+                self.repo.add_country(g, f"bench-{g - BENCH_BASE}", START_TREASURY)
+                for ch in self.lands:
+                    self.repo.add_land(g, ch, 1, rng.choice(RESOURCE_TYPES))
+        else:
+            # 실제 테이블 준비는 코그 경로와 같게
+            w = World(len(self.guilds), len(self.users), self.n_lands)
+            await w.setup()
+
+    async def op(self, kind: str, rng: random.Random) -> bool:
+        """거절(재고/잔액 부족, 이미 수확 등)이면 False"""
+        repo = self.repo
+        cid, uid = rng.choice(self.guilds), rng.choice(self.users)
+        if kind == "claim":
+            ch = rng.choice(self.lands)
+            land = await repo.land(cid, ch)
+            if land is None:
+                return False
+            await repo.ensure_user(cid, uid)
+            return await repo.claim(cid, uid, ch, claims.today(), roll_harvest(land.tier, land.resource_bias, rng))
+        if kind == "inventory":
+            await repo.inventory(cid, uid)
+            return True
+        if kind == "craft":
+            product = rng.choice(list(RECIPES))
+            await repo.ensure_user(cid, uid)
+            try:
+                await repo.craft(cid, uid, RECIPES[product].inputs, product, RECIPES[product].yield_qty)
+            except repository.InsufficientStock:
+                return False
+            return True
+        if kind == "sell_res":
+            item = rng.choice(RESOURCE_TYPES)
+            await repo.ensure_user(cid, uid)
+            return await repo.sell(cid, uid, item, 1, gameconfig.current().npc_unit_price(BASE_PRICE[item], "resource"))
+        if kind == "register":
+            lid = await repo.register(cid, uid, rng.choice(["iron", "wood", "stone"]), 1, rng.randint(15, 40))
+            if lid is None:
+                return False
+            self.listings[cid].append(lid)
+            return True
+        if kind == "list":
+            await repo.list_open(cid, rng.choice(["iron", "wood", "stone"]), None, 10)
+            return True
+        if kind == "buy":
+            pool = self.listings[cid]
+            code = pool.pop(rng.randrange(len(pool))) if pool else 0
+            try:
+                await repo.buy(cid, uid, code, 1)
+            except repository.TradeError:
+                return False
+            return True
+        if kind == "rank_server":
+            await repo.rank_users(cid, 10)
+            return True
+        if kind == "rank_global":
+            await repo.rank_users(None, 10)
+            return True
+        raise ValueError(kind)
+
+
+async def drive(world: World | RepoWorld, ops: int, rate: float, concurrency: int, mix: dict[str, int], seed: int):
+    rng = random.Random(seed)
+    kinds, weights = zip(*mix.items())
+    plan = rng.choices(kinds, weights=weights, k=ops)
+    rejected: dict[str, int] = defaultdict(int)
+    failed: dict[str, int] = defaultdict(int)
+    sem = asyncio.Semaphore(concurrency)
+
+    async def one(kind: str):
+        async with sem:
+            try:
+                async with metrics.track(kind):
+                    it = await world.op(kind, rng)
+                if it is False or getattr(it, "rejected", False):
+                    rejected[kind] += 1
+            except Exception:
+                failed[kind] += 1
+
+    interval = 1.0 / rate if rate > 0 else 0.0
+    t0 = time.perf_counter()
+    tasks = []
+    for i, kind in enumerate(plan):
+        if interval:
+            delay = t0 + i * interval - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(kind)))
+    await asyncio.gather(*tasks)
+    return time.perf_counter() - t0, rejected, failed
+
+
+def report(elapsed: float, rejected: dict[str, int], failed: dict[str, int]):
+    rows = metrics.snapshot()
+    total = sum(r["count"] for r in rows)
+    print(f"\n총 {total}건 / {elapsed:.2f}s → {total/elapsed:.1f} ops/s")
+    hdr = f"{'command':<12}{'n':>7}{'ops/s':>9}{'rej':>6}{'fail':>6}{'p50ms':>8}{'p99ms':>8}{'db/op':>7}{'dbms/op':>9}"
+    print(hdr)
+    print("-" * len(hdr))
+    for r in sorted(rows, key=lambda r: r["name"]):
+        n = r["name"]
+        print(
+            f"{n:<12}{r['count']:>7}{r['count']/elapsed:>9.1f}{rejected.get(n, 0):>6}{failed.get(n, 0):>6}"
+            f"{r['p50']*1000:>8.1f}{r['p99']*1000:>8.1f}{r['db_calls_avg']:>7.1f}{r['db_ms_avg']:>9.2f}"
+        )
+
+
+def parse_mix(spec: str | None) -> dict[str, int]:
+    if not spec:
+        return dict(DEFAULT_MIX)
+    out = {}
+    for part in spec.split(","):
+        k, _, v = part.partition("=")
+        if k.strip() not in DEFAULT_MIX:
+            raise SystemExit(f"알 수 없는 작업: {k}")
+        out[k.strip()] = int(v)
+    return out
+
+
+async def main_async(args):
+    memory = args.backend == "memory"
+    if not memory:
+        await db.init_db()
+    if args.backend == "cogs":
+        world = World(args.guilds, args.users, args.lands)
+    else:
+        repo = repository.MemoryRepository() if memory else repository.PgRepository()
+        repository.use(repo)
+        world = RepoWorld(repo, args.guilds, args.users, args.lands)
+    await world.setup()
+    metrics.reset()
+    elapsed, rejected, failed = await drive(world, args.ops, args.rate, args.concurrency, parse_mix(args.mix), args.seed)
+    report(elapsed, rejected, failed)
+    if not memory and not args.keep:
+        await db.execute("DELETE FROM countries WHERE country_id >= $1", (BENCH_BASE,))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="kingdom_bot 경제 부하 벤치마크")
+    ap.add_argument("--backend", choices=["cogs", "postgres", "memory"], default="cogs",
+                    help="cogs=코그 종단간, postgres/memory=저장소 연산만")
+    ap.add_argument("--guilds", type=int, default=4)
+    ap.add_argument("--users", type=int, default=50, help="길드당 사용자 수(모든 길드에서 같은 ID 집합 사용)")
+    ap.add_argument("--lands", type=int, default=5, help="길드당 토지 채널 수 (티어1, 국고 한도 내)")
+    ap.add_argument("--ops", type=int, default=5000)
+    ap.add_argument("--rate", type=float, default=0, help="초당 요청 수 (0=최대 속도)")
+    ap.add_argument("--concurrency", type=int, default=32)
+    ap.add_argument("--mix", help="예: claim=30,craft=10,buy=5")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--keep", action="store_true", help="종료 후 벤치 데이터를 남긴다")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+# bench/simulate.py
+"""
+경제 밸런스 몬테카를로 시뮬레이터 (오프라인, DB 없이).
+
+    python -m bench.simulate --players 200000 --days 30
+    python -m bench.simulate --sweep npc_resource_rate=0.55,0.65,0.75 --sweep yield_scale=0.8,1,1.2
+
+게임 규칙은 복사하지 않고 그대로 가져다 쓴다: utils.gameconfig의 GameConfig(티어·드랍표·NPC 단가/세금,
+--from-db면 game_config 덮어쓰기 포함), catalog.seed()(--from-db면 DB 카탈로그)의 기준가와
+레시피 그래프(crafting.plan으로 원자재 환산). 스윕 값은 기준 설정 위에 덮어쓰기로 얹어 같은 방식으로 컴파일한다.
+- 플레이어 = (유저, 토지) 한 쌍, 하루 한 번 수확. 수확량 ~ U{yield_min..yield_max}, 구성 ~ 다항분포(드랍 확률)
+  → 플레이어 축은 NumPy 벡터화, 날짜만 파이썬 루프
+- 정책: craft_share 비율은 남는 게 있는 레시피(아이템 순수령 > 재료 NPC가)부터 매일 제작·판매하고 나머지 자원은
+  들고 있다가 마지막 날 판매. 나머지는 수확 즉시 자원 판매
+- 출력: 티어별 1일 수입(평균·p10·p90, 정책별), 국가당 국고 세수, 통화량 지수(NPC 매입 = 발행) 곡선
+- 스윕: 조합마다 프로세스 풀에 한 점씩. 모든 점이 같은 시드를 써서(공통 난수) 파라미터 차이만 비교된다
+유저 간 상점 거래는 통화량을 바꾸지 않는 이전이라 뺀다. 주간 유지비는 참고로만 보인다(부과하는 코드 없음).
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import csv
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Optional
+
+import numpy as np
+
+from utils import catalog, gameconfig
+from utils.catalog import Catalog
+from utils.constants import INITIAL_TREASURY
+from utils.crafting import graph_for
+from utils.gameconfig import GameConfig
+
+
+@dataclass(frozen=True)
+class Params:
+    """기준 설정(GameConfig)에 얹는 값. None이면 기준 설정 그대로"""
+    npc_resource_rate: Optional[float] = None
+    npc_item_rate: Optional[float] = None
+    npc_item_tax: Optional[float] = None
+    bias_bonus: Optional[int] = None
+    yield_scale: float = 1.0          # 티어 수확량 범위 배율
+    craft_share: float = 0.5          # 제작 정책 플레이어 비율
+
+
+@dataclass(frozen=True)
+class Model:
+    """한 스윕 점을 컴파일한 조회 배열 (워커로 pickle해서 보낸다)"""
+    params: dict                      # 실제 적용 값 (보고용)
+    craft_share: float
+    tax_rate: float
+    tiers: tuple[int, ...]
+    ymin: np.ndarray                  # (티어,)
+    ymax: np.ndarray
+    upkeep_day: np.ndarray
+    resources: tuple[str, ...]
+    probs: np.ndarray                 # (편향 자원, 자원) 드랍 확률
+    res_price: np.ndarray             # (자원,) NPC 단가
+    recipes: tuple[tuple[str, np.ndarray, int], ...]   # (제품, 원자재 벡터, 제작 1회 NPC 매각액) — 남는 것만, 이득 순
+
+
+def compile_model(cat: Catalog, base: GameConfig, p: Params) -> Model:
+    over = {k: v for k, v in asdict(p).items() if k in gameconfig.DEFAULTS and v is not None}
+    if p.yield_scale != 1.0:
+        over["land_tiers"] = {
+            t: {"yield_min": max(1, round(c.yield_min * p.yield_scale)),
+                "yield_max": max(1, round(c.yield_max * p.yield_scale))}
+            for t, c in base.tiers.items()
+        }
+    cfg = gameconfig.compile_config(gameconfig.merge(base.source, over)) if over else base
+
+    tiers = tuple(sorted(cfg.tiers))
+    resources = tuple(i for i, _ in cfg.base_drop)
+    probs = np.array([[pct for _, pct in cfg.drop_table(b)] for b in resources]) / 100
+    res_price = np.array([cfg.npc_unit_price(cat.items[r].base_price, "resource") for r in resources])
+    graph = graph_for(cat)
+    recipes = []
+    for product, rec in cat.recipes.items():
+        if not rec.active or product not in cat.items:
+            continue
+        raw = graph.plan(product, rec.yield_qty, {}).shortfall
+        if not set(raw) <= set(resources):
+            continue
+        need = np.array([raw.get(r, 0) for r in resources])
+        gross = cfg.npc_unit_price(cat.items[product].base_price, "item") * rec.yield_qty
+        margin = gross - cfg.npc_item_tax(gross) - int(need @ res_price)
+        if margin > 0:
+            recipes.append((margin / need.sum(), product, need, gross))
+    recipes.sort(key=lambda r: -r[0])
+    return Model(
+        params={"npc_resource_rate": cfg.resource_rate, "npc_item_rate": cfg.item_rate,
+                "npc_item_tax": cfg.item_tax_rate, "bias_bonus": cfg.bias_bonus,
+                "yield_scale": p.yield_scale, "craft_share": p.craft_share},
+        craft_share=p.craft_share, tax_rate=cfg.item_tax_rate,
+        tiers=tiers,
+        ymin=np.array([cfg.tiers[t].yield_min for t in tiers]),
+        ymax=np.array([cfg.tiers[t].yield_max for t in tiers]),
+        upkeep_day=np.array([cfg.tiers[t].upkeep / 7 for t in tiers]),
+        resources=resources, probs=probs, res_price=res_price,
+        recipes=tuple((prod, need, price) for _, prod, need, price in recipes),
+    )
+
+
+def simulate(m: Model, players: int, days: int, countries: int, seed: int) -> dict:
+    t0 = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    R = len(m.resources)
+    tier = rng.integers(0, len(m.tiers), players)
+    bias = rng.integers(0, R, players)
+    country = rng.integers(0, countries, players)
+    crafter = rng.random(players) < m.craft_share
+    groups = [np.flatnonzero(bias == b) for b in range(R)]
+    lo, hi = m.ymin[tier], m.ymax[tier] + 1
+    c_idx = np.flatnonzero(crafter)
+
+    income = np.zeros(players)
+    inv = np.zeros((c_idx.size, R), dtype=np.int64)
+    tax_by_country = np.zeros(countries)
+    minted = np.zeros(days + 1)
+    harvest = np.empty((players, R), dtype=np.int64)
+
+    for d in range(days):
+        qty = rng.integers(lo, hi)
+        for b, idx in enumerate(groups):
+            harvest[idx] = rng.multinomial(qty[idx], m.probs[b])
+        # 즉시 판매파: 자원 NPC 매입(면세)
+        sold = harvest @ m.res_price
+        sold[c_idx] = 0
+        # 제작파: 재고에 더해 이득 순으로 만들 수 있는 만큼 제작·판매
+        inv += harvest[c_idx]
+        gross = np.zeros(c_idx.size)
+        for _, need, price in m.recipes:
+            used = need > 0
+            k = (inv[:, used] // need[used]).min(axis=1)
+            inv -= k[:, None] * need
+            gross += k * price
+        tax = np.rint(gross * m.tax_rate)   # npc_item_tax()와 같은 반올림(짝수 쪽)
+        income += sold
+        income[c_idx] += gross - tax
+        tax_by_country += np.bincount(country[c_idx], weights=tax, minlength=countries)
+        minted[d + 1] = minted[d] + sold.sum() + gross.sum()
+
+    leftover = inv @ m.res_price
+    income[c_idx] += leftover
+    minted[days] += leftover.sum()
+
+    per_day = income / days
+    tiers = []
+    for i, t in enumerate(m.tiers):
+        sel = tier == i
+        x = per_day[sel]
+        tiers.append({
+            "tier": t, "players": int(sel.sum()),
+            "mean": float(x.mean()), "p10": float(np.percentile(x, 10)), "p90": float(np.percentile(x, 90)),
+            "sell_mean": float(per_day[sel & ~crafter].mean()) if (sel & ~crafter).any() else 0.0,
+            "craft_mean": float(per_day[sel & crafter].mean()) if (sel & crafter).any() else 0.0,
+            "upkeep_day": float(m.upkeep_day[i]),
+        })
+    base = countries * INITIAL_TREASURY
+    money = (base + minted) / base
+    return {
+        "params": m.params,
+        "tiers": tiers,
+        "tax_per_country_day": float(tax_by_country.mean() / days),
+        "treasury_end": float(INITIAL_TREASURY + tax_by_country.mean()),
+        "money_index": money.tolist(),
+        "daily_growth": float(money[-1] ** (1 / days) - 1),
+        "player_days": players * days,
+        "seconds": time.perf_counter() - t0,
+    }
+
+
+def _run(job: tuple) -> dict:
+    return simulate(*job)
+
+
+def parse_sweep(specs: list[str]) -> list[dict]:
+    names = {f.name: f.type for f in fields(Params)}
+    axes = []
+    for spec in specs:
+        k, _, vals = spec.partition("=")
+        k = k.strip()
+        if k not in names:
+            raise SystemExit(f"알 수 없는 파라미터: {k} (가능: {', '.join(names)})")
+        cast = int if "int" in names[k] else float
+        axes.append([(k, cast(v)) for v in vals.split(",")])
+    return [dict(combo) for combo in itertools.product(*axes)]
+
+
+def report(res: dict) -> None:
+    p = res["params"]
+    print("\n" + " ".join(f"{k}={v}" for k, v in p.items()))
+    hdr = f"{'tier':>4}{'players':>9}{'LC/day':>9}{'p10':>8}{'p90':>8}{'sell':>8}{'craft':>8}{'upkeep/d':>10}"
+    print(hdr)
+    print("-" * len(hdr))
+    for t in res["tiers"]:
+        print(f"{t['tier']:>4}{t['players']:>9}{t['mean']:>9.1f}{t['p10']:>8.1f}{t['p90']:>8.1f}"
+              f"{t['sell_mean']:>8.1f}{t['craft_mean']:>8.1f}{t['upkeep_day']:>10.0f}")
+    days = len(res["money_index"]) - 1
+    print(f"국고 세수 {res['tax_per_country_day']:,.0f} LC/일·국가 → {days}일 뒤 {res['treasury_end']:,.0f} LC · "
+          f"통화량 x{res['money_index'][-1]:.2f} (일 {res['daily_growth'] * 100:+.2f}%)")
+
+
+async def _load(from_db: bool, country: Optional[int]) -> tuple[Catalog, GameConfig]:
+    if not from_db:
+        return catalog.seed(), gameconfig.current()
+    from utils import db
+    await db.init_db()
+    try:
+        await gameconfig.load(force=True)
+        return await catalog.load(), gameconfig.for_country(country) if country else gameconfig.current()
+    finally:
+        await db.POOL.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="kingdom_bot 경제 밸런스 몬테카를로 시뮬레이터")
+    ap.add_argument("--players", type=int, default=200_000, help="(유저, 토지) 쌍 수 — 티어·편향은 균등 배정")
+    ap.add_argument("--days", type=int, default=30)
+    ap.add_argument("--per-country", type=int, default=50, help="국가당 플레이어 수 (예: 유저 10 × 토지 5)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--sweep", action="append", default=[],
+                    help="파라미터=값,값… (여러 번 주면 곱집합). 예: npc_item_tax=0.03,0.05")
+    ap.add_argument("--workers", type=int, default=os.cpu_count())
+    ap.add_argument("--from-db", action="store_true",
+                    help="DATABASE_URL의 items/recipes와 game_config를 쓴다 (기본: 시드 카탈로그 + 기본 설정)")
+    ap.add_argument("--country", type=int, help="--from-db일 때 이 국가의 덮어쓰기를 기준으로")
+    ap.add_argument("--csv", help="통화량 지수 곡선을 CSV로 (점, 날짜, 지수)")
+    args = ap.parse_args()
+
+    cat, base = asyncio.run(_load(args.from_db, args.country))
+    points = parse_sweep(args.sweep)
+    jobs = [(compile_model(cat, base, replace(Params(), **pt)), args.players, args.days,
+             max(1, args.players // args.per_country), args.seed)
+            for pt in points]
+    t0 = time.perf_counter()
+    if len(jobs) == 1 or args.workers <= 1:
+        results = [_run(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(jobs))) as ex:
+            results = list(ex.map(_run, jobs))
+    elapsed = time.perf_counter() - t0
+
+    for res in results:
+        report(res)
+    total = sum(r["player_days"] for r in results)
+    print(f"\n{len(results)}개 점 · {total:,} 플레이어-일 / {elapsed:.2f}s")
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(["point", *results[0]["params"], "day", "money_index"])
+            for i, res in enumerate(results):
+                vals = list(res["params"].values())
+                for d, v in enumerate(res["money_index"]):
+                    w.writerow([i, *vals, d, f"{v:.6f}"])
+
+
+if __name__ == "__main__":
+    main()
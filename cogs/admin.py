@@ -0,0 +1,158 @@
+# cogs/admin.py
+import asyncio
+import io
+import os
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+from utils.embeds import parchment, send_err
+from utils import alerts, backup, departures, idempotency, invalidation, inventory, metrics, ratelimit, retry, users
+from utils.watchdog import WATCHDOG
+
+
+class Admin(commands.Cog):
+    """운영자용 진단 명령"""
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self._export_lock = asyncio.Lock()   # 내보내기는 프로세스당 한 번에 하나
+
+    @app_commands.guild_only()
+    @app_commands.default_permissions(administrator=True)
+    class AdminGroup(app_commands.Group):
+        """관리 명령 그룹"""
+        pass
+
+    group = AdminGroup(name="관리", description="봇 운영/진단 명령 (관리자 전용)")
+
+    @group.command(name="성능", description="명령별 지연(p50/p95/p99)과 DB 왕복 수를 확인합니다.")
+    @app_commands.describe(개수="표시할 명령 수 (기본 15)", 프로메테우스="Prometheus 텍스트 형식 파일로 받기")
+    async def perf(self, inter: discord.Interaction, 개수: app_commands.Range[int, 1, 25] = 15,
+                   프로메테우스: bool = False):
+        if not inter.user.guild_permissions.administrator:
+            return await send_err(inter, "관리자만 사용할 수 있습니다.")
+
+        if 프로메테우스:
+            text = (metrics.render_prometheus() + WATCHDOG.render_prometheus() + retry.render_prometheus()
+                    + ratelimit.render_prometheus())
+            buf = io.BytesIO(text.encode("utf-8"))
+            return await inter.response.send_message(
+                file=discord.File(buf, filename="kingdom_metrics.txt"), ephemeral=True
+            )
+
+        rows = metrics.snapshot()[:개수]
+        lines = [] if rows else ["아직 기록된 호출이 없습니다."]
+        for r in rows:
+            lines.append(
+                f"**/{r['name']}** · n={r['count']}" + (f" · 오류 {r['errors']}" if r["errors"] else "") + "\n"
+                f"  p50 {r['p50']*1000:.0f}ms · p95 {r['p95']*1000:.0f}ms · p99 {r['p99']*1000:.0f}ms"
+                f" · DB {r['db_calls_avg']:.1f}회(최대 {r['db_calls_max']}) / {r['db_ms_avg']:.1f}ms"
+            )
+        bg = metrics.BACKGROUND
+        emb = parchment(
+            "성능 보고",
+            "\n".join(lines),
+            footer=f"평균 DB 왕복 순 · 최근 {metrics.WINDOW}회 기준 · 백그라운드 DB {bg.db_calls}회"
+                   f" · 중복 요청 재응답 {idempotency.replays}회",
+        )
+
+        loop = WATCHDOG.stats()
+        loop_lines = [
+            f"지연 p50 {loop['p50']*1000:.1f}ms · p99 {loop['p99']*1000:.1f}ms · 최대 {loop['max']*1000:.0f}ms",
+            f"{WATCHDOG.threshold*1000:.0f}ms 초과 정체 {loop['stalls']}회",
+        ]
+        last = loop["last_stall"]
+        if last:
+            tail = last.stack.strip().splitlines()[-2:]
+            loop_lines.append(
+                f"최근 정체: <t:{int(last.at)}:R> {last.duration*1000:.0f}ms · `{last.task}`\n"
+                "```" + "\n".join(tail)[-700:] + "```"
+            )
+        emb.add_field(name="이벤트 루프", value="\n".join(loop_lines), inline=False)
+        if retry.COUNTERS:
+            emb.add_field(
+                name="DB 일시 오류",
+                value="\n".join(
+                    f"`{kind}` 재시도 {c['retried']}회 · 포기 {c['gave_up']}회"
+                    for kind, c in sorted(retry.COUNTERS.items())
+                ),
+                inline=False,
+            )
+        us = users.stats()
+        emb.add_field(
+            name="유저 캐시",
+            value=f"{us['size']}명 · 적중률 {us['hit_rate']*100:.1f}% (적중 {us['hits']} / 미스 {us['misses']})",
+            inline=False,
+        )
+        if ratelimit.rejections:
+            emb.add_field(
+                name="속도 제한",
+                value=" · ".join(f"`{cls}` 거절 {n}회" for cls, n in sorted(ratelimit.rejections.items())),
+                inline=False,
+            )
+        bus = invalidation.stats
+        if bus["published"] or bus["received"]:
+            emb.add_field(
+                name="캐시 무효화 버스",
+                value=f"발행 {bus['published']}건 (병합 {bus['coalesced']}) · NOTIFY {bus['notifies']}회"
+                      f" · 수신 {bus['received']}회 · 재연결 {bus['reconnects']}회",
+                inline=False,
+            )
+        st = alerts.stats
+        if st["fired"]:
+            emb.add_field(
+                name="가격 알림",
+                value=f"발동 {st['fired']}건 · 대기 {alerts.pending()}건 · DM {st['sent']}통"
+                      f" (실패 {st['failed']} / 큐 초과 버림 {st['dropped']})",
+                inline=False,
+            )
+        gone = departures.last_purge
+        if gone:
+            emb.add_field(
+                name="떠난 국가 정리",
+                value=f"최근 국가 {gone['country_id']} · {gone['rows']}행 · {gone['seconds']:.1f}초",
+                inline=False,
+            )
+        comp = inventory.last_run
+        if comp:
+            emb.add_field(
+                name="인벤토리 정리",
+                value=f"최근 회수 {comp['rows']}행 · 약 {comp['approx_bytes']/1024:.0f}KiB "
+                      f"(테이블 {comp['table_bytes']/1024/1024:.1f}MiB)",
+                inline=False,
+            )
+        await inter.response.send_message(embed=emb, ephemeral=True)
+
+    @group.command(name="내보내기", description="이 국가의 경제 데이터를 파일(zip, CSV.gz)로 내보냅니다.")
+    async def export(self, inter: discord.Interaction):
+        if not inter.user.guild_permissions.administrator:
+            return await send_err(inter, "관리자만 사용할 수 있습니다.")
+        if self._export_lock.locked():
+            return await send_err(inter, "다른 내보내기가 진행 중입니다. 잠시 후 다시 시도해 주세요.")
+        await inter.response.defer(ephemeral=True, thinking=True)
+        async with self._export_lock:
+            try:
+                path, manifest = await backup.export_country(inter.guild.id, directory=backup.COMMAND_DIR)
+            except backup.BackupError as e:
+                return await send_err(inter, str(e))
+        size = os.path.getsize(path)
+        rows = " · ".join(f"{t} {m['rows']}" for t, m in manifest["tables"].items())
+        emb = parchment("내보내기 완료", f"{rows}\n크기 {size / 1024 / 1024:.1f}MiB")
+        try:
+            if size <= inter.guild.filesize_limit:
+                await inter.followup.send(embed=emb, file=discord.File(path), ephemeral=True)
+                # 첨부로 전달했으면 서버 사본은 필요 없다
+                os.remove(path)
+            else:
+                emb.add_field(name="파일", value=f"첨부 한도를 넘어 서버에 보관했습니다: `{path}` "
+                                                f"(최근 {backup.KEEP_FILES}개, {backup.KEEP_DAYS:g}일까지)", inline=False)
+                await inter.followup.send(embed=emb, ephemeral=True)
+        finally:
+            # 보관 중인 큰 파일과 전송에 실패해 남은 파일 정리
+            await asyncio.to_thread(backup.sweep)
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Admin(bot))
@@ -1,48 +1,24 @@
 from __future__ import annotations
-import json
+import io
 import random
-from datetime import datetime
+from typing import Optional
 import discord
 from discord.ext import commands
 from discord import app_commands
 
-from utils.db import fetchone, fetchall, execute, executemany
-from utils.embeds import send_ok, send_err
-from utils.constants import (
-    BASE_DROP,
-    NPC_RESOURCE_RATE,   # 예: 0.65  (자원 NPC 매입 단가 = base_price * 0.65)
-    NPC_ITEM_RATE,       # 예: 1.00  (아이템 NPC 매입 단가 = base_price * 1.00)
-    NPC_ITEM_TAX,        # 예: 0.05  (아이템 매각액의 5%를 국고 세금)
-)
-from utils.timezone import KST
-
-
-# ---------- 티어 설정 (1~5) ----------
-# 가격/유지비는 정부(토지 지정) 쪽에서 사용하고, 여기서는 수확량 범위만 사용.
-LAND_TIERS = {
-    1: {"price": 5_000,   "upkeep": 1_000,  "yield_min": 2,  "yield_max": 4},
-    2: {"price": 15_000,  "upkeep": 3_000,  "yield_min": 4,  "yield_max": 6},
-    3: {"price": 30_000,  "upkeep": 6_000,  "yield_min": 6,  "yield_max": 9},
-    4: {"price": 60_000,  "upkeep": 12_000, "yield_min": 9,  "yield_max": 12},
-    5: {"price": 120_000, "upkeep": 25_000, "yield_min": 12, "yield_max": 16},
-}
-
-
-# ---------- 유틸: recipes.inputs_json 안전 파서 ----------
-def _json_obj(val) -> dict:
-    """recipes.inputs_json이 dict가 아닐 수 있는 환경(드라이버/직렬화)에 대비한 파서."""
-    if isinstance(val, dict):
-        return val
-    if isinstance(val, str):
-        try:
-            parsed = json.loads(val)
-            return parsed if isinstance(parsed, dict) else {}
-        except json.JSONDecodeError:
-            return {}
-    try:
-        return dict(val)  # asyncpg.Record 등 대응
-    except Exception:
-        return {}
+from utils.db import Tx, fetchone, fetchall
+from utils import catalog, charts, claims, gameconfig, market_global, repository, users
+from utils import inventory as stock
+from utils.catalog import json_obj as _json_obj
+from utils.crafting import RecipeCycleError, graph_for
+from utils.embeds import parchment, send_embed, send_ok, send_err
+from utils.idempotency import Result, reply, run_once
+
+
+def roll_harvest(tier: int, bias: str, rng: Optional[random.Random] = None,
+                 cfg: Optional[gameconfig.GameConfig] = None) -> dict[str, int]:
+    """티어별 수확량 범위 안에서 드랍 누적표(편향 가산)로 자원을 뽑는다 (rng: 벤치 재현용, cfg: 기본 전역 설정)"""
+    return (cfg or gameconfig.current()).roll_harvest(tier, bias, rng)
 
 
 class Economy(commands.Cog):
@@ -53,15 +29,11 @@ class Economy(commands.Cog):
 
     # ---------- 공통 유틸 ----------
     async def _ensure_user(self, cid: int, uid: int):
-        await execute(
-            "INSERT INTO users(country_id,user_id) VALUES ($1,$2) "
-            "ON CONFLICT DO NOTHING",
-            (cid, uid)
-        )
+        # 한 번 확인한 유저는 캐시에서 바로 통과 (utils/users.py)
+        await repository.get().ensure_user(cid, uid)
 
     async def _item_name(self, item_id: str) -> str:
-        r = await fetchone("SELECT name FROM items WHERE item_id=$1", (item_id,))
-        return r["name"] if r else item_id
+        return (await catalog.get()).name(item_id)
 
     # ---------- 내부 자동완성 ----------
     async def ac_all_items_any(self, inter: discord.Interaction, current: str):
@@ -126,11 +98,21 @@ class Economy(commands.Cog):
     async def ac_item_owned(self, inter: discord.Interaction, current: str):
         return await self._ac_item(inter, current, owned_only=True)
 
+    async def ac_owned_any(self, inter: discord.Interaction, current: str):
+        rows = await fetchall(
+            "SELECT i.item_id, i.name FROM inventory inv "
+            "JOIN items i ON i.item_id=inv.item_id "
+            "WHERE inv.country_id=$1 AND inv.user_id=$2 AND inv.qty>0 "
+            "AND (i.item_id ILIKE $3 OR i.name ILIKE $3) "
+            "ORDER BY i.item_id LIMIT 25",
+            (inter.guild.id, inter.user.id, f"%{current}%")
+        )
+        return [app_commands.Choice(name=f"{r['name']} ({r['item_id']})", value=r["item_id"]) for r in rows]
+
     # ---------- 명령어들 ----------
     @group.command(name="인벤", description="내 인벤토리를 확인합니다.")
     async def inventory(self, inter: discord.Interaction):
         cid, uid = inter.guild.id, inter.user.id
-        await self._ensure_user(cid, uid)
         rows = await fetchall(
             "SELECT i.name, i.typ, inv.qty FROM inventory inv "
             "JOIN items i ON i.item_id=inv.item_id "
@@ -172,11 +154,14 @@ class Economy(commands.Cog):
                 return await send_err(inter, "해당 아이템을 찾을 수 없습니다.")
             typ = "자원" if row["typ"] == "resource" else "아이템"
             updated = row["last_updated"].strftime("%Y-%m-%d %H:%M") if row.get("last_updated") else "기록 없음"
+            ref = market_global.reference_price(아이템)
+            ref_line = f"세계 참고가: **{ref} LC**\n" if ref else ""
             await send_ok(
                 inter, "시세",
                 f"분류: **{typ}**\n"
                 f"이름: **{row['name']}** ({row['item_id']})\n"
                 f"현재 시세: **{int(row['price'])} LC**\n"
+                f"{ref_line}"
                 f"갱신: {updated}"
             )
             return
@@ -204,69 +189,68 @@ class Economy(commands.Cog):
                     res_lines.append(f"• {r['name']} ({r['item_id']}) — **{int(r['price'])} LC**")
         await send_ok(inter, "전체 시세", "\n".join(res_lines))
 
+    @group.command(name="시세차트", description="아이템의 일별 시세(EMA)와 거래량 추이를 차트로 봅니다.")
+    @app_commands.describe(아이템="차트를 볼 아이템")
+    @app_commands.autocomplete(아이템=ac_all_items_any)
+    async def price_chart(self, inter: discord.Interaction, 아이템: str):
+        if inter.guild is None:
+            return await send_err(inter, "서버에서만 사용 가능합니다.")
+        cid = inter.guild.id
+        # 캐시 미스면 워커 프로세스에서 렌더링(첫 호출은 워커 기동 + matplotlib 적재까지) → 3초 응답 기한 전에 먼저 응답
+        await inter.response.defer(thinking=True)
+        try:
+            res = await charts.price_chart(cid, 아이템)
+        except ImportError:
+            return await send_err(inter, "차트 모듈(matplotlib)이 설치되어 있지 않습니다.")
+        if res is None:
+            return await send_err(inter, "아직 확정된 일별 시세가 없습니다. 거래가 쌓이면 다음 날부터 표시됩니다.")
+        png, rows = res
+        last = rows[-1]
+        name = await self._item_name(아이템)
+        emb = parchment(
+            "시세 추이",
+            f"**{name}** ({아이템})\n"
+            f"최근 EMA **{float(last['ema_price']):.1f} LC** · 평균가 {last['avg_price']} LC · 거래량 {last['volume']}\n"
+            f"기간: {rows[0]['date']} ~ {last['date']} ({len(rows)}일)",
+        )
+        emb.set_image(url="attachment://chart.png")
+        await send_embed(inter, emb, file=discord.File(io.BytesIO(png), filename="chart.png"))
+
     @group.command(name="정산", description="이 토지(채널)에서 오늘의 자원을 수령합니다. (채널마다 1회/일, KST 0시 리셋)")
     async def claim(self, inter: discord.Interaction):
         if inter.guild is None:
             return await send_err(inter, "서버에서만 사용 가능합니다.")
         cid, ch, uid = inter.guild.id, inter.channel_id, inter.user.id
 
-        land = await fetchone(
-            "SELECT tier,resource_bias,base_yield FROM lands WHERE country_id=$1 AND channel_id=$2",
-            (cid, ch)
-        )
+        repo = repository.get()
+        land = await repo.land(cid, ch)
         if not land:
             return await send_err(inter, "이 채널은 토지가 아닙니다. `/왕국 토지 지정`으로 설정하세요.")
         await self._ensure_user(cid, uid)
 
-        today = datetime.now(KST).date()
-        dup = await fetchone(
-            "SELECT 1 FROM user_claims WHERE country_id=$1 AND user_id=$2 AND channel_id=$3 AND claim_date=$4",
-            (cid, uid, ch, today)
-        )
-        if dup:
+        results = roll_harvest(land.tier, land.resource_bias, cfg=gameconfig.for_country(cid))
+        # 기록 + 지급: 오늘 이 채널이 이미 기록돼 있으면 아무것도 쓰지 않는다
+        if not await repo.claim(cid, uid, ch, claims.today(), results):
             return await send_err(inter, "오늘은 이미 이 토지에서 수확했습니다. 내일 다시 오세요!")
 
-        # --------- 수확량: 티어 기반 랜덤 범위 ---------
-        tier = int(land["tier"])
-        bias = land["resource_bias"]
-        tier_conf = LAND_TIERS.get(tier, LAND_TIERS[1])
-        harvest_qty = random.randint(tier_conf["yield_min"], tier_conf["yield_max"])
-
-        # 드랍 확률 테이블(편향 적용)
-        table = [(i, p + (10 if i == bias else 0)) for i, p in BASE_DROP]
-        s = sum(p for _, p in table)
-        table = [(i, round(p * 100 / s)) for i, p in table]
-        diff = 100 - sum(p for _, p in table)
-        if diff:
-            i0, p0 = table[0]
-            table[0] = (i0, p0 + diff)
-
-        results: dict[str, int] = {}
-        for _ in range(harvest_qty):
-            r = random.randint(1, 100)
-            acc = 0
-            for item, p in table:
-                acc += p
-                if r <= acc:
-                    results[item] = results.get(item, 0) + 1
-                    break
-
-        # 지급
-        if results:
-            await executemany(
-                "INSERT INTO inventory(country_id,user_id,item_id,qty) VALUES ($1,$2,$3,$4) "
-                "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty=inventory.qty+EXCLUDED.qty",
-                [(cid, uid, k, v) for k, v in results.items()]
-            )
-
-        await execute(
-            "INSERT INTO user_claims(country_id,user_id,channel_id,claim_date) VALUES ($1,$2,$3,$4)",
-            (cid, uid, ch, today)
-        )
-
         pretty = [f"• **{await self._item_name(k)}** × **{v}**" for k, v in results.items()]
         await send_ok(inter, "오늘의 수확", "\n".join(pretty) if pretty else "오늘은 빈 손입니다…")
 
+    @group.command(name="미수확", description="오늘 아직 수확하지 않은 토지(채널)를 확인합니다.")
+    async def unclaimed(self, inter: discord.Interaction):
+        if inter.guild is None:
+            return await send_err(inter, "서버에서만 사용 가능합니다.")
+        rows = await claims.unclaimed_lands(inter.guild.id, inter.user.id, claims.today())
+        if not rows:
+            return await send_ok(inter, "미수확 토지", "오늘은 모든 토지에서 수확을 마쳤습니다.")
+        lines = []
+        for r in rows[:40]:
+            bias = f" · 편향 {await self._item_name(r['resource_bias'])}" if r["resource_bias"] else ""
+            lines.append(f"• <#{r['channel_id']}> — {r['tier']}티어{bias}")
+        if len(rows) > 40:
+            lines.append(f"…외 {len(rows) - 40}곳")
+        await send_ok(inter, f"미수확 토지 ({len(rows)}곳)", "\n".join(lines))
+
     @group.command(name="레시피", description="제작 가능한 레시피 목록을 확인합니다.")
     async def recipes(self, inter: discord.Interaction):
         rows = await fetchall(
@@ -301,13 +285,16 @@ class Economy(commands.Cog):
         )
 
     @group.command(name="제작", description="자원으로 아이템을 제작합니다 (아이템은 NPC 전용 판매).")
-    @app_commands.describe(아이템="제작 아이템", 수량="제작 수량")
+    @app_commands.describe(아이템="제작 아이템", 수량="제작 수량", 연쇄="부족한 중간재(예: 철괴)까지 자동으로 제작")
     @app_commands.autocomplete(아이템=ac_item_any)
-    async def craft(self, inter: discord.Interaction, 아이템: str, 수량: app_commands.Range[int,1,1_000_000]):
+    async def craft(self, inter: discord.Interaction, 아이템: str, 수량: app_commands.Range[int,1,1_000_000],
+                    연쇄: bool = False):
         if inter.guild is None:
             return await send_err(inter, "서버에서만 사용 가능합니다.")
         cid, uid = inter.guild.id, inter.user.id
         await self._ensure_user(cid, uid)
+        if 연쇄:
+            return await self._craft_chain(inter, cid, uid, 아이템, 수량)
 
         rec = await fetchone("SELECT inputs_json,yield_qty,active_flag FROM recipes WHERE product_id=$1", (아이템,))
         if not rec or not rec["active_flag"]:
@@ -326,22 +313,96 @@ class Economy(commands.Cog):
                 name = await self._item_name(item_id)
                 return await send_err(inter, f"재료가 부족합니다: {name} × {need_total}")
 
-        # 차감
-        for item_id, need in inputs_obj.items():
-            await execute(
-                "UPDATE inventory SET qty = qty - $1 WHERE country_id=$2 AND user_id=$3 AND item_id=$4",
-                (int(need) * 수량, cid, uid, item_id)
+        # 차감(0이 되면 행 삭제) + 산출을 한 트랜잭션으로. 그 사이 재료가 빠졌으면 전체 롤백
+        prod_name = await self._item_name(아이템)
+
+        async def settle(tx: Tx) -> Result:
+            await repository.get().craft(cid, uid, {k: int(v) * 수량 for k, v in inputs_obj.items()}, 아이템, out_qty,
+                                         tx=tx)
+            return Result("제작 완료", f"**{prod_name} × {out_qty}** 제작을 마쳤습니다.\n(아이템은 NPC에게만 판매할 수 있습니다)")
+
+        try:
+            result = await run_once(inter, "길드 제작", settle)
+        except stock.InsufficientStock:
+            return await send_err(inter, "재료가 부족합니다.")
+        await reply(inter, result)
+
+    async def _craft_chain(self, inter: discord.Interaction, cid: int, uid: int, item_id: str, runs: int):
+        """다단계 제작: 인벤토리를 잠근 채 계획을 세우고 순증감을 한 문장으로 반영 (한 트랜잭션)"""
+        cat = await catalog.get()
+        try:
+            g = graph_for(cat)
+        except RecipeCycleError as e:
+            return await send_err(inter, f"순환하는 레시피가 있어 연쇄 제작을 할 수 없습니다: {e}")
+        if not g.craftable(item_id):
+            return await send_err(inter, "금단의 조합서입니다. 다른 제련을 시도하십시오.")
+        qty = g.recipes[item_id].yield_qty * runs
+
+        async def settle(tx: Tx) -> Result:
+            rows = await tx.fetchall(
+                "SELECT item_id, qty FROM inventory WHERE country_id=$1 AND user_id=$2 FOR UPDATE",
+                (cid, uid),
+            )
+            plan = g.plan(item_id, qty, {r["item_id"]: int(r["qty"]) for r in rows})
+            if not plan.ok:
+                short = ", ".join(f"{cat.name(k)} × {v}" for k, v in plan.shortfall.items())
+                return Result.fail(f"재료가 부족합니다 (원자재 기준): {short}")
+            deltas = plan.deltas()
+            await tx.execute(
+                "INSERT INTO inventory(country_id,user_id,item_id,qty) "
+                "SELECT $1, $2, d.item_id, d.delta FROM unnest($3::text[], $4::bigint[]) AS d(item_id, delta) "
+                "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty = inventory.qty + EXCLUDED.qty",
+                (cid, uid, list(deltas), list(deltas.values())),
             )
-        # 산출
-        await execute(
-            "INSERT INTO inventory(country_id,user_id,item_id,qty) VALUES ($1,$2,$3,$4) "
-            "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty = inventory.qty + $4",
-            (cid, uid, 아이템, out_qty)
+            await stock.drop_empty(tx, cid, uid, [k for k, v in deltas.items() if v < 0])
+            steps = "\n".join(f"{i}. {cat.name(p)} × {n}회" for i, (p, n) in enumerate(plan.crafts, start=1))
+            return Result(
+                "연쇄 제작 완료",
+                f"**{cat.name(item_id)} × {qty}** 제작을 마쳤습니다.\n\n### 제작 단계\n{steps}\n"
+                f"(아이템은 NPC에게만 판매할 수 있습니다)"
+            )
+
+        await reply(inter, await run_once(inter, "길드 제작", settle))
+
+    @group.command(name="제작계획", description="다단계 제작에 필요한 원자재와 현재 제작 가능 수량을 계산합니다.")
+    @app_commands.describe(아이템="제작 아이템", 수량="제작 수량")
+    @app_commands.autocomplete(아이템=ac_item_any)
+    async def craft_plan(self, inter: discord.Interaction, 아이템: str, 수량: app_commands.Range[int,1,1_000_000] = 1):
+        if inter.guild is None:
+            return await send_err(inter, "서버에서만 사용 가능합니다.")
+        cid, uid = inter.guild.id, inter.user.id
+        cat = await catalog.get()
+        try:
+            g = graph_for(cat)
+        except RecipeCycleError as e:
+            return await send_err(inter, f"순환하는 레시피가 있습니다: {e}")
+        if not g.craftable(아이템):
+            return await send_err(inter, "해당 제작법이 없거나 비활성화되었습니다.")
+        qty = g.recipes[아이템].yield_qty * 수량
+
+        rows = await fetchall(
+            "SELECT item_id, qty FROM inventory WHERE country_id=$1 AND user_id=$2 AND qty>0",
+            (cid, uid)
         )
-        prod_name = await self._item_name(아이템)
-        await send_ok(inter, "제작 완료", f"**{prod_name} × {out_qty}** 제작을 마쳤습니다.\n(아이템은 NPC에게만 판매할 수 있습니다)")
+        inv = {r["item_id"]: int(r["qty"]) for r in rows}
+        plan = g.plan(아이템, qty, inv)
+        bom = ", ".join(f"{cat.name(k)}×{v}" for k, v in g.bom(아이템, qty))
+        steps = "\n".join(f"{i}. {cat.name(p)} × {n}회" for i, (p, n) in enumerate(plan.crafts, start=1))
+        lines = [
+            f"**{cat.name(아이템)} × {qty}** ({g.stages(아이템)}단계)",
+            f"원자재 총량: {bom}",
+            "",
+            "### 내 인벤토리 기준 제작 단계",
+            steps,
+        ]
+        if plan.ok:
+            lines.append("\n✅ 지금 바로 `연쇄:True`로 제작할 수 있습니다.")
+        else:
+            lines.append("\n부족: " + ", ".join(f"{cat.name(k)}×{v}" for k, v in plan.shortfall.items()))
+        lines.append(f"최대 제작 가능: **{g.max_craftable(아이템, inv) // g.recipes[아이템].yield_qty}회**")
+        await send_ok(inter, "제작 계획", "\n".join(lines), ephemeral=True)
 
-    @group.command(name="판매자원", description="자원을 NPC에게 판매합니다 (고정률 65%).")
+    @group.command(name="판매자원", description="자원을 NPC에게 판매합니다 (고정 매입률).")
     @app_commands.describe(아이템="판매할 자원", 수량="판매 수량")
     @app_commands.autocomplete(아이템=ac_resource_owned)
     async def sell_res(self, inter: discord.Interaction, 아이템: str, 수량: app_commands.Range[int,1,1_000_000]):
@@ -353,27 +414,21 @@ class Economy(commands.Cog):
         item = await fetchone("SELECT typ, base_price, name FROM items WHERE item_id=$1", (아이템,))
         if not item or item["typ"] != "resource":
             return await send_err(inter, "그것은 자원이 아닙니다.")
-        inv = await fetchone(
-            "SELECT qty FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id=$3",
-            (cid, uid, 아이템)
-        )
-        if not inv or inv["qty"] < 수량:
-            return await send_err(inter, "수량이 부족합니다.")
 
         # NPC 자원 매입: 고정 비율(세금 없음)
-        unit_price = round(int(item["base_price"]) * float(NPC_RESOURCE_RATE))
+        unit_price = gameconfig.for_country(cid).npc_unit_price(item["base_price"], "resource")
         total = unit_price * 수량
 
-        await execute("UPDATE inventory SET qty=qty-$1 WHERE country_id=$2 AND user_id=$3 AND item_id=$4",
-                      (수량, cid, uid, 아이템))
-        await execute("UPDATE users SET balance=balance+$1 WHERE country_id=$2 AND user_id=$3",
-                      (total, cid, uid))
+        async def settle(tx: Tx) -> Result:
+            if not await repository.get().sell(cid, uid, 아이템, 수량, unit_price, tx=tx):
+                return Result.fail("수량이 부족합니다.")
+            return Result(
+                "자원 판매",
+                f"**{item['name']} × {수량}**\n단가 **{unit_price} LC** → 합계 **{total} LC**\n"
+                f"지급 완료!"
+            )
 
-        await send_ok(
-            inter, "자원 판매",
-            f"**{item['name']} × {수량}**\n단가 **{unit_price} LC** → 합계 **{total} LC**\n"
-            f"지급 완료!"
-        )
+        await reply(inter, await run_once(inter, "길드 판매자원", settle))
 
     @group.command(name="판매아이템", description="제작 아이템을 NPC에게 판매합니다 (고정률·세금 고정).")
     @app_commands.describe(아이템="판매할 아이템", 수량="판매 수량")
@@ -381,8 +436,8 @@ class Economy(commands.Cog):
     async def sell_item(self, inter: discord.Interaction, 아이템: str, 수량: app_commands.Range[int,1,1_000_000]):
         """
         - 아이템은 NPC 전용 판매.
-        - 단가 = base_price * NPC_ITEM_RATE (고정)
-        - 세금 = 매각액 * NPC_ITEM_TAX → 국고로 귀속
+        - 단가 = base_price * npc_item_rate (국가 설정)
+        - 세금 = 매각액 * npc_item_tax → 국고로 귀속
         - 유저 수령액 = 매각액 - 세금
         """
         if inter.guild is None:
@@ -393,35 +448,91 @@ class Economy(commands.Cog):
         it = await fetchone("SELECT typ, base_price, name FROM items WHERE item_id=$1", (아이템,))
         if not it or it["typ"] != "item":
             return await send_err(inter, "그것은 제작 아이템이 아닙니다.")
-        inv = await fetchone(
-            "SELECT qty FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id=$3",
-            (cid, uid, 아이템)
-        )
-        if not inv or inv["qty"] < 수량:
-            return await send_err(inter, "수량이 부족합니다.")
 
-        unit_price = round(int(it["base_price"]) * float(NPC_ITEM_RATE))
+        cfg = gameconfig.for_country(cid)
+        unit_price = cfg.npc_unit_price(it["base_price"], "item")
         gross = unit_price * 수량
-        tax = round(gross * float(NPC_ITEM_TAX))
+        tax = cfg.npc_item_tax(gross)
         net = gross - tax
         if net < 0:
             net = 0
 
-        # 차감 / 지급 / 국고 세금 적립
-        await execute("UPDATE inventory SET qty=qty-$1 WHERE country_id=$2 AND user_id=$3 AND item_id=$4",
-                      (수량, cid, uid, 아이템))
-        await execute("UPDATE users SET balance=balance+$1 WHERE country_id=$2 AND user_id=$3",
-                      (net, cid, uid))
-        await execute("UPDATE countries SET treasury=treasury+$1 WHERE country_id=$2",
-                      (tax, cid))
+        # 차감 / 지급 / 국고 세금 적립을 한 트랜잭션에서
+        async def settle(tx: Tx) -> Result:
+            if not await repository.get().sell(cid, uid, 아이템, 수량, unit_price, tax=tax, tx=tx):
+                return Result.fail("수량이 부족합니다.")
+            return Result(
+                "아이템 판매",
+                f"**{it['name']} × {수량}**\n"
+                f"단가 **{unit_price} LC** → 매각액 **{gross} LC**\n"
+                f"세금 **{tax} LC** (국고 적립) → 수령액 **{net} LC**\n"
+                f"지급 완료!"
+            )
 
-        await send_ok(
-            inter, "아이템 판매",
-            f"**{it['name']} × {수량}**\n"
-            f"단가 **{unit_price} LC** → 매각액 **{gross} LC**\n"
-            f"세금 **{tax} LC** (국고 적립) → 수령액 **{net} LC**\n"
-            f"지급 완료!"
-        )
+        await reply(inter, await run_once(inter, "길드 판매아이템", settle))
+
+    @group.command(name="일괄판매", description="보유한 자원/아이템을 종류별로 한 번에 NPC에게 판매합니다.")
+    @app_commands.describe(분류="판매할 종류", 제외="판매하지 않고 남길 품목(선택)")
+    @app_commands.choices(분류=[
+        app_commands.Choice(name="자원 전부", value="resource"),
+        app_commands.Choice(name="아이템 전부", value="item"),
+        app_commands.Choice(name="전부", value="all"),
+    ])
+    @app_commands.autocomplete(제외=ac_owned_any)
+    async def sell_all(self, inter: discord.Interaction, 분류: app_commands.Choice[str], 제외: str | None = None):
+        """
+        단가는 캐시된 카탈로그 + 국가 설정(gameconfig)의 NPC 매입률로 계산하고, 한 트랜잭션에서
+        인벤토리 일괄 차감(DELETE … RETURNING) → 잔액 1회 → 국고 1회(+장부 1행)로 정산한다.
+        세금은 아이템 매각액 합계에만 npc_item_tax로 부과한다(자원은 면세, 단건 판매와 동일).
+        """
+        if inter.guild is None:
+            return await send_err(inter, "서버에서만 사용 가능합니다.")
+        cid, uid = inter.guild.id, inter.user.id
+        cat = await catalog.get()
+        cfg = gameconfig.for_country(cid)
+        unit = {
+            it.item_id: cfg.npc_unit_price(it.base_price, it.typ)
+            for it in cat.items.values()
+            if (분류.value == "all" or it.typ == 분류.value) and it.item_id != 제외
+        }
+        if not unit:
+            return await send_err(inter, "판매할 품목이 없습니다.")
+
+        async def settle(tx: Tx) -> Result:
+            rows = await tx.fetchall(
+                "DELETE FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id = ANY($3::text[]) "
+                "RETURNING item_id, qty",
+                (cid, uid, list(unit)),
+            )
+            sold = [(r["item_id"], int(r["qty"])) for r in rows if r["qty"] > 0]
+            if not sold:
+                return Result.fail("판매할 보유 품목이 없습니다.")
+            gross_res = sum(unit[i] * q for i, q in sold if cat.items[i].typ == "resource")
+            gross_itm = sum(unit[i] * q for i, q in sold if cat.items[i].typ == "item")
+            tax = cfg.npc_item_tax(gross_itm)
+            net = gross_res + gross_itm - tax
+            await tx.execute(
+                "INSERT INTO users(country_id,user_id,balance) VALUES ($1,$2,$3) "
+                "ON CONFLICT (country_id,user_id) DO UPDATE SET balance=users.balance+EXCLUDED.balance",
+                (cid, uid, net),
+            )
+            await repository.get().treasury_credit(cid, tax, "아이템 매입세", tx=tx)
+            tx.after_commit.append(lambda: users.note(cid, uid))
+
+            lines = [
+                f"• {cat.name(i)} × {q} @ {unit[i]} LC = **{unit[i] * q} LC**"
+                for i, q in sorted(sold, key=lambda x: -unit[x[0]] * x[1])
+            ]
+            if len(lines) > 20:
+                lines = lines[:20] + [f"… 외 {len(lines) - 20}종"]
+            summary = [f"자원 매각액 **{gross_res} LC**" if gross_res else "",
+                       f"아이템 매각액 **{gross_itm} LC** (세금 **{tax} LC** 국고 적립)" if gross_itm else ""]
+            return Result(
+                "일괄 판매",
+                "\n".join(lines) + "\n\n" + "\n".join(x for x in summary if x) + f"\n수령액 **{net} LC** 지급 완료!"
+            )
+
+        await reply(inter, await run_once(inter, "길드 일괄판매", settle, isolation="serializable"))
 
 
 async def setup(bot: commands.Bot):
@@ -1,26 +1,18 @@
 # cogs/government.py
 from __future__ import annotations
 import random
+from datetime import datetime, timedelta
 import discord
 from discord.ext import commands
 from discord import app_commands
 
-from utils.db import fetchone, execute
-from utils.embeds import send_ok, send_err
-from utils.constants import INITIAL_TREASURY, RESOURCE_TYPES  # land_defaults는 더 이상 사용하지 않음
-
-# -----------------------------
-# 토지 티어 정의 (1 ~ 5)
-# price: 지정 비용(국고 지출), upkeep: 주간 유지비, base_yield: 일일 최소 수확량(정보 표시용)
-# 실제 수확은 economy.py의 LAND_TIERS(yield_min~yield_max)로 결정됨. 여기선 일관성 위해 동일 수치 사용.
-LAND_TIERS = {
-    1: {"price": 5_000,   "upkeep": 1_000,  "base_yield": 2,  "yield_max": 4},
-    2: {"price": 15_000,  "upkeep": 3_000,  "base_yield": 4,  "yield_max": 6},
-    3: {"price": 30_000,  "upkeep": 6_000,  "base_yield": 6,  "yield_max": 9},
-    4: {"price": 60_000,  "upkeep": 12_000, "base_yield": 9,  "yield_max": 12},
-    5: {"price": 120_000, "upkeep": 25_000, "base_yield": 12, "yield_max": 16},
-}
-# -----------------------------
+from utils.db import fetchone, fetchall, execute
+from utils.embeds import parchment, send_embed, send_ok, send_err, sparkline
+from utils.timezone import KST
+from utils.treasury import TREASURY
+from utils import gameconfig
+from utils.constants import INITIAL_TREASURY, RESOURCE_TYPES
+
 
 def pick_resource_for_tier(tier: int) -> str:
     """
@@ -80,16 +72,65 @@ class Government(commands.Cog):
         )
         if not row:
             return await send_err(inter, "아직 왕국이 없습니다. `/왕국 국가생성`으로 시작하세요.")
-        await send_ok(
-            inter,
+        balance = row["treasury"] + TREASURY.pending_for(cid)
+
+        # 최근 장부 20건: (country_id, created_at DESC) 인덱스로 파티션별 역순 스캔
+        ledger = await fetchall(
+            "SELECT typ, reason, amount, created_at FROM treasury_ledger "
+            "WHERE country_id=$1 ORDER BY created_at DESC LIMIT 20",
+            (cid,),
+        )
+        history = [
+            f"`{r['created_at'].astimezone(KST):%m-%d %H:%M}` "
+            f"{'🟢 +' if r['typ'] == 'in' else '🔴 -'}{r['amount']:,} LC · {r['reason']}"
+            for r in ledger
+        ]
+
+        # 현금흐름: 일별 집계(treasury_daily)만 읽으므로 장부 규모와 무관하게 O(일수×사유)
+        # day는 DB 시계(KST 변환), today는 봇 시계 — 자정 무렵이나 시계 차로 내일 행이 있을 수 있어 위도 막는다
+        today = datetime.now(KST).date()
+        since = today - timedelta(days=29)
+        daily = await fetchall(
+            "SELECT day, reason, income, expense FROM treasury_daily "
+            "WHERE country_id=$1 AND day >= $2 AND day <= $3",
+            (cid, since, today),
+        )
+        net_by_day = [0] * 30
+        flows: dict[int, dict[str, list[int]]] = {7: {}, 30: {}}
+        for r in daily:
+            idx = (r["day"] - since).days
+            net_by_day[idx] += r["income"] - r["expense"]
+            for span, acc in flows.items():
+                if idx >= 30 - span:
+                    inc_exp = acc.setdefault(r["reason"], [0, 0])
+                    inc_exp[0] += r["income"]
+                    inc_exp[1] += r["expense"]
+
+        cfg = gameconfig.for_country(cid)
+        emb = parchment(
             "국고 현황",
             f"왕국: **{row['name']}**\n"
-            f"금고: **{row['treasury']:,} LC**\n\n"
+            f"금고: **{balance:,} LC**\n\n"
             f"정책치(변경 가능):\n"
             f"• 시장세: **{row['market_tax_bp']/100:.2f}%**\n\n"
             f"NPC(고정):\n"
-            f"• 자원 매입률 65% • 아이템 매입률 95% • 아이템 매입세 5%",
+            f"• 자원 매입률 {cfg.resource_rate:.0%} • 아이템 매입률 {cfg.item_rate:.0%} "
+            f"• 아이템 매입세 {cfg.item_tax_rate:.0%}\n\n"
+            f"### 최근 내역\n" + ("\n".join(history) if history else "기록 없음"),
+        )
+        for span, acc in flows.items():
+            inc = sum(v[0] for v in acc.values())
+            exp = sum(v[1] for v in acc.values())
+            lines = [f"수입 **{inc:,}** · 지출 **{exp:,}** · 순 **{inc - exp:+,} LC**"]
+            for reason, (i, e) in sorted(acc.items(), key=lambda kv: -(kv[1][0] + kv[1][1])):
+                lines.append(f"• {reason}: +{i:,} / -{e:,}")
+            emb.add_field(name=f"최근 {span}일 현금흐름", value="\n".join(lines)[:1024], inline=True)
+        emb.add_field(
+            name="30일 순흐름",
+            value=f"`{sparkline(net_by_day)}`\n{since:%m-%d} → {today:%m-%d}",
+            inline=False,
         )
+        await send_embed(inter, emb)
 
     @group.command(name="정책설정", description="왕국의 시장세를 조정합니다. (관리자 전용)")
     @app_commands.describe(시장세bp="0~10000 사이 (500=5.00%)")
@@ -122,31 +163,30 @@ class Government(commands.Cog):
         if exist:
             return await send_err(inter, "이미 이 채널은 토지로 지정되어 있습니다.")
 
-        # 티어 설정
-        conf = LAND_TIERS[int(티어)]
-        cost = conf["price"]
-        upkeep = conf["upkeep"]
-        base_yield = conf["base_yield"]
+        # 티어 설정 (국가별 덮어쓰기 반영)
+        conf = gameconfig.for_country(cid).tiers.get(int(티어))
+        if conf is None:
+            return await send_err(inter, "이 왕국에서 쓸 수 없는 티어입니다.")
+        cost = conf.price
+        upkeep = conf.upkeep
+        base_yield = conf.yield_min
 
-        if country["treasury"] < cost:
+        if country["treasury"] + TREASURY.pending_for(cid) < cost:
             return await send_err(inter, f"국고가 부족합니다. (필요: {cost:,} LC)")
 
         # 자원 편향 배정 (티어 가중)
         bias = pick_resource_for_tier(int(티어))
 
-        # 국고 차감 + 장부 기록 + 토지 생성
-        await execute("UPDATE countries SET treasury=treasury-$1 WHERE country_id=$2", (cost, cid))
-        await execute(
-            "INSERT INTO treasury_ledger(country_id,typ,reason,amount) VALUES($1,'out','토지 지정 비용',$2)",
-            (cid, cost),
-        )
+        # 국고 차감 + 장부 기록 (잔액 조건부) → 토지 생성
+        if not await TREASURY.debit(cid, cost, "토지 지정 비용"):
+            return await send_err(inter, f"국고가 부족합니다. (필요: {cost:,} LC)")
         await execute(
             "INSERT INTO lands(country_id,channel_id,tier,resource_bias,base_yield,upkeep_weekly) "
             "VALUES ($1,$2,$3,$4,$5,$6)",
             (cid, inter.channel_id, int(티어), bias, base_yield, upkeep),
         )
 
-        yield_max = conf["yield_max"]
+        yield_max = conf.yield_max
         await send_ok(
             inter,
             "토지 지정",
@@ -171,9 +211,9 @@ class Government(commands.Cog):
             return await send_err(inter, "이 채널은 토지가 아닙니다. `/왕국 토지 지정`으로 지정할 수 있습니다.")
 
         tier = int(row["tier"])
-        conf = LAND_TIERS.get(tier, LAND_TIERS[1])
-        yield_min = conf["base_yield"]
-        yield_max = conf["yield_max"]
+        conf = gameconfig.for_country(cid).tier(tier)
+        yield_min = conf.yield_min
+        yield_max = conf.yield_max
 
         await send_ok(
             inter,
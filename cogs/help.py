@@ -14,14 +14,19 @@ HELP_INDEX: Dict[str, Dict[str, str]] = {
     },
     "경제": {
         "정산": "토지 채널에서 하루 1회 자원을 수령합니다.",
+        "미수확": "오늘 아직 수확하지 않은 토지 채널을 보여줍니다.",
         "레시피목록": "제작 가능한 레시피 목록을 보여줍니다.",
         "레시피상세": "특정 레시피의 재료와 산출물을 보여줍니다.",
+        "제작계획": "다단계 제작의 원자재 총량과 최대 제작 가능 수량을 계산합니다.",
+        "일괄판매": "자원/아이템을 종류별로 한 번에 NPC에게 판매합니다.",
     },
     "상점": {
         "상점등록": "자원을 상점에 등록하여 판매합니다.",
         "상점목록": "등록된 매물과 시세를 확인합니다.",
         "상점구매": "고유코드로 상점 매물을 구매합니다.",
         "상점취소": "본인이 등록한 매물을 취소합니다.",
+        "상점세계시세": "모든 왕국을 합친 매물량·최저가·24시간 거래량을 봅니다.",
+        "상점알림": "기준가 이하 매물이 나오면 DM으로 알려줍니다.",
     },
     "순위": {
         "순위 국가": "국가(서버) 국고 순위",
@@ -30,8 +35,12 @@ HELP_INDEX: Dict[str, Dict[str, str]] = {
     },
     "기타": {
         "시세": "자원/아이템 시세(전체 또는 단일)를 확인합니다.",
+        "시세차트": "아이템의 일별 시세(EMA)·거래량 차트를 봅니다.",
         "국고": "국고 잔액 및 최근 내역을 확인합니다.",
-    }
+    },
+    "관리": {
+        "관리 성능": "명령별 지연과 DB 왕복 수를 확인합니다. (관리자)",
+    },
 }
 
 # 개별 상세 설명(있는 경우)
@@ -39,17 +48,24 @@ DETAILS: Dict[str, str] = {
     "국가생성": "서버를 국가로 등록합니다. 초기에 국고가 지급되며 세율 등 기본 설정이 적용됩니다.",
     "토지지정": "현재 채널을 '토지'로 지정합니다. 국가 국고에서 비용이 차감되며 자원은 랜덤으로 정해집니다.",
     "정산": "토지 채널에서 하루 1회 자원을 수령합니다. (채널별 1회)",
+    "미수확": "`/길드 미수확` — 오늘 아직 `/길드 정산`을 하지 않은 토지 채널을 티어 높은 순으로 보여줍니다.",
     "레시피목록": "제작 가능한 아이템 목록을 표시합니다.",
     "레시피상세": "`/레시피상세 <아이템>` 형태로 사용하세요. 입력은 자동완성을 지원합니다.",
+    "제작계획": "`/길드 제작계획 <아이템> <수량>` — 중간재까지 펼친 원자재 총량, 내 재고 기준 제작 단계, 최대 제작 가능 횟수를 보여줍니다. `/길드 제작 연쇄:True`로 한 번에 제작할 수 있습니다.",
+    "일괄판매": "`/길드 일괄판매 <분류> [제외]` — 자원 전부/아이템 전부/전부를 NPC 고정률로 한 번에 팝니다. `제외`로 남길 품목 하나를 고를 수 있습니다. 아이템 매각액에는 매입세가 붙어 국고로 갑니다.",
     "상점등록": "보유 자원을 상점에 등록합니다. 수수료/세금이 부과되며 시세에 영향을 줍니다.",
-    "상점목록": "현재 등록된 매물을 종류·가격순으로 보여줍니다.",
+    "상점목록": "`/상점 목록 <아이템> [보기]` — 매물을 가격·등록순으로 10건씩 보여줍니다. ◀ ▶ 버튼으로 넘기고, `호가 깊이` 버튼이나 `보기:호가 깊이`로 가격대별 수량을 봅니다. 몇 초 단위로 캐시됩니다.",
     "상점구매": "매물 고유코드로 구매합니다. 확인 메시지 후 결제됩니다.",
     "상점취소": "판매자가 자신의 매물을 취소합니다.",
+    "상점알림": "`/상점 알림 <아이템> <가격>` — 이 왕국에 그 가격 이하 매물이 새로 올라오거나 일일 시세(EMA)가 그 아래로 확정되면 DM을 한 번 보냅니다. 품목당 1개, 최대 10개. `/상점 알림목록`, `/상점 알림해제`로 관리합니다.",
+    "상점세계시세": "전 왕국 통합 요약입니다. 몇 분 주기로 갱신되며, `/길드 시세`의 '세계 참고가'도 여기서 나옵니다.",
     "순위 국가": "국가(서버)의 국고 잔액 기준 순위입니다.",
     "순위 개인": "모든 서버 통합 개인 잔액 기준 순위입니다.",
     "순위 서버": "현재 서버(국가) 내 개인 잔액 기준 순위입니다.",
     "시세": "자원/아이템의 시세(EMA 기반)를 보여줍니다. 지정 없으면 전체 시세.",
+    "시세차트": "`/길드 시세차트 <아이템>` — 최근 90일 평균가/EMA와 거래량을 PNG 차트로 보여줍니다. 하루 시세는 KST 자정 이후 확정됩니다.",
     "국고": "국고 잔액 및 최근 입출 내역을 임베드로 표시합니다.",
+    "관리 성능": "명령별 p50/p95/p99 지연과 호출당 DB 왕복 수·DB 시간을 보여줍니다. `프로메테우스:True`면 텍스트 덤프 파일로 받습니다.",
 }
 
 COMMAND_CHOICES: List[str] = [name for section in HELP_INDEX.values() for name in section.keys()]
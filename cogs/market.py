@@ -1,9 +1,78 @@
+from typing import Optional
+
 import discord
 from discord.ext import commands
 from discord import app_commands
 
-from utils.db import fetchone, fetchall, execute
-from utils.embeds import send_ok, send_err
+from utils.db import Tx, fetchone, fetchall, transaction
+from utils import alerts, catalog, market_global, orderbook, repository
+from utils.embeds import parchment, send_embed, send_ok, send_err
+from utils.idempotency import Result, reply, run_once
+from utils.timezone import KST
+
+
+PAGE_SIZE=10
+
+
+class BookView(discord.ui.View):
+    """호가창 페이지 넘김. 이전 페이지로 돌아가기 위해 각 페이지의 시작 커서를 쌓아 둔다"""
+
+    def __init__(self, owner_id:int, cid:int, item_id:str, name:str, *, depth:bool=False):
+        super().__init__(timeout=180)
+        self.owner_id,self.cid,self.item_id,self.name,self.depth=owner_id,cid,item_id,name,depth
+        self.starts:list[Optional[orderbook.Cursor]]=[None]   # starts[-1] = 현재 페이지 시작 커서
+        self.next_cursor:Optional[orderbook.Cursor]=None
+        self.message:Optional[discord.Message]=None
+
+    async def interaction_check(self, inter:discord.Interaction)->bool:
+        if inter.user.id!=self.owner_id:
+            await send_err(inter,"명령을 실행한 사람만 넘길 수 있습니다.")
+            return False
+        return True
+
+    async def render(self)->Optional[discord.Embed]:
+        book,rows,has_next=await orderbook.page(self.cid,self.item_id,self.starts[-1],PAGE_SIZE)
+        if not book.total_listings: return None
+        self.next_cursor=rows[-1].cursor if has_next and rows else None
+        if self.depth:
+            top=max((q for _,q,_ in book.levels),default=1)
+            lines=[f"`{p:>6}LC` {'█'*max(1,round(q*12/top))} {q}개 ({n}건)" for p,q,n in book.levels]
+            title=f"{self.name} 호가 깊이"
+        else:
+            lines=[f"• ID {li.listing_id} | 판매자 <@{li.seller_id}> | {self.name}×{li.qty} | {li.unit_price}LC" for li in rows]
+            title=f"{self.name} 매물"
+        page_no=f"{len(self.starts)}쪽 · " if not self.depth else ""
+        footer=f"{page_no}총 {book.total_listings}건 / {book.total_qty}개 · {book.age:.0f}초 전 기준"
+        self.prev_btn.disabled=self.depth or len(self.starts)==1
+        self.next_btn.disabled=self.depth or self.next_cursor is None
+        self.mode_btn.label="매물 목록" if self.depth else "호가 깊이"
+        return parchment(title,"\n".join(lines) or "이 쪽에는 매물이 없습니다.",footer=footer)
+
+    async def _refresh(self, inter:discord.Interaction):
+        emb=await self.render()
+        if emb is None:
+            return await inter.response.edit_message(embed=parchment("상점",f"{self.name} 매물이 없습니다."),view=None)
+        await inter.response.edit_message(embed=emb,view=self)
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary)
+    async def prev_btn(self, inter:discord.Interaction, button:discord.ui.Button):
+        if len(self.starts)>1: self.starts.pop()
+        await self._refresh(inter)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary)
+    async def next_btn(self, inter:discord.Interaction, button:discord.ui.Button):
+        if self.next_cursor is not None: self.starts.append(self.next_cursor)
+        await self._refresh(inter)
+
+    @discord.ui.button(label="호가 깊이", style=discord.ButtonStyle.primary)
+    async def mode_btn(self, inter:discord.Interaction, button:discord.ui.Button):
+        self.depth=not self.depth
+        await self._refresh(inter)
+
+    async def on_timeout(self):
+        if self.message is not None:
+            try: await self.message.edit(view=None)
+            except discord.HTTPException: pass
 
 
 class Market(commands.Cog):
@@ -41,53 +110,44 @@ class Market(commands.Cog):
     @app_commands.autocomplete(아이템=ac_inv_any)
     async def register(self, inter:discord.Interaction, 아이템:str, 수량:int, 단가:int):
         cid,uid=inter.guild.id,inter.user.id
-        inv=await fetchone("SELECT qty FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id=$3",(cid,uid,아이템))
-        if not inv or inv["qty"]<수량:
+        lid=await repository.get().register(cid,uid,아이템,수량,단가)
+        if lid is None:
             return await send_err(inter,"재고 부족")
-        await execute("UPDATE inventory SET qty=qty-$1 WHERE country_id=$2 AND user_id=$3 AND item_id=$4",(수량,cid,uid,아이템))
-        row=await fetchone("INSERT INTO listings(country_id,seller_id,resource_id,qty,unit_price) VALUES ($1,$2,$3,$4,$5) RETURNING listing_id",(cid,uid,아이템,수량,단가))
+        orderbook.invalidate(cid,아이템)
+        await alerts.on_ask(cid,아이템,단가,uid)
         prod=await fetchone("SELECT name FROM items WHERE item_id=$1",(아이템,))
         nm=prod["name"] if prod else 아이템
-        await send_ok(inter,"상점 등록",f"등록ID {row['listing_id']}\n품목: {nm}\n수량 {수량} 단가 {단가}LC")
+        await send_ok(inter,"상점 등록",f"등록ID {lid}\n품목: {nm}\n수량 {수량} 단가 {단가}LC")
 
     @group.command(name="목록", description="특정 아이템의 매물을 확인합니다.")
+    @app_commands.describe(아이템="조회할 아이템", 보기="매물 목록 또는 가격대별 깊이")
+    @app_commands.choices(보기=[
+        app_commands.Choice(name="매물", value="list"),
+        app_commands.Choice(name="호가 깊이", value="depth"),
+    ])
     @app_commands.autocomplete(아이템=ac_item_any)
-    async def list_open(self, inter:discord.Interaction, 아이템:str):
+    async def list_open(self, inter:discord.Interaction, 아이템:str, 보기:str="list"):
         cid=inter.guild.id
-        rows=await fetchall("SELECT listing_id,seller_id,qty,unit_price FROM listings WHERE country_id=$1 AND resource_id=$2 AND status='open' ORDER BY unit_price ASC",(cid,아이템))
-        prod=await fetchone("SELECT name FROM items WHERE item_id=$1",(아이템,))
-        nm=prod["name"] if prod else 아이템
-        if not rows: return await send_ok(inter,"상점",f"{nm} 매물이 없습니다.")
-        lines=[f"• ID {r['listing_id']} | 판매자 <@{r['seller_id']}> | {nm}×{r['qty']} | {r['unit_price']}LC" for r in rows]
-        await send_ok(inter,"상점 매물","\n".join(lines))
+        nm=(await catalog.get()).name(아이템)
+        view=BookView(inter.user.id,cid,아이템,nm,depth=(보기=="depth"))
+        emb=await view.render()
+        if emb is None: return await send_ok(inter,"상점",f"{nm} 매물이 없습니다.")
+        await send_embed(inter,emb,view=view)
+        view.message=await inter.original_response()
 
     @group.command(name="구매", description="상점에서 매물을 구매합니다.")
-    async def buy(self, inter:discord.Interaction, 코드:int, 수량:int):
+    async def buy(self, inter:discord.Interaction, 코드:int, 수량:app_commands.Range[int,1,1_000_000]):
         cid,uid=inter.guild.id,inter.user.id
-        li=await fetchone("SELECT * FROM listings WHERE listing_id=$1 AND country_id=$2 AND status='open'",(코드,cid))
-        if not li: return await send_err(inter,"해당 매물이 없습니다.")
-        if 수량>li["qty"]: return await send_err(inter,"수량 부족")
-
-        prod=await fetchone("SELECT name FROM items WHERE item_id=$1",(li["resource_id"],))
-        nm=prod["name"] if prod else li["resource_id"]
+        cat=await catalog.get()
 
-        # 금액 계산
-        cost = li["unit_price"]*수량
-        buyer = await fetchone("SELECT balance FROM users WHERE country_id=$1 AND user_id=$2",(cid,uid))
-        if not buyer or buyer["balance"]<cost:
-            return await send_err(inter,"잔액 부족")
+        async def settle(tx:Tx)->Result:
+            # 검사는 모두 쓰기 전이므로 실패하면 이 트랜잭션엔 멱등 키만 남는다
+            try: p=await repository.get().buy(cid,uid,코드,수량,tx=tx)
+            except repository.TradeError as e: return Result.fail(str(e))
+            tx.after_commit.append(lambda:orderbook.invalidate(cid,p.item_id))
+            return Result("구매",f"{cat.name(p.item_id)}×{수량} 구매 완료 (ID {코드})\n지불: {p.cost}LC")
 
-        # 차감/증가 처리
-        await execute("UPDATE users SET balance=balance-$1 WHERE country_id=$2 AND user_id=$3",(cost,cid,uid))
-        await execute("UPDATE users SET balance=balance+$1 WHERE country_id=$2 AND user_id=$3",(cost,cid,li["seller_id"]))
-        # 재고 이동
-        await execute("INSERT INTO inventory(country_id,user_id,item_id,qty) VALUES ($1,$2,$3,$4) "
-                      "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty=inventory.qty+$4",
-                      (cid,uid,li["resource_id"],수량))
-        await execute("UPDATE listings SET qty=qty-$1 WHERE listing_id=$2",(수량,li["listing_id"]))
-        await execute("DELETE FROM listings WHERE listing_id=$1 AND qty<=0",(li["listing_id"],))
-
-        await send_ok(inter,"구매",f"{nm}×{수량} 구매 완료 (ID {코드})\n지불: {cost}LC")
+        await reply(inter,await run_once(inter,"상점 구매",settle,isolation="serializable"))
 
     @group.command(name="취소", description="내 상점 매물을 취소합니다.")
     async def cancel(self, inter:discord.Interaction, 코드:int):
@@ -96,15 +156,63 @@ class Market(commands.Cog):
         if not li: return await send_err(inter,"없음")
         if li["seller_id"]!=uid: return await send_err(inter,"본인 매물만 취소 가능")
 
-        await execute("UPDATE listings SET status='cancelled' WHERE listing_id=$1",(코드,))
-        await execute("INSERT INTO inventory(country_id,user_id,item_id,qty) VALUES ($1,$2,$3,$4) "
-                      "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty=inventory.qty+$4",
-                      (cid,uid,li["resource_id"],li["qty"]))
+        # open일 때만 취소 → 이미 팔렸거나 취소된 매물로 재고가 다시 돌아오지 않게
+        async with transaction() as tx:
+            qty=await tx.fetchval("UPDATE listings SET status='cancelled' WHERE listing_id=$1 AND status='open' RETURNING qty",(코드,))
+            if qty is not None:
+                await tx.execute("INSERT INTO inventory(country_id,user_id,item_id,qty) VALUES ($1,$2,$3,$4) "
+                                 "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty=inventory.qty+$4",
+                                 (cid,uid,li["resource_id"],qty))
+        if qty is None: return await send_err(inter,"이미 판매되었거나 취소된 매물입니다.")
+        orderbook.invalidate(cid,li["resource_id"])
 
         prod=await fetchone("SELECT name FROM items WHERE item_id=$1",(li["resource_id"],))
         nm=prod["name"] if prod else li["resource_id"]
         await send_ok(inter,"상점 취소",f"{nm}×{li['qty']} 취소 완료 (ID {코드})")
 
+    @group.command(name="알림", description="매물이 기준가 이하로 나오면 DM으로 알려줍니다.")
+    @app_commands.describe(아이템="알림 받을 아이템", 가격="이 가격(LC) 이하의 매물/일일 시세가 나오면 알림")
+    @app_commands.autocomplete(아이템=ac_item_any)
+    async def alert_set(self, inter:discord.Interaction, 아이템:str, 가격:app_commands.Range[int,1,10_000_000]):
+        cid,uid=inter.guild.id,inter.user.id
+        cat=await catalog.get()
+        if 아이템 not in cat.items: return await send_err(inter,"없는 아이템입니다.")
+        book=await orderbook.get(cid,아이템)
+        if book.rows and book.rows[0].unit_price<=가격:
+            return await send_err(inter,f"이미 {book.rows[0].unit_price}LC 매물이 있습니다. `/상점 목록`을 확인하세요.")
+        if not await alerts.subscribe(cid,uid,아이템,가격):
+            return await send_err(inter,f"알림은 최대 {alerts.MAX_PER_USER}개까지 설정할 수 있습니다.")
+        await send_ok(inter,"가격 알림",f"{cat.name(아이템)} — {가격}LC 이하 매물이 나오면 DM으로 알려드립니다. (1회)",ephemeral=True)
+
+    @group.command(name="알림목록", description="설정한 가격 알림을 확인합니다.")
+    async def alert_list(self, inter:discord.Interaction):
+        rows=await alerts.list_for(inter.guild.id,inter.user.id)
+        if not rows: return await send_ok(inter,"가격 알림","설정된 알림이 없습니다.",ephemeral=True)
+        cat=await catalog.get()
+        lines=[f"• {cat.name(r['item_id'])} ≤ {r['threshold']}LC" for r in rows]
+        await send_ok(inter,f"가격 알림 ({len(rows)}/{alerts.MAX_PER_USER})","\n".join(lines),ephemeral=True)
+
+    @group.command(name="알림해제", description="가격 알림을 해제합니다.")
+    @app_commands.autocomplete(아이템=ac_item_any)
+    async def alert_clear(self, inter:discord.Interaction, 아이템:str):
+        if not await alerts.unsubscribe(inter.guild.id,inter.user.id,아이템):
+            return await send_err(inter,"해당 아이템의 알림이 없습니다.")
+        await send_ok(inter,"가격 알림",f"{(await catalog.get()).name(아이템)} 알림을 해제했습니다.",ephemeral=True)
+
+    @group.command(name="세계시세", description="모든 왕국의 매물/거래를 합친 통합 시세를 확인합니다.")
+    async def global_summary(self, inter:discord.Interaction):
+        rows=market_global.all_items()
+        if not rows: return await send_ok(inter,"세계 시장","아직 집계된 데이터가 없습니다.")
+        names={r["item_id"]:r["name"] for r in await fetchall("SELECT item_id,name FROM items")}
+        lines=[]
+        for r in sorted(rows,key=lambda r:(-r["volume_24h"],r["item_id"])):
+            ask=f"{r['best_ask']}LC" if r["best_ask"] else "-"
+            vwap=f"{r['vwap_24h']}LC" if r["vwap_24h"] else "-"
+            lines.append(f"• {names.get(r['item_id'],r['item_id'])} | 매물 {r['open_qty']}개({r['countries']}개국) | 최저가 {ask} | 24h 거래 {r['volume_24h']}개 @ {vwap}")
+        at=market_global.refreshed_at
+        footer=f"갱신: {at.astimezone(KST):%m-%d %H:%M} (주기 {market_global.REFRESH_INTERVAL//60}분)" if at else None
+        await send_embed(inter,parchment("세계 시장","\n".join(lines),footer=footer))
+
 
 async def setup(bot:commands.Bot):
     await bot.add_cog(Market(bot))
@@ -4,7 +4,7 @@ from discord import app_commands
 from discord.ext import commands
 from typing import Optional, List, Tuple
 
-from utils.db import fetchall
+from utils import repository
 
 RANK_COLOR = 0xC9A227  # 중세 금색 톤
 
@@ -30,15 +30,7 @@ class Rankings(commands.Cog):
     @app_commands.describe(개수="가져올 순위 개수 (기본 10, 1~25)")
     async def rank_countries(self, interaction: discord.Interaction, 개수: Optional[int] = 10):
         limit = max(1, min(개수 or 10, 25))
-        rows = await fetchall(
-            """
-            SELECT name, country_id, treasury
-            FROM countries
-            ORDER BY treasury DESC, country_id ASC
-            LIMIT $1
-            """,
-            (limit,),
-        )
+        rows = await repository.get().rank_countries(limit)
         e = discord.Embed(
             title="🏰 국가 순위 (국고)",
             description=f"국고 잔액이 많은 국가 순입니다. (상위 {limit}개)",
@@ -50,9 +42,7 @@ class Rankings(commands.Cog):
             return
 
         lines: List[str] = []
-        for i, r in enumerate(rows, start=1):
-            name = r["name"]
-            amount = r["treasury"]
+        for i, (_, name, amount) in enumerate(rows, start=1):
             lines.append(f"**{i}.** `{name}` — **{fmt_lc(amount)}**")
         e.add_field(name="순위", value="\n".join(lines), inline=False)
         await interaction.response.send_message(embed=e)
@@ -62,16 +52,7 @@ class Rankings(commands.Cog):
     @app_commands.describe(개수="가져올 순위 개수 (기본 10, 1~25)")
     async def rank_users_global(self, interaction: discord.Interaction, 개수: Optional[int] = 10):
         limit = max(1, min(개수 or 10, 25))
-        rows = await fetchall(
-            """
-            SELECT u.country_id, u.user_id, u.balance, c.name AS country_name
-            FROM users u
-            JOIN countries c ON c.country_id = u.country_id
-            ORDER BY u.balance DESC, u.user_id ASC
-            LIMIT $1
-            """,
-            (limit,),
-        )
+        rows = await repository.get().rank_users(None, limit)
         e = discord.Embed(
             title="👑 개인 순위 (글로벌)",
             description=f"개인 잔액이 많은 순입니다. (상위 {limit}명)",
@@ -89,10 +70,8 @@ class Rankings(commands.Cog):
 
         lines: List[str] = []
         for i, r in enumerate(rows, start=1):
-            user_disp = mention_or_id(r["user_id"])
-            bal = r["balance"]
-            cname = r["country_name"]
-            lines.append(f"**{i}.** {user_disp} — **{fmt_lc(bal)}** · `{cname}`")
+            user_disp = mention_or_id(r.user_id)
+            lines.append(f"**{i}.** {user_disp} — **{fmt_lc(r.balance)}** · `{r.country_name}`")
         e.add_field(name="순위", value="\n".join(lines), inline=False)
         await interaction.response.send_message(embed=e)
 
@@ -102,16 +81,7 @@ class Rankings(commands.Cog):
     async def rank_server_local(self, interaction: discord.Interaction, 개수: Optional[int] = 10):
         limit = max(1, min(개수 or 10, 25))
         gid = interaction.guild_id
-        rows = await fetchall(
-            """
-            SELECT user_id, balance
-            FROM users
-            WHERE country_id = $1
-            ORDER BY balance DESC, user_id ASC
-            LIMIT $2
-            """,
-            (gid, limit),
-        )
+        rows = await repository.get().rank_users(gid, limit)
         e = discord.Embed(
             title="🏹 서버 개인 순위",
             description=f"이 서버(국가) 내 개인 잔액 순입니다. (상위 {limit}명)",
@@ -125,9 +95,9 @@ class Rankings(commands.Cog):
 
         lines: List[str] = []
         for i, r in enumerate(rows, start=1):
-            member = interaction.guild.get_member(int(r["user_id"])) if interaction.guild else None
-            name = member.mention if member else f"`{r['user_id']}`"
-            lines.append(f"**{i}.** {name} — **{fmt_lc(r['balance'])}**")
+            member = interaction.guild.get_member(r.user_id) if interaction.guild else None
+            name = member.mention if member else f"`{r.user_id}`"
+            lines.append(f"**{i}.** {name} — **{fmt_lc(r.balance)}**")
 
         e.add_field(name="순위", value="\n".join(lines), inline=False)
         await interaction.response.send_message(embed=e)
@@ -5,16 +5,25 @@ import discord
 from discord.ext import commands
 import psycopg2
 from dotenv import load_dotenv
-from utils.db import init_db
 
+# utils.* 싱글턴들이 import 시점에 환경변수를 읽으므로 가장 먼저 로드
 load_dotenv()
 
+from utils.db import init_db
+from utils.log import setup_logging, shutdown_logging, get_logger
+from utils.tree import KingdomTree
+from utils.watchdog import WATCHDOG
+from utils.treasury import TREASURY
+from utils import alerts, charts, claims, departures, gameconfig, idempotency, invalidation, inventory, market_global, partitions, prices, ratelimit, users
+
+log = get_logger("main")
+
 class AClient(commands.Bot):
     def __init__(self):
         intents = discord.Intents.default()
         intents.members = True  # Server Members Intent (필요 시 개발자 포털에서 활성화)
 
-        super().__init__(command_prefix="!", intents=intents)
+        super().__init__(command_prefix="!", intents=intents, tree_cls=KingdomTree)
         self.synced = False
         self.start_time = datetime.datetime.utcnow()  # 업타임 기준(UTC)
 
@@ -34,6 +43,19 @@ class AClient(commands.Bot):
     async def setup_hook(self):
         # 코그 로드
         await init_db()
+        # 다른 봇 프로세스와 캐시 무효화 이벤트 주고받기 (INVAL_BUS=0이면 끔)
+        self.loop.create_task(invalidation.run_job())
+        # 게임 밸런스 설정 (기본값 + game_config 덮어쓰기). 이후 버전이 바뀔 때만 다시 읽음
+        try:
+            await gameconfig.load()
+        except Exception:
+            log.exception("게임 설정 로드 실패 — 기본값 사용")
+        self.loop.create_task(gameconfig.run_job())
+        # 최근 활동 유저로 users 존재 캐시 예열 (실패해도 lazy하게 채워짐)
+        try:
+            await users.warm()
+        except Exception:
+            log.exception("유저 캐시 예열 실패")
         for filename in os.listdir("./cogs"):
             if filename.endswith(".py"):
                 await self.load_extension(f"cogs.{filename[:-3]}")
@@ -45,21 +67,61 @@ class AClient(commands.Bot):
 
         # 상태 업데이트를 백그라운드 태스크로 시작
         self.loop.create_task(self.update_status())
+        # 차트 워커 기동 + matplotlib 적재 (첫 시세차트 요청이 기다리지 않게)
+        self.loop.create_task(charts.warm())
+        # 이벤트 루프 지연 감시
+        self.loop.create_task(WATCHDOG.run())
+        # 국고 입금 일괄 반영 (TREASURY_COALESCE=1일 때만 동작)
+        self.loop.create_task(TREASURY.run())
+        # 장부/거래 월 파티션 선생성 + 보존 정책
+        self.loop.create_task(partitions.run_job())
+        # 일일 시세(EMA) 확정 — 확정 직후 가격 알림 평가
+        prices.on_day_closed.append(alerts.on_day_closed)
+        self.loop.create_task(prices.run_job())
+        # 가격 알림 DM 일괄 발송
+        self.loop.create_task(alerts.run_job(self))
+        # 전 국가 통합 시장 요약 갱신
+        self.loop.create_task(market_global.run_job())
+        # 인벤토리 0수량 행 정리 + CHECK(qty>=0) 검증
+        self.loop.create_task(inventory.run_job())
+        # 만료된 멱등 키 정리
+        self.loop.create_task(idempotency.run_job())
+        # 공유 속도 제한 버킷 정리 (RATE_LIMIT_BACKEND=postgres일 때만 동작)
+        self.loop.create_task(ratelimit.run_job())
+        # 보존 기간 지난 수확 기록 정리
+        self.loop.create_task(claims.run_job())
+        # 떠난 길드 데이터: 유예 뒤 나눠서 삭제
+        self.loop.create_task(departures.run_job(self))
 
-        print("✅ 준비 완료")
+        log.info("✅ 준비 완료")
+
+    async def close(self):
+        WATCHDOG.stop()
+        # 버퍼에 남은 국고 입금을 먼저 반영
+        await TREASURY.close()
+        charts.shutdown()
+        await super().close()
 
     async def on_ready(self):
-        print(f"✅ {self.user} 로그인 완료")
+        log.info("✅ 로그인 완료", extra={"bot_user": str(self.user)})
         # 로그인 직후 1회 즉시 상태 갱신
         await self.set_presence_once()
 
     async def on_guild_join(self, guild: discord.Guild):
-        # 서버 추가 시 즉시 상태 갱신
+        # 서버 추가 시 즉시 상태 갱신. 유예 중이던 국가면 삭제 예약 해제
         await self.set_presence_once()
+        try:
+            await departures.unmark(guild.id)
+        except Exception:
+            log.exception("삭제 예약 해제 실패", extra={"guild": guild.id})
 
     async def on_guild_remove(self, guild: discord.Guild):
-        # 서버 제거 시 즉시 상태 갱신
+        # 서버 제거 시 즉시 상태 갱신. 데이터는 바로 지우지 않고 표시만 (utils/departures.py)
         await self.set_presence_once()
+        try:
+            await departures.mark(guild.id)
+        except Exception:
+            log.exception("떠난 국가 표시 실패", extra={"guild": guild.id})
 
     async def set_presence_once(self):
         """상태 메시지를 즉시 한 번 갱신"""
@@ -69,8 +131,8 @@ class AClient(commands.Bot):
             text = f"🏰 {guild_count} kingdoms | ⏱ {self.format_uptime(uptime)}"
             # Game 상태(원하면 ActivityType.watching 등으로 변경 가능)
             await self.change_presence(activity=discord.Game(text))
-        except Exception as e:
-            print(f"❌ 상태 즉시 갱신 오류: {e}")
+        except Exception:
+            log.exception("❌ 상태 즉시 갱신 오류")
 
     # --------- 상태 메시지 루프(업타임 + 서버 수) ---------
     async def update_status(self):
@@ -82,15 +144,25 @@ class AClient(commands.Bot):
                 text = f"🏰 {guild_count} kingdoms | ⏱ {self.format_uptime(uptime)}"
                 await self.change_presence(activity=discord.Game(text))
                 await asyncio.sleep(60)  # 1분마다 업데이트
-            except Exception as e:
-                print(f"❌ 상태 업데이트 오류: {e}")
+            except Exception:
+                log.exception("❌ 상태 업데이트 오류")
                 await asyncio.sleep(5)
 
-client = AClient()
 
-try:
-    client.run(os.getenv("DISCORD_TOKEN"))
-except KeyboardInterrupt:
-    print("🛑 봇이 중지되었습니다.")
-except Exception as e:
-    print(f"❌ 봇 실행 중 오류 발생: {e}")
+def main() -> None:
+    # 로그 큐 리스너 스레드는 여기서 시작 (차트 워커가 이 모듈을 import해도 스레드/봇이 생기지 않게)
+    setup_logging()
+    client = AClient()
+    try:
+        # log_handler=None: discord.py 로그도 루트의 큐 핸들러로 보낸다
+        client.run(os.getenv("DISCORD_TOKEN"), log_handler=None)
+    except KeyboardInterrupt:
+        log.info("🛑 봇이 중지되었습니다.")
+    except Exception:
+        log.exception("❌ 봇 실행 중 오류 발생")
+    finally:
+        shutdown_logging()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+# tests/test_metrics.py
+"""KingdomTree 계측: discord.py가 삼키는 명령 예외도 오류 수에 잡히는지"""
+from __future__ import annotations
+import asyncio
+from types import SimpleNamespace
+
+import discord
+
+from utils import metrics
+from utils.tree import KingdomTree
+
+
+def _interaction(client: discord.Client, name: str) -> SimpleNamespace:
+    # CommandTree._call이 읽는 속성만
+    return SimpleNamespace(
+        data={"name": name, "type": 1}, type=discord.InteractionType.application_command,
+        guild_id=1, guild=None, user=SimpleNamespace(id=2), channel_id=3, client=client,
+        _state=client._connection, _cs_command=None, command=None, command_failed=False,
+    )
+
+
+def test_raising_command_counts_error():
+    async def main():
+        client = discord.Client(intents=discord.Intents.none())
+        tree = KingdomTree(client)
+
+        @tree.command(name="boom", description="예외")
+        async def boom(inter):
+            raise RuntimeError("boom")
+
+        @tree.command(name="ok", description="정상")
+        async def ok(inter):
+            pass
+
+        metrics.reset()
+        for name in ("boom", "boom", "ok"):
+            await tree._call(_interaction(client, name))
+
+    asyncio.run(main())
+    assert (metrics.STATS["boom"].count, metrics.STATS["boom"].errors) == (2, 2)
+    assert (metrics.STATS["ok"].count, metrics.STATS["ok"].errors) == (1, 0)
+    assert 'kingdom_command_errors_total{command="boom"} 2' in metrics.render_prometheus()
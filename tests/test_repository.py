@@ -0,0 +1,219 @@
+# tests/test_repository.py
+"""
+같은 연산 시나리오를 MemoryRepository와 PgRepository에 똑같이 돌려 의미가 같은지 본다.
+Postgres 쪽은 DATABASE_URL이 있을 때만 (스키마/시드는 init_db가 적용, 테스트 국가는 끝나면 지운다).
+
+    python -m pytest -q tests
+"""
+from __future__ import annotations
+import asyncio
+import os
+import random
+from datetime import date
+
+import pytest
+
+from utils import db, orderbook, repository, users
+from utils.inventory import InsufficientStock
+from utils.repository import MemoryRepository, PgRepository, Repository
+
+BACKENDS = ["memory", pytest.param("postgres", marks=pytest.mark.skipif(
+    not os.getenv("DATABASE_URL"), reason="DATABASE_URL not set"))]
+
+DAY = date(2026, 1, 1)
+TOP = 10**15   # 전체 순위에서 테스트 국가/유저가 맨 위에 오도록
+
+
+class World:
+    """시나리오 준비(국가·토지·유저·재고)를 백엔드마다 같은 모양으로"""
+
+    def __init__(self, repo: Repository, cid: int):
+        self.repo = repo
+        self.cid = cid
+        self.cids = [cid]
+
+    async def country(self, cid: int, name: str, treasury: int = 0) -> None:
+        if cid not in self.cids:
+            self.cids.append(cid)
+        if isinstance(self.repo, MemoryRepository):
+            self.repo.add_country(cid, name, treasury)
+        else:
+            await db.execute("INSERT INTO countries(country_id,name,treasury) VALUES ($1,$2,$3)", (cid, name, treasury))
+
+    async def land(self, channel_id: int, tier: int, bias: str) -> None:
+        if isinstance(self.repo, MemoryRepository):
+            self.repo.add_land(self.cid, channel_id, tier, bias)
+        else:
+            await db.execute(
+                "INSERT INTO lands(country_id,channel_id,tier,resource_bias,base_yield,upkeep_weekly) "
+                "VALUES ($1,$2,$3,$4,1,0)",
+                (self.cid, channel_id, tier, bias),
+            )
+
+    async def user(self, uid: int, balance: int = 0, cid: int | None = None, **items: int) -> None:
+        cid = self.cid if cid is None else cid
+        await self.repo.ensure_user(cid, uid)
+        if isinstance(self.repo, MemoryRepository):
+            self.repo.balances[(cid, uid)] = balance
+            self.repo._grant(cid, uid, items)
+            return
+        await db.execute("UPDATE users SET balance=$1 WHERE country_id=$2 AND user_id=$3", (balance, cid, uid))
+        if items:
+            await db.execute(repository._GRANT, (cid, uid, list(items), list(items.values())))
+
+    async def cleanup(self) -> None:
+        if isinstance(self.repo, PgRepository):
+            await db.execute("DELETE FROM countries WHERE country_id = ANY($1::bigint[])", (self.cids,))
+        for cid in self.cids:
+            users.forget(cid)
+            orderbook.invalidate(cid)
+
+
+def play(backend: str, scenario) -> None:
+    async def main():
+        if backend == "memory":
+            repo: Repository = MemoryRepository()
+        else:
+            await db.init_db()
+            repo = PgRepository()
+        prev = repository.use(repo)
+        w = World(repo, TOP + random.randrange(10**12))
+        try:
+            await w.country(w.cid, "테스트국")
+            await scenario(w)
+        finally:
+            await w.cleanup()
+            repository.use(prev)
+            if db.POOL is not None:
+                await db.POOL.close()
+                db.POOL = None
+
+    asyncio.run(main())
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_claim_twice(backend):
+    async def scenario(w: World):
+        await w.land(1, 2, "iron")
+        await w.user(7)
+        assert await w.repo.land(w.cid, 1) == repository.Land(2, "iron")
+        assert await w.repo.land(w.cid, 2) is None
+        assert await w.repo.claim(w.cid, 7, 1, DAY, {"iron": 3, "wood": 1}) is True
+        assert await w.repo.claim(w.cid, 7, 1, DAY, {"iron": 3}) is False
+        assert await w.repo.inventory(w.cid, 7) == {"iron": 3, "wood": 1}
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_craft_short_stock(backend):
+    async def scenario(w: World):
+        await w.user(7, iron=2, wood=5)
+        with pytest.raises(InsufficientStock):
+            await w.repo.craft(w.cid, 7, {"iron": 3, "wood": 1}, "iron_ingot", 1)
+        assert await w.repo.inventory(w.cid, 7) == {"iron": 2, "wood": 5}
+        # 0 이하 재료는 무시 (debit_many와 같게)
+        await w.repo.craft(w.cid, 7, {"iron": 2, "stone": 0}, "iron_ingot", 1)
+        assert await w.repo.inventory(w.cid, 7) == {"wood": 5, "iron_ingot": 1}
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_sell(backend):
+    async def scenario(w: World):
+        await w.user(7, iron=5, iron_ingot=2)
+        await w.repo.treasury_credit(w.cid, TOP, "준비")
+        assert await w.repo.sell(w.cid, 7, "iron", 6, 10) is False
+        assert await w.repo.sell(w.cid, 7, "iron", 0, 10) is False
+        assert await w.repo.sell(w.cid, 7, "iron", 5, 10) is True
+        assert await w.repo.balance(w.cid, 7) == 50
+        assert await w.repo.sell(w.cid, 7, "iron_ingot", 2, 100, tax=30) is True
+        assert await w.repo.balance(w.cid, 7) == 50 + 170
+        assert await w.repo.inventory(w.cid, 7) == {}
+        assert await w.repo.rank_countries(1) == [(w.cid, "테스트국", TOP + 30)]   # 세금만 국고로
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_register_rejects_non_positive(backend):
+    async def scenario(w: World):
+        await w.user(7, iron=5)
+        assert await w.repo.register(w.cid, 7, "iron", 0, 10) is None
+        assert await w.repo.register(w.cid, 7, "iron", -1, 10) is None
+        assert await w.repo.register(w.cid, 7, "iron", 1, 0) is None
+        assert await w.repo.register(w.cid, 7, "iron", 1, -5) is None
+        assert await w.repo.register(w.cid, 7, "iron", 6, 10) is None
+        assert await w.repo.inventory(w.cid, 7) == {"iron": 5}
+        assert await w.repo.list_open(w.cid, "iron", None, 10) == []
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_buy_partial_then_full(backend):
+    async def scenario(w: World):
+        await w.user(7, iron=5)
+        await w.user(8, balance=100)
+        await w.user(9, balance=5)
+        lid = await w.repo.register(w.cid, 7, "iron", 5, 10)
+        assert lid is not None
+        with pytest.raises(repository.TradeError):
+            await w.repo.buy(w.cid, 8, lid, 6)
+        with pytest.raises(repository.TradeError):
+            await w.repo.buy(w.cid, 9, lid, 1)
+        p = await w.repo.buy(w.cid, 8, lid, 2)
+        assert (p.listing_id, p.item_id, p.seller_id, p.qty, p.cost) == (lid, "iron", 7, 2, 20)
+        orderbook.invalidate(w.cid, "iron")
+        [li] = await w.repo.list_open(w.cid, "iron", None, 10)
+        assert (li.listing_id, li.qty) == (lid, 3)
+        await w.repo.buy(w.cid, 8, lid, 3)
+        orderbook.invalidate(w.cid, "iron")
+        assert await w.repo.list_open(w.cid, "iron", None, 10) == []
+        with pytest.raises(repository.TradeError):
+            await w.repo.buy(w.cid, 8, lid, 1)
+        assert await w.repo.balance(w.cid, 8) == 50
+        assert await w.repo.balance(w.cid, 7) == 50
+        assert await w.repo.balance(w.cid, 9) == 5
+        assert await w.repo.inventory(w.cid, 8) == {"iron": 5}
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_keyset_paging(backend):
+    async def scenario(w: World):
+        await w.user(7, iron=10, wood=1)
+        prices = [30, 10, 20, 10, 40, 20]
+        lids = [await w.repo.register(w.cid, 7, "iron", 1, p) for p in prices]
+        await w.repo.register(w.cid, 7, "wood", 1, 1)   # 다른 품목은 섞이지 않음
+        orderbook.invalidate(w.cid)
+        want = sorted(zip(prices, lids))
+        seen, after = [], None
+        while True:
+            page = await w.repo.list_open(w.cid, "iron", after, 4)
+            assert len(page) <= 4
+            seen += [li.cursor for li in page]
+            if len(page) < 4:
+                break
+            after = page[-1].cursor
+        assert seen == want
+        assert [li.cursor for li in await w.repo.list_open(w.cid, "iron", want[2], 2)] == want[3:5]
+    play(backend, scenario)
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_rankings(backend):
+    async def scenario(w: World):
+        other = w.cid + 1
+        await w.country(other, "이웃국", treasury=TOP + 5)
+        await w.repo.treasury_credit(w.cid, TOP + 9, "테스트")
+        await w.repo.treasury_credit(w.cid, -3, "무시")
+        await w.user(1, balance=TOP + 50)
+        await w.user(2, balance=TOP + 70)
+        await w.user(3, balance=TOP + 50)
+        await w.user(4, balance=TOP + 60, cid=other)
+
+        rows = await w.repo.rank_users(w.cid, 10)
+        assert [(r.user_id, r.balance) for r in rows] == [(2, TOP + 70), (1, TOP + 50), (3, TOP + 50)]
+        assert {r.country_name for r in rows} == {"테스트국"}
+        rows = await w.repo.rank_users(None, 3)
+        assert [(r.country_id, r.user_id) for r in rows] == [(w.cid, 2), (other, 4), (w.cid, 1)]
+        assert await w.repo.rank_countries(2) == [(w.cid, "테스트국", TOP + 9), (other, "이웃국", TOP + 5)]
+    play(backend, scenario)
@@ -0,0 +1,159 @@
+# utils/alerts.py
+"""
+가격 알림 (price_alerts).
+
+'철광석 매물이 25LC 이하로 나오면 알려줘' — 목록/시세를 반복 조회하는 대신 조건이 맞을 때 DM으로 밀어준다.
+- 평가: 새 매물 등록(on_ask)과 일일 EMA 확정(on_day_closed) 때만. 넘은 알림만
+  (country_id, item_id, threshold) 인덱스 범위(threshold >= 가격)로 골라 DELETE ... RETURNING (1회성)
+- 전달: 메모리 큐에 쌓고 run_job()이 BATCH_WINDOW초씩 모아 유저별로 DM 한 통에 묶어 DM_RATE건/초로 보낸다
+  큐가 가득 차면 새 알림은 버린다(카운트만)
+"""
+from __future__ import annotations
+import asyncio
+import os
+from dataclasses import dataclass
+from datetime import date
+
+import discord
+
+from utils import catalog
+from utils.db import fetchall, fetchone
+from utils.embeds import parchment
+from utils.log import get_logger
+
+log = get_logger("alerts")
+
+MAX_PER_USER = 10
+QUEUE_MAX = int(os.getenv("ALERT_QUEUE_MAX", "5000"))
+BATCH_WINDOW = float(os.getenv("ALERT_BATCH_WINDOW_S", "3"))
+DM_RATE = float(os.getenv("ALERT_DM_RATE", "2"))   # 초당 DM 수
+PER_DM = 10                                       # DM 한 통에 담는 알림 수
+
+
+@dataclass(frozen=True)
+class Notice:
+    country_id: int
+    user_id: int
+    item_id: str
+    threshold: int
+    price: int
+    source: str   # "ask" | "ema"
+
+
+_queue: "asyncio.Queue[Notice]" = asyncio.Queue(maxsize=QUEUE_MAX)
+stats = {"fired": 0, "sent": 0, "failed": 0, "dropped": 0}
+
+
+# ---------- 구독 ----------
+async def subscribe(cid: int, uid: int, item_id: str, threshold: int) -> bool:
+    """같은 품목이면 기준가만 바꾼다. 유저당 MAX_PER_USER개를 넘기면 False"""
+    row = await fetchone(
+        "WITH cur AS (SELECT count(*) AS n FROM price_alerts WHERE country_id=$1 AND user_id=$2 AND item_id<>$3) "
+        "INSERT INTO price_alerts(country_id,user_id,item_id,threshold) "
+        "SELECT $1,$2,$3,$4 FROM cur WHERE cur.n < $5 "
+        "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET threshold=EXCLUDED.threshold, created_at=NOW() "
+        "RETURNING 1 AS ok",
+        (cid, uid, item_id, threshold, MAX_PER_USER),
+    )
+    return row is not None
+
+
+async def unsubscribe(cid: int, uid: int, item_id: str) -> bool:
+    row = await fetchone(
+        "DELETE FROM price_alerts WHERE country_id=$1 AND user_id=$2 AND item_id=$3 RETURNING 1 AS ok",
+        (cid, uid, item_id),
+    )
+    return row is not None
+
+
+async def list_for(cid: int, uid: int) -> list:
+    return await fetchall(
+        "SELECT item_id, threshold, created_at FROM price_alerts WHERE country_id=$1 AND user_id=$2 ORDER BY item_id",
+        (cid, uid),
+    )
+
+
+# ---------- 평가 ----------
+def _enqueue(rows, price_of, source: str) -> None:
+    for r in rows:
+        stats["fired"] += 1
+        n = Notice(r["country_id"], r["user_id"], r["item_id"], r["threshold"], price_of(r), source)
+        try:
+            _queue.put_nowait(n)
+        except asyncio.QueueFull:
+            stats["dropped"] += 1
+
+
+async def on_ask(cid: int, item_id: str, price: int, seller_id: int) -> None:
+    """새 매물 price로 넘게 된 알림(판매자 본인 것 제외)을 꺼내 큐에 넣는다. 실패해도 등록은 그대로"""
+    try:
+        rows = await fetchall(
+            "DELETE FROM price_alerts WHERE country_id=$1 AND item_id=$2 AND threshold >= $3 AND user_id <> $4 "
+            "RETURNING country_id, user_id, item_id, threshold",
+            (cid, item_id, price, seller_id),
+        )
+    except Exception:
+        log.exception("가격 알림 평가 실패", extra={"item": item_id})
+        return
+    _enqueue(rows, lambda r: price, "ask")
+
+
+async def on_day_closed(d: date, updates: list[tuple[int, str, float]]) -> None:
+    """prices.on_day_closed 훅: 확정된 EMA 이하로 기준가를 잡은 알림을 한 번에 꺼낸다"""
+    if not updates:
+        return
+    rows = await fetchall(
+        "DELETE FROM price_alerts a USING unnest($1::bigint[], $2::text[], $3::float8[]) AS u(cid, item, ema) "
+        "WHERE a.country_id = u.cid AND a.item_id = u.item AND a.threshold >= u.ema "
+        "RETURNING a.country_id, a.user_id, a.item_id, a.threshold, ROUND(u.ema)::int AS price",
+        ([c for c, _, _ in updates], [i for _, i, _ in updates], [e for _, _, e in updates]),
+    )
+    _enqueue(rows, lambda r: r["price"], "ema")
+
+
+# ---------- 전달 ----------
+def _render(notices: list[Notice], cat: catalog.Catalog, guilds: dict[int, str]) -> discord.Embed:
+    lines = []
+    for n in notices[:PER_DM]:
+        what = "새 매물" if n.source == "ask" else "일일 시세(EMA)"
+        lines.append(
+            f"• [{guilds.get(n.country_id, n.country_id)}] **{cat.name(n.item_id)}** "
+            f"{what} {n.price}LC ≤ 기준 {n.threshold}LC"
+        )
+    if len(notices) > PER_DM:
+        lines.append(f"…외 {len(notices) - PER_DM}건")
+    return parchment("가격 알림", "\n".join(lines), footer="알림은 한 번 울리면 해제됩니다. `/상점 알림`으로 다시 설정하세요.")
+
+
+async def _deliver(bot: discord.Client, batch: list[Notice]) -> None:
+    by_user: dict[int, list[Notice]] = {}
+    for n in batch:
+        by_user.setdefault(n.user_id, []).append(n)
+    cat = await catalog.get()
+    guilds = {g.id: g.name for g in bot.guilds}
+    for uid, notices in by_user.items():
+        try:
+            user = bot.get_user(uid) or await bot.fetch_user(uid)
+            await user.send(embed=_render(notices, cat, guilds))
+            stats["sent"] += 1
+        except discord.HTTPException:
+            # DM 차단/탈퇴 등 — 재시도하지 않는다
+            stats["failed"] += 1
+        await asyncio.sleep(1 / DM_RATE)
+
+
+async def run_job(bot: discord.Client) -> None:
+    await bot.wait_until_ready()
+    while True:
+        batch = [await _queue.get()]
+        await asyncio.sleep(BATCH_WINDOW)
+        while not _queue.empty():
+            batch.append(_queue.get_nowait())
+        try:
+            await _deliver(bot, batch)
+        except Exception:
+            log.exception("가격 알림 전달 실패", extra={"notices": len(batch)})
+
+
+def pending() -> int:
+    return _queue.qsize()
@@ -0,0 +1,289 @@
+# utils/backup.py
+"""
+국가 단위 경제 데이터 내보내기/가져오기 (COPY 스트리밍).
+
+    python -m utils.backup export <country_id> [-o 파일]
+    python -m utils.backup import <파일> [--country <대상 country_id>]
+
+- 파일: zip 안에 테이블마다 <table>.csv.gz(헤더 포함 CSV) + manifest.json(열 목록·행 수)
+- 내보내기: 한 REPEATABLE READ 읽기 전용 트랜잭션에서 테이블마다 COPY (SELECT ...) TO STDOUT.
+  조각을 CHUNK 바이트까지만 모아 스레드에서 gzip/zip에 쓴다 → 메모리 일정, 루프는 압축을 기다리지 않음
+- 가져오기: 세션 임시 테이블(staging)에 copy_to_table로 CSV를 그대로 흘려 넣은 뒤,
+  한 트랜잭션에서 대상 국가 행을 지우고 staging에서 옮긴다(swap). 도중 실패하면 기존 데이터 그대로
+  - listing_id가 다른 국가와 겹치면(다른 DB로 옮길 때) 새 번호를 받고 trades도 따라 바꾼다
+  - trade/장부 id는 새로 받는다. treasury_daily는 장부 INSERT 트리거가 다시 만든다
+- /관리 내보내기: 첨부로 보냈으면 바로 지우고, 너무 커서 남긴 파일은 COMMAND_DIR에서
+  EXPORT_KEEP개 / EXPORT_KEEP_DAYS일까지만 둔다(sweep)
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import time
+import zipfile
+from datetime import datetime, timezone
+from typing import AsyncIterator, Optional
+
+from utils import db, orderbook, users
+from utils.log import get_logger
+
+log = get_logger("backup")
+
+FORMAT = "kingdom-export"
+VERSION = 1
+CHUNK = 1 << 20                      # 스레드로 넘기는 단위 (1 MiB)
+EXPORT_DIR = os.getenv("EXPORT_DIR", "exports")
+# /관리 내보내기 중 첨부 한도를 넘어 서버에 남긴 파일. 여기만 보존 정책(sweep)으로 지운다
+# (삭제 전 내보내기 등 EXPORT_DIR 바로 아래 파일은 건드리지 않음)
+COMMAND_DIR = os.path.join(EXPORT_DIR, "command")
+KEEP_FILES = int(os.getenv("EXPORT_KEEP", "10"))
+KEEP_DAYS = float(os.getenv("EXPORT_KEEP_DAYS", "7"))
+
+# FK 순서. 값: 가져올 때 새로 받는 열(시퀀스)
+TABLES: dict[str, tuple[str, ...]] = {
+    "countries": (),
+    "users": (),
+    "lands": (),
+    "inventory": (),
+    "listings": (),
+    "trades": ("trade_id",),
+    "treasury_ledger": ("id",),
+}
+
+
+class BackupError(Exception):
+    pass
+
+
+async def _columns(conn, table: str) -> list[str]:
+    rows = await conn.fetch(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema='public' AND table_name=$1 "
+        "ORDER BY ordinal_position",
+        table,
+    )
+    return [r["column_name"] for r in rows]
+
+
+# ---------- 내보내기 ----------
+class _Member:
+    """zip 안의 <table>.csv.gz 하나. 모든 메서드는 스레드에서 호출된다"""
+
+    def __init__(self, zf: zipfile.ZipFile, name: str):
+        self.raw = zf.open(zipfile.ZipInfo(name, date_time=datetime.now().timetuple()[:6]), "w", force_zip64=True)
+        self.gz = gzip.GzipFile(fileobj=self.raw, mode="wb", mtime=0)
+
+    def write(self, data: bytes) -> None:
+        self.gz.write(data)
+
+    def close(self) -> None:
+        self.gz.close()
+        self.raw.close()
+
+
+def sweep(directory: str = COMMAND_DIR, now: Optional[float] = None) -> list[str]:
+    """최신 KEEP_FILES개를 넘거나 KEEP_DAYS일 지난 kingdom-*.zip 삭제 → 지운 경로"""
+    if not os.path.isdir(directory):
+        return []
+    now = time.time() if now is None else now
+    files = []
+    for name in os.listdir(directory):
+        if name.startswith("kingdom-") and name.endswith(".zip"):
+            path = os.path.join(directory, name)
+            files.append((os.path.getmtime(path), path))
+    files.sort(reverse=True)
+    removed = []
+    for i, (mtime, path) in enumerate(files):
+        if i >= KEEP_FILES or now - mtime > KEEP_DAYS * 86400:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            removed.append(path)
+    return removed
+
+
+async def export_country(cid: int, path: Optional[str] = None, directory: str = EXPORT_DIR) -> tuple[str, dict]:
+    """→ (파일 경로, manifest). path가 없으면 directory 아래 kingdom-<id>-<시각>.zip"""
+    if path is None:
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"kingdom-{cid}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.zip")
+    manifest = {
+        "format": FORMAT, "version": VERSION, "country_id": cid,
+        "exported_at": datetime.now(timezone.utc).isoformat(), "tables": {},
+    }
+    zf = await asyncio.to_thread(zipfile.ZipFile, path, "w", zipfile.ZIP_STORED)
+    try:
+        async with db.POOL.acquire() as conn:
+            async with conn.transaction(isolation="repeatable_read", readonly=True):
+                if not await conn.fetchval("SELECT 1 FROM countries WHERE country_id=$1", cid):
+                    raise BackupError(f"국가 {cid}가 없습니다.")
+                for table in TABLES:
+                    cols = await _columns(conn, table)
+                    member = await asyncio.to_thread(_Member, zf, f"{table}.csv.gz")
+                    buf: list[bytes] = []
+                    size = 0
+
+                    async def sink(chunk: bytes) -> None:
+                        nonlocal size
+                        buf.append(chunk)
+                        size += len(chunk)
+                        if size >= CHUNK:
+                            data = b"".join(buf)
+                            buf.clear()
+                            size = 0
+                            await asyncio.to_thread(member.write, data)
+
+                    col_sql = ", ".join(f'"{c}"' for c in cols)
+                    status = await conn.copy_from_query(
+                        f"SELECT {col_sql} FROM {table} WHERE country_id=$1", cid,
+                        output=sink, format="csv", header=True,
+                    )
+                    if buf:
+                        await asyncio.to_thread(member.write, b"".join(buf))
+                    await asyncio.to_thread(member.close)
+                    rows = int(status.split()[-1])
+                    manifest["tables"][table] = {"columns": cols, "rows": rows}
+        await asyncio.to_thread(zf.writestr, "manifest.json", json.dumps(manifest, ensure_ascii=False, indent=1))
+    except BaseException:
+        try:
+            await asyncio.to_thread(zf.close)
+        except Exception:
+            pass   # 쓰던 멤버가 열려 있으면 닫기 실패 — 어차피 지운다
+        os.remove(path)
+        raise
+    await asyncio.to_thread(zf.close)
+    log.info("국가 내보내기", extra={"country": cid, "path": path,
+                                    "rows": sum(t["rows"] for t in manifest["tables"].values())})
+    return path, manifest
+
+
+# ---------- 가져오기 ----------
+def read_manifest(path: str) -> dict:
+    with zipfile.ZipFile(path) as zf:
+        manifest = json.loads(zf.read("manifest.json"))
+    if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+        raise BackupError("지원하지 않는 내보내기 파일입니다.")
+    unknown = set(manifest["tables"]) - set(TABLES)
+    if unknown:
+        raise BackupError(f"알 수 없는 테이블: {', '.join(sorted(unknown))}")
+    return manifest
+
+
+async def _stream(zf: zipfile.ZipFile, name: str) -> AsyncIterator[bytes]:
+    f = await asyncio.to_thread(lambda: gzip.GzipFile(fileobj=zf.open(name), mode="rb"))
+    try:
+        while True:
+            data = await asyncio.to_thread(f.read, CHUNK)
+            if not data:
+                return
+            yield data
+    finally:
+        await asyncio.to_thread(f.close)
+
+
+async def _swap(conn, target: int, manifest: dict) -> None:
+    tables = [t for t in TABLES if t in manifest["tables"]]
+    # 자식부터 지운다 (countries 행은 두고 갱신 — 내보내기에 없는 수확 기록·알림·시세 이력은 유지)
+    for table in reversed(tables):
+        if table != "countries":
+            await conn.execute(f"DELETE FROM {table} WHERE country_id=$1", target)
+    await conn.execute("DELETE FROM treasury_daily WHERE country_id=$1", target)
+
+    if "listings" in tables and await conn.fetchval(
+        "SELECT EXISTS (SELECT 1 FROM listings l JOIN _imp_listings s USING (listing_id))"
+    ):
+        await conn.execute("ALTER TABLE _imp_listings ADD COLUMN new_id BIGINT")
+        await conn.execute("UPDATE _imp_listings SET new_id = nextval('listings_listing_id_seq')")
+        if "trades" in tables:
+            await conn.execute(
+                "UPDATE _imp_trades t SET listing_id = s.new_id FROM _imp_listings s WHERE t.listing_id = s.listing_id"
+            )
+        await conn.execute("UPDATE _imp_listings SET listing_id = new_id")
+        await conn.execute("ALTER TABLE _imp_listings DROP COLUMN new_id")
+
+    for table in tables:
+        cols = [c for c in manifest["tables"][table]["columns"] if c not in TABLES[table]]
+        col_sql = ", ".join(f'"{c}"' for c in cols)
+        if table == "countries":
+            sets = ", ".join(f'"{c}"=EXCLUDED."{c}"' for c in cols if c != "country_id")
+            await conn.execute(
+                f"INSERT INTO countries({col_sql}) SELECT {col_sql} FROM _imp_countries "
+                f"ON CONFLICT (country_id) DO UPDATE SET {sets}"
+            )
+        else:
+            await conn.execute(f"INSERT INTO {table}({col_sql}) SELECT {col_sql} FROM _imp_{table}")
+    if "listings" in tables:
+        # 번호를 그대로 넣었으므로 시퀀스가 뒤처지지 않게
+        await conn.execute(
+            "SELECT setval('listings_listing_id_seq', GREATEST(s.last_value, "
+            "(SELECT COALESCE(max(listing_id), 1) FROM listings))) FROM listings_listing_id_seq s"
+        )
+
+
+async def import_country(path: str, target: Optional[int] = None) -> dict:
+    """→ 테이블별 가져온 행 수. target이 없으면 내보낸 국가에 덮어쓴다"""
+    manifest = await asyncio.to_thread(read_manifest, path)
+    target = manifest["country_id"] if target is None else target
+    counts: dict[str, int] = {}
+    zf = await asyncio.to_thread(zipfile.ZipFile, path)
+    try:
+        async with db.POOL.acquire() as conn:
+            try:
+                # 1) staging: 세션 임시 테이블에 CSV를 그대로 흘려 넣는다 (스왑 전이라 잠금 없음)
+                for table, meta in manifest["tables"].items():
+                    await conn.execute(f"DROP TABLE IF EXISTS _imp_{table}")
+                    await conn.execute(f"CREATE TEMP TABLE _imp_{table} (LIKE {table} INCLUDING DEFAULTS)")
+                    status = await conn.copy_to_table(
+                        f"_imp_{table}", source=_stream(zf, f"{table}.csv.gz"),
+                        columns=meta["columns"], format="csv", header=True,
+                    )
+                    counts[table] = int(status.split()[-1])
+                    if target != manifest["country_id"]:
+                        await conn.execute(f"UPDATE _imp_{table} SET country_id=$1", target)
+                if counts.get("countries") != 1:
+                    raise BackupError("countries 행이 정확히 1개여야 합니다.")
+                # 2) swap: 한 트랜잭션
+                async with conn.transaction():
+                    await _swap(conn, target, manifest)
+            finally:
+                for table in manifest["tables"]:
+                    await conn.execute(f"DROP TABLE IF EXISTS _imp_{table}")
+    finally:
+        await asyncio.to_thread(zf.close)
+
+    users.forget(target)
+    orderbook.invalidate(target)
+    log.info("국가 가져오기", extra={"country": target, "source": manifest["country_id"], "rows": sum(counts.values())})
+    return counts
+
+
+# ---------- CLI ----------
+async def _main_async(args) -> None:
+    await db.init_db()
+    if args.cmd == "export":
+        path, manifest = await export_country(args.country_id, args.output)
+        for table, meta in manifest["tables"].items():
+            print(f"{table:<16}{meta['rows']:>12}")
+        print(f"→ {path} ({os.path.getsize(path) / 1024 / 1024:.1f} MiB)")
+    else:
+        counts = await import_country(args.path, args.country)
+        for table, n in counts.items():
+            print(f"{table:<16}{n:>12}")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="kingdom_bot 국가 데이터 내보내기/가져오기")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    ex = sub.add_parser("export", help="국가 하나를 zip(CSV.gz)으로")
+    ex.add_argument("country_id", type=int)
+    ex.add_argument("-o", "--output", help=f"출력 파일 (기본 {EXPORT_DIR}/kingdom-<id>-<시각>.zip)")
+    im = sub.add_parser("import", help="내보낸 파일로 국가 데이터를 교체")
+    im.add_argument("path")
+    im.add_argument("--country", type=int, help="다른 국가(길드) ID로 가져오기")
+    asyncio.run(_main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# utils/catalog.py
+"""items / recipes 메모리 캐시. 거의 바뀌지 않으므로 CATALOG_TTL_S 마다만 다시 읽는다."""
+from __future__ import annotations
+import asyncio
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Optional
+
+from utils import invalidation
+from utils.db import SEED_ITEMS, SEED_RECIPES, fetchall
+
+TTL = int(os.getenv("CATALOG_TTL_S", "300"))
+
+
+@dataclass(frozen=True)
+class Item:
+    item_id: str
+    name: str
+    typ: str          # 'resource' | 'item'
+    base_price: int
+
+
+@dataclass(frozen=True)
+class Recipe:
+    product_id: str
+    inputs: Mapping[str, int]
+    yield_qty: int
+    active: bool
+
+
+def json_obj(val) -> dict:
+    """recipes.inputs_json이 dict가 아닐 수 있는 환경(드라이버/직렬화)에 대비한 파서."""
+    if isinstance(val, dict):
+        return val
+    if isinstance(val, str):
+        try:
+            parsed = json.loads(val)
+            return parsed if isinstance(parsed, dict) else {}
+        except json.JSONDecodeError:
+            return {}
+    try:
+        return dict(val)  # asyncpg.Record 등 대응
+    except Exception:
+        return {}
+
+
+@dataclass(frozen=True)
+class Catalog:
+    items: Mapping[str, Item]
+    recipes: Mapping[str, Recipe]
+    version: str      # 레시피 내용 해시. 바뀌면 제작 계획 메모가 무효화됨
+
+    def name(self, item_id: str) -> str:
+        it = self.items.get(item_id)
+        return it.name if it else item_id
+
+
+_current: Optional[Catalog] = None
+_loaded_at = 0.0
+_lock = asyncio.Lock()
+
+
+def build(items: Iterable[tuple], recipes: Iterable[tuple]) -> Catalog:
+    """(item_id, name, typ, base_price) / (product_id, inputs, yield_qty, active) 행으로 불변 Catalog 구성"""
+    item_map = {i: Item(i, name, typ, int(price)) for i, name, typ, price in items}
+    recipe_map = {}
+    for product, inputs, yield_qty, active in recipes:
+        inputs = {k: int(v) for k, v in json_obj(inputs).items()}
+        recipe_map[product] = Recipe(product, MappingProxyType(inputs), int(yield_qty), bool(active))
+    digest = hashlib.sha1(
+        json.dumps(
+            sorted((p, sorted(rc.inputs.items()), rc.yield_qty, rc.active) for p, rc in recipe_map.items()),
+        ).encode()
+    ).hexdigest()[:12]
+    return Catalog(MappingProxyType(item_map), MappingProxyType(recipe_map), digest)
+
+
+def seed() -> Catalog:
+    """DB 없이 기본 카탈로그(SEED_ITEMS/SEED_RECIPES) — 오프라인 도구용"""
+    return build(SEED_ITEMS, ((p, inputs, y, True) for p, inputs, y in SEED_RECIPES))
+
+
+async def load() -> Catalog:
+    global _current, _loaded_at
+    _current = build(
+        ((r["item_id"], r["name"], r["typ"], r["base_price"])
+         for r in await fetchall("SELECT item_id, name, typ, base_price FROM items")),
+        ((r["product_id"], r["inputs_json"], r["yield_qty"], r["active_flag"])
+         for r in await fetchall("SELECT product_id, inputs_json, yield_qty, active_flag FROM recipes")),
+    )
+    _loaded_at = time.monotonic()
+    return _current
+
+
+async def get() -> Catalog:
+    if _current is not None and time.monotonic() - _loaded_at < TTL:
+        return _current
+    async with _lock:
+        if _current is not None and time.monotonic() - _loaded_at < TTL:
+            return _current
+        return await load()
+
+
+def _evict(country_id: Optional[int] = None, key: object = None) -> None:
+    global _loaded_at
+    _loaded_at = 0.0
+
+
+def invalidate() -> None:
+    """items/recipes를 바꾼 뒤 호출. 다른 프로세스도 다음 get()에서 다시 읽는다"""
+    _evict()
+    invalidation.publish("items")
+
+
+invalidation.on("items", _evict)
@@ -0,0 +1,135 @@
+# utils/charts.py
+"""
+시세 이력 차트(PNG). 렌더링은 별도 프로세스에서 수행해 이벤트 루프를 막지 않는다.
+(country_id, item_id, 마지막 일자) 키로 캐시하므로 새 일자 데이터가 생기기 전까지 재사용한다.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from datetime import date
+from typing import Optional
+
+from utils.db import fetchall
+
+HISTORY_DAYS = 90
+CACHE_SIZE = 256
+
+_executor: Optional[Executor] = None
+_cache: "OrderedDict[tuple[int, str, date], bytes]" = OrderedDict()
+_inflight: dict[tuple[int, str, date], asyncio.Future] = {}
+renders = 0  # 실제 렌더링 횟수(캐시 미스)
+
+
+def _render(item_id: str, dates: list[date], ema: list[float], avg: list[int], volume: list[int]) -> bytes:
+    """워커 프로세스에서 실행. matplotlib은 여기서만 import한다."""
+    import io
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    fig, (ax_p, ax_v) = plt.subplots(
+        2, 1, figsize=(7, 4), dpi=100, sharex=True, gridspec_kw={"height_ratios": [3, 1]}
+    )
+    fig.patch.set_facecolor("#f4e9d0")
+    for ax in (ax_p, ax_v):
+        ax.set_facecolor("#fbf5e6")
+        ax.grid(alpha=0.3)
+    ax_p.plot(dates, avg, color="#b0a080", linewidth=1, marker=".", label="avg")
+    ax_p.plot(dates, ema, color="#8b5a00", linewidth=2, label="EMA")
+    ax_p.set_title(f"{item_id} price (LC)")
+    ax_p.legend(loc="upper left", fontsize=8)
+    ax_v.bar(dates, volume, color="#6b8e23")
+    ax_v.set_ylabel("volume")
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+    buf = io.BytesIO()
+    fig.savefig(buf, format="png")
+    plt.close(fig)
+    return buf.getvalue()
+
+
+def _preload() -> None:
+    """워커 프로세스에서 matplotlib 적재 (처음이면 글꼴 캐시도 여기서 만든다)"""
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot  # noqa: F401
+
+
+def _pool() -> Executor:
+    global _executor
+    if _executor is None:
+        # fork 금지: 풀은 처음 차트를 그릴 때 만들어지므로 그때는 로그 큐 리스너·워치독 스레드가 이미 돌고 있다.
+        # 스레드가 잡고 있던 락을 복사한 채 자식이 멈출 수 있으니 깨끗한 프로세스에서 시작하는 방식만 쓴다
+        # (main.py는 __main__ 가드 안에서만 봇을 띄우므로 워커가 main을 다시 import해도 안전)
+        method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        _executor = ProcessPoolExecutor(
+            max_workers=int(os.getenv("CHART_WORKERS", "1")),
+            mp_context=multiprocessing.get_context(method),
+        )
+    return _executor
+
+
+async def warm() -> None:
+    """시작 시 워커를 띄우고 matplotlib을 미리 적재해 첫 /길드 시세차트의 지연을 없앤다"""
+    try:
+        await asyncio.get_running_loop().run_in_executor(_pool(), _preload)
+    except ImportError:
+        pass   # matplotlib이 없으면 명령에서 안내
+
+
+def invalidate(country_id: int | None = None, item_id: str | None = None) -> None:
+    for key in [k for k in _cache if (country_id is None or k[0] == country_id) and (item_id is None or k[1] == item_id)]:
+        del _cache[key]
+
+
+async def price_chart(country_id: int, item_id: str) -> Optional[tuple[bytes, list]]:
+    """(PNG, 이력 행) 또는 이력이 없으면 None"""
+    global renders
+    rows = await fetchall(
+        "SELECT date, avg_price, volume, ema_price FROM price_indices_daily "
+        "WHERE country_id=$1 AND item_id=$2 ORDER BY date DESC LIMIT $3",
+        (country_id, item_id, HISTORY_DAYS),
+    )
+    if not rows:
+        return None
+    rows.reverse()
+    key = (country_id, item_id, rows[-1]["date"])
+
+    png = _cache.get(key)
+    if png is not None:
+        _cache.move_to_end(key)
+        return png, rows
+
+    # 같은 키를 동시에 요청하면 렌더링은 한 번만
+    fut = _inflight.get(key)
+    if fut is None:
+        loop = asyncio.get_running_loop()
+        fut = loop.run_in_executor(
+            _pool(), _render, item_id,
+            [r["date"] for r in rows], [float(r["ema_price"]) for r in rows],
+            [r["avg_price"] for r in rows], [r["volume"] for r in rows],
+        )
+        _inflight[key] = fut
+        try:
+            png = await fut
+        finally:
+            _inflight.pop(key, None)
+        renders += 1
+        invalidate(country_id, item_id)  # 지난 일자 키 정리
+        _cache[key] = png
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    else:
+        png = await asyncio.shield(fut)
+    return png, rows
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,95 @@
+# utils/claims.py
+"""
+일일 수확 기록 (user_claim_days).
+
+유저·날짜당 한 행에 그날 수확한 채널 ID 배열을 둔다. (예전 user_claims는 채널마다 한 행)
+- try_claim(): 중복 검사와 기록을 한 문장으로. PK 한 번 조회 + 배열 끝에 추가
+- unclaimed_lands(): 오늘 아직 수확 안 한 토지. 역시 PK 한 번 조회 + lands 범위 조회
+- run_job(): CLAIM_RETAIN_DAYS일보다 오래된 행을 배치 삭제 (중복 검사에는 오늘 행만 필요)
+"""
+from __future__ import annotations
+import asyncio
+import os
+from datetime import date, datetime, timedelta
+
+from utils.db import Tx, fetchall, fetchone
+from utils.log import get_logger
+from utils.timezone import KST
+
+log = get_logger("claims")
+
+RETAIN_DAYS = int(os.getenv("CLAIM_RETAIN_DAYS", "7"))
+PURGE_BATCH = 5000
+JOB_INTERVAL = 6 * 3600
+
+# 이미 오늘 이 채널이 배열에 있으면 WHERE에 걸려 갱신도 반환도 없다
+_CLAIM = (
+    "INSERT INTO user_claim_days(country_id,user_id,claim_date,channels) VALUES ($1,$2,$4,ARRAY[$3::bigint]) "
+    "ON CONFLICT (country_id,user_id,claim_date) DO UPDATE "
+    "SET channels = user_claim_days.channels || $3::bigint "
+    "WHERE NOT ($3::bigint = ANY(user_claim_days.channels)) "
+    "RETURNING 1"
+)
+
+
+def today() -> date:
+    return datetime.now(KST).date()
+
+
+async def try_claim(tx: Tx, cid: int, uid: int, channel_id: int, day: date) -> bool:
+    """오늘 이 채널을 처음 수확하면 기록하고 True, 이미 했으면 False"""
+    return await tx.fetchval(_CLAIM, (cid, uid, channel_id, day)) is not None
+
+
+async def unclaimed_lands(cid: int, uid: int, day: date) -> list:
+    return await fetchall(
+        "SELECT l.channel_id, l.tier, l.resource_bias FROM lands l "
+        "WHERE l.country_id=$1 AND l.channel_id <> ALL(COALESCE(("
+        "  SELECT channels FROM user_claim_days WHERE country_id=$1 AND user_id=$2 AND claim_date=$3"
+        "), '{}'::bigint[])) "
+        "ORDER BY l.tier DESC, l.channel_id",
+        (cid, uid, day),
+    )
+
+
+async def migrate_legacy(tx: Tx) -> None:
+    """채널당 한 행이던 user_claims를 보존 기간 안의 것만 배열로 접어 옮기고 제거 (init_db에서 1회)"""
+    if not await tx.fetchval("SELECT to_regclass('user_claims') IS NOT NULL"):
+        return
+    await tx.execute(
+        "INSERT INTO user_claim_days(country_id,user_id,claim_date,channels) "
+        "SELECT country_id, user_id, claim_date, array_agg(channel_id ORDER BY channel_id) "
+        "FROM user_claims WHERE claim_date >= $1 GROUP BY 1, 2, 3 "
+        "ON CONFLICT (country_id,user_id,claim_date) DO NOTHING",
+        (today() - timedelta(days=RETAIN_DAYS),),
+    )
+    await tx.execute("DROP TABLE user_claims")
+    log.info("user_claims → user_claim_days 이전 완료")
+
+
+async def purge() -> int:
+    cutoff = today() - timedelta(days=RETAIN_DAYS)
+    removed = 0
+    while True:
+        row = await fetchone(
+            "WITH d AS (DELETE FROM user_claim_days WHERE ctid IN ("
+            "  SELECT ctid FROM user_claim_days WHERE claim_date < $1 LIMIT $2"
+            ") RETURNING 1) SELECT count(*) AS n FROM d",
+            (cutoff, PURGE_BATCH),
+        )
+        n = int(row["n"])
+        removed += n
+        if n < PURGE_BATCH:
+            return removed
+        await asyncio.sleep(0.05)
+
+
+async def run_job() -> None:
+    while True:
+        try:
+            n = await purge()
+            if n:
+                log.info("지난 수확 기록 정리", extra={"rows": n})
+        except Exception:
+            log.exception("수확 기록 정리 실패")
+        await asyncio.sleep(JOB_INTERVAL)
@@ -1,10 +1,12 @@
 # utils/constants.py
 from zoneinfo import ZoneInfo
 
-# NPC 고정 비율
-NPC_RESOURCE_RATE = 0.65  # 자원 NPC 매입률 (고정)
-NPC_ITEM_RATE     = 0.95  # 아이템 NPC 매입률 (고정)
-NPC_ITEM_TAX      = 0.05  # 아이템 NPC 매입세 (고정) → 국고 귀속
+# 밸런스 기본값 — 실제 값은 utils/gameconfig.py가 game_config 테이블(전역/국가별) 덮어쓰기와 합쳐 쓴다
+
+# NPC 비율
+NPC_RESOURCE_RATE = 0.65  # 자원 NPC 매입률
+NPC_ITEM_RATE     = 0.95  # 아이템 NPC 매입률
+NPC_ITEM_TAX      = 0.05  # 아이템 NPC 매입세 → 국고 귀속
 
 # 시세 평활화
 EMA_ALPHA = 0.20  # 0.0~1.0
@@ -12,11 +14,17 @@ EMA_ALPHA = 0.20  # 0.0~1.0
 # 초깃값
 INITIAL_TREASURY = 50_000
 
-# 토지 기본값
-def land_defaults(tier: int) -> tuple[int, int]:
-    # (일일 생산량, 주간 유지비)
-    return (2, 200) if tier == 1 else (3, 400) if tier == 2 else (4, 800)
+# 토지 티어 (1~5)
+# price: 지정 비용(국고 지출), upkeep: 주간 유지비, yield_min~yield_max: 일일 수확량
+LAND_TIERS = {
+    1: {"price": 5_000,   "upkeep": 1_000,  "yield_min": 2,  "yield_max": 4},
+    2: {"price": 15_000,  "upkeep": 3_000,  "yield_min": 4,  "yield_max": 6},
+    3: {"price": 30_000,  "upkeep": 6_000,  "yield_min": 6,  "yield_max": 9},
+    4: {"price": 60_000,  "upkeep": 12_000, "yield_min": 9,  "yield_max": 12},
+    5: {"price": 120_000, "upkeep": 25_000, "yield_min": 12, "yield_max": 16},
+}
 
 # 드랍 테이블(편향 전)
 BASE_DROP = [("iron",25), ("wood",25), ("stone",25), ("herb",15), ("water",10)]
+BIAS_BONUS = 10   # 토지 편향 자원의 드랍 가중치 가산
 RESOURCE_TYPES = ["iron", "wood", "stone", "herb", "water"]
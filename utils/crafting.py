@@ -0,0 +1,150 @@
+# utils/crafting.py
+"""
+레시피 의존 그래프(DAG)와 다단계 제작 계획.
+
+- RecipeGraph: 활성 레시피로 만든 DAG. 카탈로그 version당 한 번만 컴파일(메모)
+- bom(): N개 제작에 필요한 원자재 총량 (인벤토리 무시). 그래프별 LRU 메모
+- plan(): 현재 인벤토리의 중간재를 먼저 쓰고, 모자란 만큼만 하위 단계를 제작
+- max_craftable(): plan()이 성립하는 최대 수량 (이분 탐색)
+"""
+from __future__ import annotations
+from dataclasses import dataclass, field
+from functools import lru_cache
+from math import ceil
+from typing import Mapping
+
+from utils.catalog import Catalog, Recipe
+
+
+class RecipeCycleError(ValueError):
+    pass
+
+
+@dataclass
+class Plan:
+    target: str
+    qty: int
+    crafts: list[tuple[str, int]] = field(default_factory=list)   # (제품, 제작 횟수) — 실행 순서(하위 단계부터)
+    produced: dict[str, int] = field(default_factory=dict)        # 제작으로 생기는 양(잉여 포함)
+    consumed: dict[str, int] = field(default_factory=dict)        # 재료로 쓰이는 양(재고분 + 제작분)
+    shortfall: dict[str, int] = field(default_factory=dict)       # 재고도 레시피도 없어 부족한 양
+
+    @property
+    def ok(self) -> bool:
+        return not self.shortfall
+
+    def deltas(self) -> dict[str, int]:
+        """인벤토리 순증감 (산출 - 소비). 중간재는 대부분 0으로 상쇄된다"""
+        out = dict(self.produced)
+        for k, v in self.consumed.items():
+            out[k] = out.get(k, 0) - v
+        return {k: v for k, v in out.items() if v}
+
+
+class RecipeGraph:
+    def __init__(self, recipes: Mapping[str, Recipe], version: str):
+        self.version = version
+        self.recipes = {p: r for p, r in recipes.items() if r.active}
+        self.order = self._topo()   # 하위(원자재에 가까운) 제품이 앞
+        self.rank = {p: i for i, p in enumerate(self.order)}
+        self.bom = lru_cache(maxsize=1024)(self._bom)
+
+    def _topo(self) -> list[str]:
+        order: list[str] = []
+        state: dict[str, int] = {}  # 1=방문 중, 2=완료
+
+        def visit(p: str, path: tuple[str, ...]):
+            st = state.get(p)
+            if st == 2:
+                return
+            if st == 1:
+                raise RecipeCycleError(" → ".join(path + (p,)))
+            state[p] = 1
+            for inp in self.recipes[p].inputs:
+                if inp in self.recipes:
+                    visit(inp, path + (p,))
+            state[p] = 2
+            order.append(p)
+
+        for p in sorted(self.recipes):
+            visit(p, ())
+        return order
+
+    def craftable(self, item_id: str) -> bool:
+        return item_id in self.recipes
+
+    def stages(self, item_id: str) -> int:
+        """item_id를 만들기 위한 최대 제작 단계 수 (원자재=0)"""
+        r = self.recipes.get(item_id)
+        if r is None:
+            return 0
+        return 1 + max((self.stages(i) for i in r.inputs), default=0)
+
+    def _bom(self, item_id: str, qty: int) -> tuple[tuple[str, int], ...]:
+        """원자재 총량 (정렬된 튜플 — lru_cache 값으로 쓰기 위해 불변)"""
+        return tuple(sorted(self.plan(item_id, qty, {}).shortfall.items()))
+
+    def plan(self, item_id: str, qty: int, inventory: Mapping[str, int]) -> Plan:
+        """
+        item_id를 qty개 새로 제작하는 계획. 재료 수요를 상위→하위(위상 역순)로 전개하며
+        재고를 먼저 쓰고, 모자라면 레시피로 제작, 레시피도 없으면 부족분으로 남긴다.
+        최종 제품의 기존 재고는 재료로 쓰지 않는다.
+        """
+        rec = self.recipes[item_id]
+        runs = ceil(qty / rec.yield_qty)
+        plan = Plan(target=item_id, qty=qty, crafts=[(item_id, runs)],
+                    produced={item_id: runs * rec.yield_qty})
+        avail = {k: v for k, v in inventory.items() if k != item_id and v > 0}
+        pending = {inp: per * runs for inp, per in rec.inputs.items()}
+
+        while pending:
+            # 레시피 품목은 소비처(상위)가 모두 처리된 뒤 전개되도록 rank 큰 것부터
+            craft_items = [p for p in pending if p in self.rank]
+            item = max(craft_items, key=self.rank.__getitem__) if craft_items else next(iter(pending))
+            need = pending.pop(item)
+            plan.consumed[item] = plan.consumed.get(item, 0) + need
+
+            use = min(avail.get(item, 0), need)
+            avail[item] = avail.get(item, 0) - use
+            need -= use
+            if need <= 0:
+                continue
+            sub = self.recipes.get(item)
+            if sub is None:
+                plan.shortfall[item] = plan.shortfall.get(item, 0) + need
+                continue
+            sub_runs = ceil(need / sub.yield_qty)
+            plan.crafts.append((item, sub_runs))
+            plan.produced[item] = plan.produced.get(item, 0) + sub_runs * sub.yield_qty
+            for inp, per in sub.inputs.items():
+                pending[inp] = pending.get(inp, 0) + per * sub_runs
+
+        plan.crafts.reverse()
+        return plan
+
+    def max_craftable(self, item_id: str, inventory: Mapping[str, int], cap: int = 1_000_000) -> int:
+        if item_id not in self.recipes:
+            return 0
+        lo, hi = 0, 1
+        while hi <= cap and self.plan(item_id, hi, inventory).ok:
+            lo, hi = hi, hi * 2
+        hi = min(hi, cap + 1)
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if self.plan(item_id, mid, inventory).ok:
+                lo = mid
+            else:
+                hi = mid
+        return lo
+
+
+_graphs: dict[str, RecipeGraph] = {}
+
+
+def graph_for(cat: Catalog) -> RecipeGraph:
+    """카탈로그 version별로 컴파일된 그래프 (version이 바뀌면 새로 만든다)"""
+    g = _graphs.get(cat.version)
+    if g is None:
+        _graphs.clear()
+        g = _graphs[cat.version] = RecipeGraph(cat.recipes, cat.version)
+    return g
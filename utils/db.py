@@ -1,7 +1,12 @@
 # utils/db.py
 import asyncpg
+import json
 import os
-from typing import Any, Iterable, Optional
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Iterable, Optional
+
+from utils.metrics import record_db
 
 POOL: Optional[asyncpg.Pool] = None
 
@@ -14,16 +19,58 @@ CREATE TABLE IF NOT EXISTS countries (
   market_tax_bp   INTEGER NOT NULL DEFAULT 500,
   created_at      TIMESTAMPTZ NOT NULL DEFAULT NOW()
 );
+-- 봇이 길드에서 나간 시각. 유예 뒤 utils/departures.py가 자식 테이블부터 나눠 지운다
+ALTER TABLE countries ADD COLUMN IF NOT EXISTS departed_at TIMESTAMPTZ;
+CREATE INDEX IF NOT EXISTS idx_countries_departed ON countries(departed_at) WHERE departed_at IS NOT NULL;
 
+-- 장부는 append-only, created_at 기준 월 파티션 (utils/partitions.py가 파티션 생성/보존 관리)
 CREATE TABLE IF NOT EXISTS treasury_ledger (
-  id BIGSERIAL PRIMARY KEY,
+  id BIGSERIAL,
   country_id BIGINT NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
   typ   TEXT NOT NULL,   -- 'in' | 'out'
   reason TEXT NOT NULL,
   amount BIGINT NOT NULL,
-  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS treasury_ledger_default PARTITION OF treasury_ledger DEFAULT;
+CREATE INDEX IF NOT EXISTS idx_ledger_country_time
+  ON treasury_ledger(country_id, created_at DESC);
+
+-- 장부 일별 집계(국가·사유별). 장부 INSERT 문장마다 트리거가 증분 반영 → 현금흐름 조회는 O(일수)
+CREATE TABLE IF NOT EXISTS treasury_daily (
+  country_id BIGINT NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
+  day        DATE   NOT NULL,   -- KST 기준
+  reason     TEXT   NOT NULL,
+  income     BIGINT NOT NULL DEFAULT 0,
+  expense    BIGINT NOT NULL DEFAULT 0,
+  entries    INTEGER NOT NULL DEFAULT 0,
+  PRIMARY KEY (country_id, day, reason)
 );
 
+CREATE OR REPLACE FUNCTION treasury_daily_rollup() RETURNS trigger AS $$
+BEGIN
+  INSERT INTO treasury_daily(country_id, day, reason, income, expense, entries)
+  SELECT country_id, (created_at AT TIME ZONE 'Asia/Seoul')::date, reason,
+         SUM(CASE WHEN typ='in'  THEN amount ELSE 0 END),
+         SUM(CASE WHEN typ='out' THEN amount ELSE 0 END),
+         COUNT(*)
+  FROM new_rows
+  GROUP BY 1, 2, 3
+  ON CONFLICT (country_id, day, reason) DO UPDATE SET
+    income  = treasury_daily.income  + EXCLUDED.income,
+    expense = treasury_daily.expense + EXCLUDED.expense,
+    entries = treasury_daily.entries + EXCLUDED.entries;
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
+
+-- 행 단위가 아닌 문장 단위: 일괄 반영(utils/treasury.py) 시 그룹당 UPSERT 1회
+DROP TRIGGER IF EXISTS trg_treasury_daily ON treasury_ledger;
+CREATE TRIGGER trg_treasury_daily
+  AFTER INSERT ON treasury_ledger
+  REFERENCING NEW TABLE AS new_rows
+  FOR EACH STATEMENT EXECUTE FUNCTION treasury_daily_rollup();
+
 CREATE TABLE IF NOT EXISTS users (
   country_id     BIGINT NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
   user_id        BIGINT NOT NULL,
@@ -69,6 +116,14 @@ CREATE TABLE IF NOT EXISTS inventory (
   qty        BIGINT NOT NULL,
   PRIMARY KEY(country_id, user_id, item_id)
 );
+-- 음수 재고 금지. 기존 테이블은 NOT VALID로만 붙이고(즉시, 새 쓰기부터 검사)
+-- 기존 행 검증은 utils/inventory.py 정리 작업이 쓰기를 막지 않는 VALIDATE로 수행
+DO $$
+BEGIN
+  IF NOT EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'inventory_qty_nonneg') THEN
+    ALTER TABLE inventory ADD CONSTRAINT inventory_qty_nonneg CHECK (qty >= 0) NOT VALID;
+  END IF;
+END $$;
 
 -- 6) listings (items FK 필요)
 CREATE TABLE IF NOT EXISTS listings (
@@ -82,13 +137,17 @@ CREATE TABLE IF NOT EXISTS listings (
   expires_at  TIMESTAMPTZ NOT NULL DEFAULT NOW() + INTERVAL '72 hours',
   status      TEXT NOT NULL DEFAULT 'open' CHECK (status IN ('open','sold','expired','cancelled'))
 );
-CREATE INDEX IF NOT EXISTS idx_listings_open
-  ON listings(country_id, resource_id, status, unit_price)
+-- 호가창 키셋 페이지 (utils/orderbook.py): (unit_price, listing_id) 순서를 인덱스가 그대로 제공
+CREATE INDEX IF NOT EXISTS idx_listings_book
+  ON listings(country_id, resource_id, unit_price, listing_id)
   WHERE status='open';
+DROP INDEX IF EXISTS idx_listings_open;
+-- 닫힌 매물까지 국가 단위로 (떠난 국가 분할 삭제)
+CREATE INDEX IF NOT EXISTS idx_listings_country ON listings(country_id);
 
--- 7) trades (items FK 필요)
+-- 7) trades (items FK 필요) — 장부와 같은 월 파티션
 CREATE TABLE IF NOT EXISTS trades (
-  trade_id    BIGSERIAL PRIMARY KEY,
+  trade_id    BIGSERIAL,
   country_id  BIGINT NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
   listing_id  BIGINT REFERENCES listings(listing_id) ON DELETE SET NULL,
   buyer_id    BIGINT NOT NULL,
@@ -97,8 +156,12 @@ CREATE TABLE IF NOT EXISTS trades (
   qty         BIGINT NOT NULL,
   unit_price  INTEGER NOT NULL,
   fee_paid    INTEGER NOT NULL,
-  created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW()
-);
+  created_at  TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (trade_id, created_at)
+) PARTITION BY RANGE (created_at);
+CREATE TABLE IF NOT EXISTS trades_default PARTITION OF trades DEFAULT;
+CREATE INDEX IF NOT EXISTS idx_trades_country_time
+  ON trades(country_id, created_at DESC);
 
 -- 8) 시세(EMA) (items FK 필요)
 CREATE TABLE IF NOT EXISTS market_prices (
@@ -121,36 +184,133 @@ CREATE TABLE IF NOT EXISTS price_indices_daily (
   PRIMARY KEY(country_id, item_id, date)
 );
 
-CREATE TABLE IF NOT EXISTS user_claims (
+-- 10) 전 국가 통합 시장 요약 (utils/market_global.py가 주기적으로 REFRESH)
+CREATE MATERIALIZED VIEW IF NOT EXISTS market_global AS
+SELECT i.item_id,
+       COALESCE(l.open_qty, 0)   AS open_qty,
+       l.best_ask,
+       COALESCE(l.countries, 0)  AS countries,
+       COALESCE(t.volume_24h, 0) AS volume_24h,
+       t.vwap_24h,
+       NOW()                     AS refreshed_at
+FROM items i
+LEFT JOIN (
+  SELECT resource_id AS item_id, SUM(qty) AS open_qty, MIN(unit_price) AS best_ask,
+         COUNT(DISTINCT country_id) AS countries
+  FROM listings WHERE status='open' GROUP BY 1
+) l ON l.item_id = i.item_id
+LEFT JOIN (
+  SELECT resource_id AS item_id, SUM(qty) AS volume_24h,
+         ROUND(SUM(unit_price::numeric * qty) / SUM(qty))::int AS vwap_24h
+  FROM trades WHERE created_at >= NOW() - INTERVAL '24 hours' GROUP BY 1
+) t ON t.item_id = i.item_id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_market_global_item ON market_global(item_id);
+
+-- 일일 수확 기록: 유저·날짜당 한 행, 그날 수확한 채널 배열 (utils/claims.py가 보존 기간 관리)
+CREATE TABLE IF NOT EXISTS user_claim_days (
+  country_id BIGINT   NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
+  user_id    BIGINT   NOT NULL,
+  claim_date DATE     NOT NULL,
+  channels   BIGINT[] NOT NULL,
+  PRIMARY KEY (country_id, user_id, claim_date)
+);
+CREATE INDEX IF NOT EXISTS idx_claim_days_date ON user_claim_days(claim_date);
+
+-- 변경 명령의 멱등 키 (utils/idempotency.py). result가 NULL이면 처리 중
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+  interaction_id BIGINT PRIMARY KEY,
+  command        TEXT   NOT NULL,
+  result         JSONB,
+  created_at     TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS idx_idempotency_created ON idempotency_keys(created_at);
+
+-- 공유 속도 제한 버킷 (RATE_LIMIT_BACKEND=postgres일 때만 사용). 잃어도 되는 상태라 WAL 생략
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_buckets (
+  key        TEXT PRIMARY KEY,
+  rate       FLOAT8 NOT NULL,
+  burst      FLOAT8 NOT NULL,
+  tokens     FLOAT8 NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL
+);
+
+-- 가격 알림: 매도호가/EMA가 threshold 이하가 되면 1회 DM 후 삭제 (utils/alerts.py)
+CREATE TABLE IF NOT EXISTS price_alerts (
   country_id BIGINT NOT NULL REFERENCES countries(country_id) ON DELETE CASCADE,
   user_id    BIGINT NOT NULL,
-  channel_id BIGINT NOT NULL,
-  claim_date DATE   NOT NULL,
-  PRIMARY KEY (country_id, user_id, channel_id, claim_date)
+  item_id    TEXT   NOT NULL REFERENCES items(item_id),
+  threshold  INT    NOT NULL CHECK (threshold > 0),
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (country_id, user_id, item_id)
 );
-"""
+CREATE INDEX IF NOT EXISTS idx_price_alerts_threshold ON price_alerts(country_id, item_id, threshold);
+
+-- 게임 밸런스 덮어쓰기 (utils/gameconfig.py). country_id 0 = 전역
+CREATE TABLE IF NOT EXISTS game_config (
+  country_id BIGINT NOT NULL DEFAULT 0,
+  key        TEXT   NOT NULL,
+  value      JSONB  NOT NULL,
+  updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+  PRIMARY KEY (country_id, key)
+);
+CREATE TABLE IF NOT EXISTS game_config_version (
+  id      BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+  version BIGINT  NOT NULL DEFAULT 0
+);
+INSERT INTO game_config_version(id) VALUES (TRUE) ON CONFLICT DO NOTHING;
+
+-- 바꾸는 문장마다 버전 +1 (같은 트랜잭션이라 값과 함께 보인다) + 커밋 시 무효화 버스로 알림
+CREATE OR REPLACE FUNCTION game_config_bump() RETURNS trigger AS $$
+BEGIN
+  UPDATE game_config_version SET version = version + 1;
+  PERFORM pg_notify('kingdom_inval', '{"p":"db","e":[["game_config",null,null]]}');
+  RETURN NULL;
+END $$ LANGUAGE plpgsql;
 
-SEED_SQL = """
-INSERT INTO items(item_id,name,typ,base_price) VALUES
-('iron','철광석','resource',30),
-('wood','목재','resource',25),
-('stone','돌','resource',20),
-('herb','약초','resource',35),
-('water','물','resource',40),
-('iron_ingot','철괴','item',120),
-('steel_ingot','강철괴','item',320),
-('toolkit','도구 키트','item',260),
-('healing_potion','치유 물약','item',220)
-ON CONFLICT (item_id) DO NOTHING;
-
-INSERT INTO recipes(product_id,inputs_json,yield_qty,active_flag) VALUES
-('iron_ingot','{\"iron\":3}',1,TRUE),
-('steel_ingot','{\"iron_ingot\":2,\"wood\":1}',1,TRUE),
-('toolkit','{\"wood\":3,\"stone\":2}',1,TRUE),
-('healing_potion','{\"herb\":2,\"water\":1}',1,TRUE)
-ON CONFLICT (product_id) DO NOTHING;
+DROP TRIGGER IF EXISTS trg_game_config_bump ON game_config;
+CREATE TRIGGER trg_game_config_bump
+  AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON game_config
+  FOR EACH STATEMENT EXECUTE FUNCTION game_config_bump();
 """
 
+# 기본 카탈로그 (catalog.seed()로 DB 없이도 쓴다 — bench/simulate.py)
+SEED_ITEMS = [
+    # (item_id, name, typ, base_price)
+    ("iron", "철광석", "resource", 30),
+    ("wood", "목재", "resource", 25),
+    ("stone", "돌", "resource", 20),
+    ("herb", "약초", "resource", 35),
+    ("water", "물", "resource", 40),
+    ("iron_ingot", "철괴", "item", 120),
+    ("steel_ingot", "강철괴", "item", 320),
+    ("toolkit", "도구 키트", "item", 260),
+    ("healing_potion", "치유 물약", "item", 220),
+]
+SEED_RECIPES = [
+    # (product_id, inputs, yield_qty)
+    ("iron_ingot", {"iron": 3}, 1),
+    ("steel_ingot", {"iron_ingot": 2, "wood": 1}, 1),
+    ("toolkit", {"wood": 3, "stone": 2}, 1),
+    ("healing_potion", {"herb": 2, "water": 1}, 1),
+]
+
+
+def _seed_sql() -> str:
+    def lit(v) -> str:
+        return str(v) if isinstance(v, int) else "'" + str(v).replace("'", "''") + "'"
+    items = ",\n".join("(" + ",".join(lit(v) for v in row) + ")" for row in SEED_ITEMS)
+    recipes = ",\n".join(
+        f"({lit(p)},{lit(json.dumps(inputs, separators=(',', ':')))},{y},TRUE)" for p, inputs, y in SEED_RECIPES
+    )
+    return (
+        f"INSERT INTO items(item_id,name,typ,base_price) VALUES\n{items}\nON CONFLICT (item_id) DO NOTHING;\n\n"
+        f"INSERT INTO recipes(product_id,inputs_json,yield_qty,active_flag) VALUES\n{recipes}\n"
+        "ON CONFLICT (product_id) DO NOTHING;\n"
+    )
+
+
+SEED_SQL = _seed_sql()
+
 async def init_db():
     """풀 생성 + 스키마/시드 멱등 적용"""
     global POOL
@@ -158,26 +318,125 @@ async def init_db():
     if not dsn:
         raise RuntimeError("DATABASE_URL not set")
     POOL = await asyncpg.create_pool(dsn, min_size=1, max_size=8)
-    async with POOL.acquire() as conn:
-        async with conn.transaction():
-            await conn.execute(SCHEMA_SQL)
-            await conn.execute(SEED_SQL)
+    from utils import claims, partitions
+    async with transaction() as tx:
+        await partitions.rename_legacy(tx)
+        await tx.execute(SCHEMA_SQL)
+        await tx.execute(SEED_SQL)
+        await claims.migrate_legacy(tx)
+        await partitions.copy_legacy(tx)
+        await partitions.ensure_months(tx)
+        await backfill_treasury_daily(tx)
+
+async def backfill_treasury_daily(tx: "Tx") -> None:
+    """집계 테이블이 트리거 도입 전 장부를 모르는 경우(비어 있을 때만) 한 번 재구성"""
+    if await tx.fetchval("SELECT EXISTS (SELECT 1 FROM treasury_daily)"):
+        return
+    if not await tx.fetchval("SELECT EXISTS (SELECT 1 FROM treasury_ledger)"):
+        return
+    await tx.execute(
+        "INSERT INTO treasury_daily(country_id, day, reason, income, expense, entries) "
+        "SELECT country_id, (created_at AT TIME ZONE 'Asia/Seoul')::date, reason, "
+        "SUM(CASE WHEN typ='in' THEN amount ELSE 0 END), "
+        "SUM(CASE WHEN typ='out' THEN amount ELSE 0 END), COUNT(*) "
+        "FROM treasury_ledger GROUP BY 1, 2, 3"
+    )
 
 async def fetchone(query: str, params: Iterable[Any] = ()) -> Optional[asyncpg.Record]:
-    async with POOL.acquire() as conn:
-        return await conn.fetchrow(query, *params)
+    t0 = time.perf_counter()
+    try:
+        async with POOL.acquire() as conn:
+            return await conn.fetchrow(query, *params)
+    finally:
+        record_db(time.perf_counter() - t0)
 
 async def fetchall(query: str, params: Iterable[Any] = ()) -> list[asyncpg.Record]:
-    async with POOL.acquire() as conn:
-        rows = await conn.fetch(query, *params)
-        return list(rows)
+    t0 = time.perf_counter()
+    try:
+        async with POOL.acquire() as conn:
+            rows = await conn.fetch(query, *params)
+            return list(rows)
+    finally:
+        record_db(time.perf_counter() - t0)
 
 async def execute(query: str, params: Iterable[Any] = ()) -> None:
-    async with POOL.acquire() as conn:
-        await conn.execute(query, *params)
+    t0 = time.perf_counter()
+    try:
+        async with POOL.acquire() as conn:
+            await conn.execute(query, *params)
+    finally:
+        record_db(time.perf_counter() - t0)
 
 async def executemany(query: str, seq: list[Iterable[Any]]) -> None:
+    t0 = time.perf_counter()
+    try:
+        async with POOL.acquire() as conn:
+            async with conn.transaction():
+                for p in seq:
+                    await conn.execute(query, *p)
+    finally:
+        # BEGIN/COMMIT + 행마다 1회 왕복
+        record_db(time.perf_counter() - t0, calls=len(seq) + 2)
+
+
+class Tx:
+    """transaction() 블록 안에서 쓰는 연결 래퍼. 헬퍼와 같은 시그니처로 왕복을 계측한다."""
+    __slots__ = ("conn", "after_commit")
+
+    def __init__(self, conn: asyncpg.Connection):
+        self.conn = conn
+        self.after_commit: list[Callable[[], None]] = []  # 커밋 성공 후에만 실행(롤백 시 버림)
+
+    async def fetchone(self, query: str, params: Iterable[Any] = ()) -> Optional[asyncpg.Record]:
+        t0 = time.perf_counter()
+        try:
+            return await self.conn.fetchrow(query, *params)
+        finally:
+            record_db(time.perf_counter() - t0)
+
+    async def fetchall(self, query: str, params: Iterable[Any] = ()) -> list[asyncpg.Record]:
+        t0 = time.perf_counter()
+        try:
+            return list(await self.conn.fetch(query, *params))
+        finally:
+            record_db(time.perf_counter() - t0)
+
+    async def fetchval(self, query: str, params: Iterable[Any] = ()) -> Any:
+        t0 = time.perf_counter()
+        try:
+            return await self.conn.fetchval(query, *params)
+        finally:
+            record_db(time.perf_counter() - t0)
+
+    async def execute(self, query: str, params: Iterable[Any] = ()) -> str:
+        t0 = time.perf_counter()
+        try:
+            return await self.conn.execute(query, *params)
+        finally:
+            record_db(time.perf_counter() - t0)
+
+
+@asynccontextmanager
+async def transaction(isolation: str = "read_committed") -> AsyncIterator[Tx]:
+    """`async with transaction() as tx:` — 블록 전체가 하나의 트랜잭션(예외 시 롤백)"""
     async with POOL.acquire() as conn:
-        async with conn.transaction():
-            for p in seq:
-                await conn.execute(query, *p)
+        tr = conn.transaction(isolation=isolation)
+        t0 = time.perf_counter()
+        await tr.start()
+        record_db(time.perf_counter() - t0)
+        tx = Tx(conn)
+        try:
+            yield tx
+        except BaseException:
+            t0 = time.perf_counter()
+            try:
+                await tr.rollback()
+            except Exception:
+                pass  # 끊긴 연결이면 풀 반납 시 정리됨. 원래 예외를 살린다
+            record_db(time.perf_counter() - t0)
+            raise
+        t0 = time.perf_counter()
+        await tr.commit()
+        record_db(time.perf_counter() - t0)
+        for fn in tx.after_commit:
+            fn()
@@ -0,0 +1,177 @@
+# utils/departures.py
+"""
+봇이 나간 길드(국가)의 지연·분할 삭제.
+
+countries 행을 바로 지우면 ON DELETE CASCADE가 모든 자식 테이블을 한 트랜잭션에서 지우며 오래 잠근다.
+- mark(): 길드에서 빠지면 departed_at만 기록. 유예 기간(PURGE_GRACE_DAYS) 안에 돌아오면 unmark()
+- run_job(): 유예가 지난 국가를 (선택) 내보낸 뒤, 자식 테이블을 PURGE_BATCH행씩 짧은 트랜잭션으로 지우고
+  배치 사이에 PURGE_PAUSE_MS만큼 쉰다. 마지막에 비어 있는 countries 행만 지운다
+  중간에 재시작해도 다음 실행이 이어서 지운다. 배치마다 departed_at을 (행 잠금으로) 다시 보고,
+  도중에 길드가 돌아와 unmark()됐으면 거기서 멈춘다
+- 시작 시 봇이 꺼져 있는 동안 빠진 길드도 표시한다(reconcile). 샤드가 여럿이면 이 프로세스 샤드의 길드만
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+from typing import Optional
+
+import discord
+
+from utils import backup, orderbook, users
+from utils.db import execute, fetchall, fetchone
+from utils.log import get_logger
+
+log = get_logger("departures")
+
+GRACE_DAYS = int(os.getenv("PURGE_GRACE_DAYS", "7"))
+BATCH = int(os.getenv("PURGE_BATCH", "2000"))
+PAUSE = int(os.getenv("PURGE_PAUSE_MS", "200")) / 1000
+EXPORT_FIRST = os.getenv("PURGE_EXPORT", "0") == "1"
+JOB_INTERVAL = 3600
+
+# 참조하는 쪽부터 (trades → listings: ON DELETE SET NULL 갱신을 피함)
+CHILD_TABLES = (
+    "trades", "treasury_ledger", "treasury_daily", "listings", "inventory", "user_claim_days",
+    "price_alerts", "market_prices", "price_indices_daily", "game_config", "lands", "users",
+)
+
+# 파티션 테이블은 ctid가 파티션마다 따로이므로 (tableoid, ctid)로 행을 가리킨다.
+# c: 아직 떠난 상태인지 — FOR SHARE라 배치 도중 unmark()는 이 배치 커밋까지 기다리고, 다음 배치는 멈춘다
+_BATCH_SQL = (
+    "WITH c AS (SELECT 1 FROM countries WHERE country_id=$1 AND departed_at IS NOT NULL FOR SHARE), "
+    "d AS (DELETE FROM {t} WHERE country_id=$1 AND EXISTS (SELECT 1 FROM c) AND (tableoid, ctid) IN ("
+    "  SELECT tableoid, ctid FROM {t} WHERE country_id=$1 LIMIT $2"
+    ") RETURNING 1) SELECT (SELECT count(*) FROM d) AS n, EXISTS (SELECT 1 FROM c) AS departed"
+)
+
+last_purge: dict = {}   # 마지막 정리 결과 (관리 보고용)
+
+
+async def mark(cid: int) -> None:
+    await execute("UPDATE countries SET departed_at=NOW() WHERE country_id=$1 AND departed_at IS NULL", (cid,))
+
+
+async def unmark(cid: int) -> None:
+    await execute("UPDATE countries SET departed_at=NULL WHERE country_id=$1 AND departed_at IS NOT NULL", (cid,))
+
+
+def _shards(bot: discord.Client) -> Optional[tuple[int, list[int]]]:
+    """(샤드 수, 이 프로세스가 맡은 샤드 ID). 샤드가 하나거나 모든 샤드를 맡으면 None(전부)"""
+    count = bot.shard_count or 1
+    if count <= 1:
+        return None
+    ids = getattr(bot, "shard_ids", None)
+    if ids is None:
+        if getattr(bot, "shards", None) is not None:   # AutoShardedClient가 전 샤드를 맡음
+            return None
+        ids = [bot.shard_id]
+    ids = sorted(ids)
+    return None if len(ids) >= count else (count, ids)
+
+
+async def reconcile(bot: discord.Client) -> int:
+    """봇이 속하지 않은 국가 표시 + 다시 속한 국가 해제. 표시한 수
+    샤드가 여럿이면 bot.guilds는 이 프로세스 샤드의 길드뿐이므로 그 샤드에 속한 국가만 본다
+    (shard = (guild_id >> 22) % shard_count)"""
+    present = [g.id for g in bot.guilds]
+    await execute(
+        "UPDATE countries SET departed_at=NULL WHERE departed_at IS NOT NULL AND country_id = ANY($1::bigint[])",
+        (present,),
+    )
+    shards = _shards(bot)
+    if shards is None:
+        rows = await fetchall(
+            "UPDATE countries SET departed_at=NOW() "
+            "WHERE departed_at IS NULL AND NOT (country_id = ANY($1::bigint[])) RETURNING country_id",
+            (present,),
+        )
+    else:
+        count, ids = shards
+        rows = await fetchall(
+            "UPDATE countries SET departed_at=NOW() "
+            "WHERE departed_at IS NULL AND NOT (country_id = ANY($1::bigint[])) "
+            "AND ((country_id >> 22) % $2) = ANY($3::bigint[]) RETURNING country_id",
+            (present, count, ids),
+        )
+    return len(rows)
+
+
+async def purge(cid: int) -> tuple[dict[str, int], bool]:
+    """자식 테이블을 배치로 비우고 countries 행 삭제 → (테이블별 삭제 행 수, 끝까지 지웠는지)
+    길드가 돌아왔으면(departed_at이 풀리면) 다음 배치 전에 멈춘다"""
+    counts: dict[str, int] = {}
+    done = True
+    try:
+        for table in CHILD_TABLES:
+            q = _BATCH_SQL.format(t=table)
+            total = 0
+            while True:
+                row = await fetchone(q, (cid, BATCH))
+                if not row["departed"]:
+                    done = False
+                    break
+                n = int(row["n"])
+                total += n
+                if n < BATCH:
+                    break
+                await asyncio.sleep(PAUSE)
+            if total:
+                counts[table] = total
+            if not done:
+                break
+            await asyncio.sleep(PAUSE)
+        if done:
+            row = await fetchone(
+                "DELETE FROM countries WHERE country_id=$1 AND departed_at IS NOT NULL RETURNING 1 AS ok", (cid,)
+            )
+            if row:
+                counts["countries"] = 1
+            else:
+                done = False
+    finally:
+        # 일부만 지웠어도 캐시는 비운다
+        users.forget(cid)
+        orderbook.invalidate(cid)
+    return counts, done
+
+
+async def run_once() -> int:
+    due = await fetchall(
+        "SELECT country_id FROM countries WHERE departed_at < NOW() - make_interval(days => $1) "
+        "ORDER BY departed_at LIMIT 10",
+        (GRACE_DAYS,),
+    )
+    for r in due:
+        cid = r["country_id"]
+        if EXPORT_FIRST:
+            try:
+                path, _ = await backup.export_country(cid)
+            except Exception:
+                log.exception("삭제 전 내보내기 실패 — 이번엔 건너뜀", extra={"country": cid})
+                continue
+            log.info("삭제 전 내보내기", extra={"country": cid, "path": path})
+        t0 = time.monotonic()
+        counts, done = await purge(cid)
+        last_purge.update(country_id=cid, rows=sum(counts.values()), seconds=time.monotonic() - t0, at=time.time())
+        if done:
+            log.info("떠난 국가 정리", extra={"country": cid, "tables": counts})
+        else:
+            log.warning("길드가 돌아와 정리 중단", extra={"country": cid, "tables": counts})
+    return len(due)
+
+
+async def run_job(bot: discord.Client) -> None:
+    await bot.wait_until_ready()
+    try:
+        n = await reconcile(bot)
+        if n:
+            log.info("꺼져 있는 동안 떠난 국가 표시", extra={"countries": n})
+    except Exception:
+        log.exception("떠난 국가 대조 실패")
+    while True:
+        try:
+            await run_once()
+        except Exception:
+            log.exception("떠난 국가 정리 실패")
+        await asyncio.sleep(JOB_INTERVAL)
@@ -11,11 +11,26 @@ def parchment(title: str, desc: str = "", *, footer: Optional[str] = None) -> di
         emb.set_footer(text=footer)
     return emb
 
-async def send_ok(inter: discord.Interaction, title: str, desc: str = "", *, ephemeral: bool=False):
+SPARK_BLOCKS = "▁▂▃▄▅▆▇█"
+
+def sparkline(values: list[float]) -> str:
+    """값 목록을 유니코드 블록 한 줄로 (최솟값=▁, 최댓값=█)"""
+    if not values:
+        return ""
+    lo, hi = min(values), max(values)
+    span = hi - lo
+    if span == 0:
+        return SPARK_BLOCKS[3] * len(values)
+    return "".join(SPARK_BLOCKS[round((v - lo) / span * (len(SPARK_BLOCKS) - 1))] for v in values)
+
+async def send_embed(inter: discord.Interaction, emb: discord.Embed, *, ephemeral: bool=False, **kw):
     if inter.response.is_done():
-        await inter.followup.send(embed=parchment(title, desc), ephemeral=ephemeral)
+        await inter.followup.send(embed=emb, ephemeral=ephemeral, **kw)
     else:
-        await inter.response.send_message(embed=parchment(title, desc), ephemeral=ephemeral)
+        await inter.response.send_message(embed=emb, ephemeral=ephemeral, **kw)
+
+async def send_ok(inter: discord.Interaction, title: str, desc: str = "", *, ephemeral: bool=False):
+    await send_embed(inter, parchment(title, desc), ephemeral=ephemeral)
 
 async def send_err(inter: discord.Interaction, message: str):
     emb = discord.Embed(title="⚠️ 왕의 칙령", description=message, color=discord.Color.red())
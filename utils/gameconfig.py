@@ -0,0 +1,323 @@
+# utils/gameconfig.py
+"""
+게임 밸런스 설정 레지스트리 (단일 출처 + 국가별 덮어쓰기 + 핫 리로드).
+
+    python -m utils.gameconfig show [--country <id>]
+    python -m utils.gameconfig set <키> '<JSON>' [--country <id>]
+    python -m utils.gameconfig unset <키> [--country <id>]
+
+- 기본값: utils.constants (LAND_TIERS, BASE_DROP, BIAS_BONUS, NPC_*)
+- game_config(country_id, key, value): country_id 0 = 전역, 그 외 그 국가만. 기본값 → 전역 → 국가 순으로 겹친다
+  (land_tiers는 티어·필드 단위로, 나머지 키는 값 통째로)
+- 컴파일: 조회마다 dict를 뒤지지 않도록 불변 GameConfig(티어·누적 드랍표·NPC율)로 만들어 둔다.
+  덮어쓰기가 있는 국가만 따로 만들고 나머지는 전역 객체를 공유 → for_country()는 dict 조회 한 번
+- 리로드: game_config를 바꾸는 문장마다 트리거가 game_config_version을 올리고 무효화 버스로 알린다.
+  알림을 받거나 POLL_S마다 버전만 읽어 바뀌었을 때만 전체를 다시 컴파일해 스냅숏을 통째로 바꿔 끼운다
+"""
+from __future__ import annotations
+import argparse
+import asyncio
+import json
+import os
+import random
+from bisect import bisect_left
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from utils import invalidation
+from utils.constants import BASE_DROP, BIAS_BONUS, LAND_TIERS, NPC_ITEM_RATE, NPC_ITEM_TAX, NPC_RESOURCE_RATE
+from utils.db import execute, fetchall, fetchone
+from utils.log import get_logger
+
+log = get_logger("gameconfig")
+
+POLL_S = int(os.getenv("GAME_CONFIG_POLL_S", "30"))
+GLOBAL = 0
+
+DEFAULTS: Mapping[str, object] = MappingProxyType({
+    "land_tiers": {t: dict(conf) for t, conf in LAND_TIERS.items()},
+    "base_drop": [list(e) for e in BASE_DROP],
+    "bias_bonus": BIAS_BONUS,
+    "npc_resource_rate": NPC_RESOURCE_RATE,
+    "npc_item_rate": NPC_ITEM_RATE,
+    "npc_item_tax": NPC_ITEM_TAX,
+})
+_TIER_FIELDS = ("price", "upkeep", "yield_min", "yield_max")
+_RATE_LIMITS = {"npc_resource_rate": (0.0, 2.0), "npc_item_rate": (0.0, 2.0), "npc_item_tax": (0.0, 1.0)}
+
+
+class ConfigError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class Tier:
+    price: int
+    upkeep: int
+    yield_min: int
+    yield_max: int
+
+
+def drop_table(bias: Optional[str], base, bonus: int) -> list[tuple[str, int]]:
+    """편향을 더한 드랍 확률(%) — 합이 100이 되도록 반올림 오차는 첫 항목에 몰아준다"""
+    table = [(i, p + (bonus if i == bias else 0)) for i, p in base]
+    s = sum(p for _, p in table)
+    table = [(i, round(p * 100 / s)) for i, p in table]
+    diff = 100 - sum(p for _, p in table)
+    if diff:
+        i0, p0 = table[0]
+        table[0] = (i0, p0 + diff)
+    return table
+
+
+@dataclass(frozen=True)
+class GameConfig:
+    source: Mapping[str, object]          # 합쳐진 원본 값 (덮어쓰기를 더 얹을 때)
+    tiers: Mapping[int, Tier]
+    base_drop: tuple[tuple[str, int], ...]
+    bias_bonus: int
+    resource_rate: float                  # npc_resource_rate
+    item_rate: float                      # npc_item_rate
+    item_tax_rate: float                  # npc_item_tax
+    drops: Mapping[Optional[str], tuple[tuple[str, ...], tuple[int, ...]]]   # 편향 → (자원, 누적 %)
+
+    def tier(self, tier: int) -> Tier:
+        return self.tiers.get(tier) or self.tiers[min(self.tiers)]
+
+    def drop_table(self, bias: Optional[str]) -> list[tuple[str, int]]:
+        items, cum = self.drops.get(bias) or self.drops[None]
+        return [(i, c - (cum[k - 1] if k else 0)) for k, (i, c) in enumerate(zip(items, cum))]
+
+    def roll_harvest(self, tier: int, bias: str, rng=None) -> dict[str, int]:
+        """티어 수확량 범위 안에서 드랍 누적표로 자원을 뽑는다"""
+        rng = rng or random
+        t = self.tier(tier)
+        items, cum = self.drops.get(bias) or self.drops[None]
+        results: dict[str, int] = {}
+        for _ in range(rng.randint(t.yield_min, t.yield_max)):
+            k = bisect_left(cum, rng.randint(1, 100))
+            if k < len(items):
+                results[items[k]] = results.get(items[k], 0) + 1
+        return results
+
+    def npc_unit_price(self, base_price: int, typ: str) -> int:
+        """NPC 매입 단가 (자원/아이템 고정률)"""
+        return round(int(base_price) * (self.resource_rate if typ == "resource" else self.item_rate))
+
+    def npc_item_tax(self, gross: int) -> int:
+        """아이템 매각액에 붙는 국고 세금 (자원은 면세)"""
+        return round(gross * self.item_tax_rate)
+
+
+def merge(base: Mapping[str, object], overrides: Mapping[str, object]) -> dict:
+    out = dict(base)
+    for key, val in overrides.items():
+        if key not in DEFAULTS:
+            raise ConfigError(f"알 수 없는 키: {key}")
+        if key == "land_tiers":
+            if not isinstance(val, dict):
+                raise ConfigError("land_tiers는 {티어: {필드: 값}} 형태여야 합니다.")
+            tiers = {t: dict(conf) for t, conf in out["land_tiers"].items()}
+            for t, conf in val.items():
+                t = int(t)
+                if not isinstance(conf, dict) or set(conf) - set(_TIER_FIELDS):
+                    raise ConfigError(f"티어 {t}: 필드는 {', '.join(_TIER_FIELDS)}만 쓸 수 있습니다.")
+                if t not in tiers and set(conf) != set(_TIER_FIELDS):
+                    raise ConfigError(f"새 티어 {t}는 모든 필드가 필요합니다.")
+                tiers.setdefault(t, {}).update(conf)
+            out["land_tiers"] = tiers
+        else:
+            out[key] = val
+    return out
+
+
+def compile_config(source: Mapping[str, object]) -> GameConfig:
+    """합쳐진 값 검증 + 조회 구조 생성. 잘못된 값이면 ConfigError"""
+    try:
+        tiers = {}
+        for t, conf in source["land_tiers"].items():
+            tier = Tier(*(int(conf[f]) for f in _TIER_FIELDS))
+            if tier.price < 0 or tier.upkeep < 0 or not 0 <= tier.yield_min <= tier.yield_max:
+                raise ConfigError(f"티어 {t}: 값 범위가 잘못되었습니다.")
+            tiers[int(t)] = tier
+        base_drop = tuple((str(i), int(p)) for i, p in source["base_drop"])
+        bonus = int(source["bias_bonus"])
+        rates = {k: float(source[k]) for k in _RATE_LIMITS}
+    except (KeyError, TypeError, ValueError) as e:
+        if isinstance(e, ConfigError):
+            raise
+        raise ConfigError(f"형식 오류: {e}") from None
+    if not tiers:
+        raise ConfigError("티어가 하나 이상 필요합니다.")
+    if not base_drop or any(p < 0 for _, p in base_drop) or sum(p for _, p in base_drop) <= 0 or bonus < 0:
+        raise ConfigError("드랍 가중치는 0 이상, 합은 양수여야 합니다.")
+    for k, (lo, hi) in _RATE_LIMITS.items():
+        if not lo <= rates[k] <= hi:
+            raise ConfigError(f"{k}는 {lo}~{hi} 사이여야 합니다.")
+
+    drops = {}
+    for bias in (None, *(i for i, _ in base_drop)):
+        table = drop_table(bias, base_drop, bonus)
+        cum, acc = [], 0
+        for _, p in table:
+            acc += p
+            cum.append(acc)
+        drops[bias] = (tuple(i for i, _ in table), tuple(cum))
+    return GameConfig(
+        source=MappingProxyType(dict(source)),
+        tiers=MappingProxyType(tiers),
+        base_drop=base_drop,
+        bias_bonus=bonus,
+        resource_rate=rates["npc_resource_rate"],
+        item_rate=rates["npc_item_rate"],
+        item_tax_rate=rates["npc_item_tax"],
+        drops=MappingProxyType(drops),
+    )
+
+
+# ---------- 레지스트리 ----------
+@dataclass(frozen=True)
+class _Snapshot:
+    version: int
+    glob: GameConfig
+    countries: Mapping[int, GameConfig]
+
+
+_snap = _Snapshot(-1, compile_config(DEFAULTS), MappingProxyType({}))
+_lock = asyncio.Lock()
+
+
+def current() -> GameConfig:
+    return _snap.glob
+
+
+def for_country(cid: int) -> GameConfig:
+    snap = _snap
+    return snap.countries.get(cid, snap.glob)
+
+
+def version() -> int:
+    return _snap.version
+
+
+def _value(v):
+    return json.loads(v) if isinstance(v, str) else v
+
+
+def _build(version: int, rows) -> _Snapshot:
+    """행 → 스냅숏. 잘못된 덮어쓰기는 건너뛰고(로그) 나머지로 계속 서비스한다"""
+    scoped: dict[int, dict] = {}
+    for r in rows:
+        scoped.setdefault(int(r["country_id"]), {})[r["key"]] = _value(r["value"])
+    try:
+        glob = compile_config(merge(DEFAULTS, scoped.pop(GLOBAL, {})))
+    except ConfigError as e:
+        log.error("전역 설정 오류 — 기본값 사용", extra={"error": str(e)})
+        glob = compile_config(DEFAULTS)
+    countries = {}
+    for cid, over in scoped.items():
+        try:
+            countries[cid] = compile_config(merge(glob.source, over))
+        except ConfigError as e:
+            log.error("국가 설정 오류 — 전역 값 사용", extra={"country": cid, "error": str(e)})
+    return _Snapshot(version, glob, MappingProxyType(countries))
+
+
+async def load(force: bool = False) -> bool:
+    """버전이 바뀌었을 때만 다시 읽어 원자적으로 교체. 교체했으면 True"""
+    global _snap
+    async with _lock:
+        row = await fetchone("SELECT version FROM game_config_version")
+        v = int(row["version"]) if row else 0
+        if v == _snap.version and not force:
+            return False
+        rows = await fetchall("SELECT country_id, key, value FROM game_config")
+        _snap = _build(v, rows)
+    log.info("게임 설정 적용", extra={"version": v, "overrides": len(rows), "countries": len(_snap.countries)})
+    return True
+
+
+async def run_job() -> None:
+    while True:
+        await asyncio.sleep(POLL_S)
+        try:
+            await load()
+        except Exception:
+            log.exception("게임 설정 리로드 실패")
+
+
+async def _reload(country_id: Optional[int] = None, key: object = None) -> None:
+    try:
+        await load()
+    except Exception:
+        log.exception("게임 설정 리로드 실패")
+
+
+invalidation.on("game_config", _reload)
+
+
+# ---------- 변경 (운영 CLI) ----------
+async def set_value(key: str, value, cid: int = GLOBAL) -> None:
+    """검증 후 저장. 트리거가 버전을 올리고 모든 프로세스에 알린다"""
+    rows = await fetchall("SELECT country_id, key, value FROM game_config WHERE country_id IN ($1, $2)", (GLOBAL, cid))
+    mine = {r["key"]: _value(r["value"]) for r in rows if r["country_id"] == cid}
+    if key == "land_tiers" and isinstance(value, dict) and isinstance(mine.get(key), dict):
+        # 티어 덮어쓰기는 기존 덮어쓰기에 필드 단위로 더한다
+        combined = {str(t): dict(conf) for t, conf in mine[key].items()}
+        for t, conf in value.items():
+            combined.setdefault(str(t), {}).update(conf)
+        value = combined
+    mine[key] = value
+    base = merge(DEFAULTS, {r["key"]: _value(r["value"]) for r in rows if r["country_id"] == GLOBAL}) \
+        if cid != GLOBAL else DEFAULTS
+    compile_config(merge(base, mine))
+    await execute(
+        "INSERT INTO game_config(country_id, key, value) VALUES ($1, $2, $3::jsonb) "
+        "ON CONFLICT (country_id, key) DO UPDATE SET value=EXCLUDED.value, updated_at=NOW()",
+        (cid, key, json.dumps(value, ensure_ascii=False)),
+    )
+
+
+async def unset(key: str, cid: int = GLOBAL) -> bool:
+    row = await fetchone("DELETE FROM game_config WHERE country_id=$1 AND key=$2 RETURNING 1 AS ok", (cid, key))
+    return row is not None
+
+
+async def _main_async(args) -> None:
+    from utils import db
+    await db.init_db()
+    cid = args.country or GLOBAL
+    try:
+        if args.cmd == "set":
+            try:
+                await set_value(args.key, json.loads(args.value), cid)
+            except (ConfigError, ValueError) as e:
+                raise SystemExit(f"설정 거부: {e}")
+        elif args.cmd == "unset" and not await unset(args.key, cid):
+            print("설정되어 있지 않습니다.")
+        await load(force=True)
+        cfg = for_country(cid)
+        print(f"version {version()}" + (f" · 국가 {cid}" if cid else " · 전역"))
+        print(json.dumps(dict(cfg.source), ensure_ascii=False, indent=1, default=str))
+    finally:
+        await db.POOL.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="kingdom_bot 게임 밸런스 설정")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    sh = sub.add_parser("show", help="적용되는 값 (기본값+전역+국가)")
+    sh.add_argument("--country", type=int)
+    st = sub.add_parser("set", help=f"키: {', '.join(DEFAULTS)}")
+    st.add_argument("key", choices=list(DEFAULTS))
+    st.add_argument("value", help='JSON. 예: 0.6 / {"3": {"yield_max": 10}}')
+    st.add_argument("--country", type=int, help="이 국가만 (없으면 전역)")
+    un = sub.add_parser("unset", help="덮어쓰기 제거")
+    un.add_argument("key", choices=list(DEFAULTS))
+    un.add_argument("--country", type=int)
+    asyncio.run(_main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
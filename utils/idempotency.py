@@ -0,0 +1,127 @@
+# utils/idempotency.py
+"""
+변경 명령의 멱등 처리. interaction id를 키로, 같은 트랜잭션 안에서 키를 선점하고 결과를 남긴다.
+
+- 키 선점·변경·결과 기록이 한 번에 커밋되므로, 롤백된 시도는 흔적이 없고(재시도 가능)
+  커밋된 시도는 다시 실행되지 않는다 → 같은 interaction을 다시 처리하면 저장된 응답만 보낸다.
+- 동시에 같은 키가 들어오면 뒤의 INSERT가 앞 트랜잭션 종료까지 기다렸다가 결과를 읽는다.
+- 응답은 Discord가 15분 뒤 토큰을 폐기하므로 IDEMPOTENCY_TTL_MIN(기본 60분)만 보관한다.
+"""
+from __future__ import annotations
+import asyncio
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Awaitable, Callable
+
+import discord
+
+from utils import retry
+from utils.catalog import json_obj
+from utils.db import Tx, fetchone, transaction
+from utils.embeds import send_err, send_ok
+from utils.log import get_logger
+
+log = get_logger("idempotency")
+
+TTL_MIN = int(os.getenv("IDEMPOTENCY_TTL_MIN", "60"))
+PURGE_INTERVAL = 600
+PURGE_BATCH = 5000
+
+replays = 0  # 저장된 응답으로 대신한 횟수
+
+
+@dataclass
+class Result:
+    """명령의 최종 응답(임베드 제목/본문). err=True면 send_err로 보낸다"""
+    title: str
+    desc: str
+    err: bool = False
+
+    @classmethod
+    def fail(cls, message: str) -> "Result":
+        return cls("", message, True)
+
+
+async def claim(tx: Tx, key: int, command: str) -> Result | None:
+    """키를 선점하면 None, 이미 처리된 키면 저장된 Result"""
+    got = await tx.fetchval(
+        "INSERT INTO idempotency_keys(interaction_id, command) VALUES ($1,$2) "
+        "ON CONFLICT (interaction_id) DO NOTHING RETURNING 1",
+        (key, command),
+    )
+    if got:
+        return None
+    row = await tx.fetchone("SELECT result FROM idempotency_keys WHERE interaction_id=$1", (key,))
+    return Result(**json_obj(row["result"])) if row and row["result"] is not None else Result.fail(
+        "이미 처리 중인 요청입니다."
+    )
+
+
+async def store(tx: Tx, key: int, result: Result) -> None:
+    await tx.execute(
+        "UPDATE idempotency_keys SET result=$2::jsonb WHERE interaction_id=$1",
+        (key, json.dumps(asdict(result), ensure_ascii=False)),
+    )
+
+
+async def run_once(
+    inter: discord.Interaction,
+    command: str,
+    fn: Callable[[Tx], Awaitable[Result]],
+    *,
+    isolation: str = "read_committed",
+) -> Result:
+    """
+    fn(tx)를 키 선점과 같은 트랜잭션에서 한 번만 실행. fn이 예외를 던지면 선점도 롤백된다.
+    일시적 DB 오류(직렬화 실패·연결 끊김 등)는 인터랙션 응답 기한 안에서 통째로 재시도한다.
+    커밋 직후 연결이 끊겨 결과를 못 받은 경우에도 재시도는 저장된 결과를 돌려받을 뿐이다.
+    """
+    async def attempt() -> Result:
+        global replays
+        async with transaction(isolation) as tx:
+            cached = await claim(tx, inter.id, command)
+            if cached is not None:
+                replays += 1
+                log.info("중복 요청 재응답", extra={"command": command, "interaction": inter.id})
+                return cached
+            result = await fn(tx)
+            await store(tx, inter.id, result)
+        return result
+
+    return await retry.run(attempt, deadline=retry.deadline_for(inter))
+
+
+async def reply(inter: discord.Interaction, result: Result) -> None:
+    if result.err:
+        await send_err(inter, result.desc)
+    else:
+        await send_ok(inter, result.title, result.desc)
+
+
+async def purge() -> int:
+    removed = 0
+    while True:
+        row = await fetchone(
+            "WITH d AS (DELETE FROM idempotency_keys WHERE interaction_id IN ("
+            "  SELECT interaction_id FROM idempotency_keys "
+            "  WHERE created_at < NOW() - make_interval(mins => $1) LIMIT $2"
+            ") RETURNING 1) SELECT count(*) AS n FROM d",
+            (TTL_MIN, PURGE_BATCH),
+        )
+        n = int(row["n"])
+        removed += n
+        if n < PURGE_BATCH:
+            return removed
+        await asyncio.sleep(0.05)
+
+
+async def run_job() -> None:
+    while True:
+        try:
+            n = await purge()
+            if n:
+                log.info("만료된 멱등 키 정리", extra={"rows": n, "sample": 0.1})
+        except Exception:
+            log.exception("멱등 키 정리 실패")
+        await asyncio.sleep(PURGE_INTERVAL)
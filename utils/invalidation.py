@@ -0,0 +1,171 @@
+# utils/invalidation.py
+"""
+프로세스 간 캐시 무효화 버스 (Postgres LISTEN/NOTIFY).
+
+봇 프로세스가 여럿이면 한쪽에서 바꾼 데이터를 다른 쪽 메모리 캐시가 모른다.
+- publish(table, country_id, key): 바꾼 쪽이 자기 캐시를 지운 뒤 호출. 다른 프로세스로만 전파
+- on(table, handler): handler(country_id, key)로 그 키를 지운다. None은 '전부'
+- 전송: 전용 연결 하나에서 LISTEN + pg_notify. DEBOUNCE_MS 동안 모아 같은 이벤트는 한 번으로,
+  한 (table, country)에 키가 COLLAPSE개를 넘으면 그 국가 전체 한 건으로 접는다
+- 연결이 끊겼다 붙으면 그 사이 이벤트를 놓쳤을 수 있으므로 모든 handler를 (None, None)으로 부른다
+- INVAL_BUS=0 이면 끈다(단일 프로세스)
+"""
+from __future__ import annotations
+import asyncio
+import inspect
+import json
+import os
+import secrets
+from typing import Callable, Optional, Union
+
+import asyncpg
+
+from utils.log import get_logger
+
+log = get_logger("invalidation")
+
+ENABLED = os.getenv("INVAL_BUS", "1") != "0"
+CHANNEL = "kingdom_inval"
+DEBOUNCE = int(os.getenv("INVAL_DEBOUNCE_MS", "200")) / 1000
+COLLAPSE = 64
+MAX_PAYLOAD = 7500          # NOTIFY 한도 8000바이트 아래로
+PROC = f"{os.getpid()}-{secrets.token_hex(3)}"
+
+Key = Union[int, str, None]
+Handler = Callable[[Optional[int], Key], object]
+
+_handlers: dict[str, list[Handler]] = {}
+_pending: dict[tuple[str, Optional[int]], Optional[set]] = {}   # None = 그 범위 전체
+_wake = asyncio.Event()
+_running = False
+stats = {"published": 0, "coalesced": 0, "notifies": 0, "received": 0, "reconnects": 0}
+
+
+def on(table: str, handler: Handler) -> None:
+    _handlers.setdefault(table, []).append(handler)
+
+
+def publish(table: str, country_id: Optional[int] = None, key: Key = None) -> None:
+    if not _running:
+        return
+    stats["published"] += 1
+    scope = (table, country_id)
+    if scope in _pending and _pending[scope] is None:
+        stats["coalesced"] += 1
+        return
+    if key is None:
+        if scope in _pending:
+            stats["coalesced"] += 1
+        _pending[scope] = None
+    else:
+        keys = _pending.setdefault(scope, set())
+        if key in keys:
+            stats["coalesced"] += 1
+        keys.add(key)
+        if len(keys) > COLLAPSE:
+            _pending[scope] = None
+    _wake.set()
+
+
+def _dispatch(table: str, country_id: Optional[int], key: Key) -> None:
+    for h in _handlers.get(table, ()):
+        try:
+            res = h(country_id, key)
+            if inspect.isawaitable(res):
+                asyncio.ensure_future(res)
+        except Exception:
+            log.exception("무효화 처리 실패", extra={"table": table})
+
+
+def _on_notify(conn, pid, channel, payload: str) -> None:
+    try:
+        msg = json.loads(payload)
+    except ValueError:
+        return
+    if msg.get("p") == PROC:
+        return
+    stats["received"] += 1
+    for table, cid, key in msg.get("e", ()):
+        _dispatch(table, cid, key)
+
+
+def _drain() -> list[list]:
+    """대기 중인 이벤트를 payload가 MAX_PAYLOAD 이하가 되도록 묶음 여러 개로"""
+    events = []
+    for (table, cid), keys in _pending.items():
+        if keys is None:
+            events.append([table, cid, None])
+        else:
+            events.extend([table, cid, k] for k in keys)
+    _pending.clear()
+    out, chunk, size = [], [], 0
+    for e in events:
+        n = len(json.dumps(e, ensure_ascii=False).encode()) + 1
+        if chunk and size + n > MAX_PAYLOAD:
+            out.append(chunk)
+            chunk, size = [], 0
+        chunk.append(e)
+        size += n
+    if chunk:
+        out.append(chunk)
+    return out
+
+
+def _restore(chunks: list[list]) -> None:
+    """보내지 못한 묶음을 다음 연결에서 다시 보내도록 되돌린다"""
+    for chunk in chunks:
+        for table, cid, key in chunk:
+            publish(table, cid, key)
+
+
+async def _session(conn: asyncpg.Connection) -> None:
+    lost = asyncio.Event()
+    conn.add_termination_listener(lambda c: lost.set())
+    await conn.add_listener(CHANNEL, _on_notify)
+    lost_w = asyncio.ensure_future(lost.wait())
+    try:
+        while True:
+            wake_w = asyncio.ensure_future(_wake.wait())
+            await asyncio.wait([wake_w, lost_w], return_when=asyncio.FIRST_COMPLETED)
+            if lost.is_set():
+                wake_w.cancel()
+                return
+            await asyncio.sleep(DEBOUNCE)
+            _wake.clear()
+            chunks = _drain()
+            for i, chunk in enumerate(chunks):
+                payload = json.dumps({"p": PROC, "e": chunk}, ensure_ascii=False, separators=(",", ":"))
+                try:
+                    await conn.execute("SELECT pg_notify($1, $2)", CHANNEL, payload)
+                except Exception:
+                    _restore(chunks[i:])
+                    raise
+                stats["notifies"] += 1
+    finally:
+        lost_w.cancel()
+
+
+async def run_job() -> None:
+    global _running
+    if not ENABLED:
+        return
+    dsn = os.getenv("DATABASE_URL")
+    _running = True
+    first = True
+    while True:
+        conn = None
+        try:
+            conn = await asyncpg.connect(dsn)
+            if not first:
+                stats["reconnects"] += 1
+                log.warning("무효화 버스 재연결 — 캐시 전체 비움")
+                for table in list(_handlers):
+                    _dispatch(table, None, None)
+            first = False
+            await _session(conn)
+        except Exception:
+            log.exception("무효화 버스 연결 오류")
+        finally:
+            if conn is not None and not conn.is_closed():
+                await conn.close()
+        await asyncio.sleep(5)
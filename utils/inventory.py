@@ -0,0 +1,140 @@
+# utils/inventory.py
+"""
+인벤토리 차감과 0수량 행 정리.
+
+- debit()/debit_many(): 잔량 검사와 차감을 한 문장으로. 딱 맞게 쓰면 행을 지우고(DELETE),
+  남으면 줄인다(UPDATE). 부족하면 아무것도 바꾸지 않는다 → qty는 0이 되지 않고 음수도 불가.
+- run_job(): 예전 코드/수동 수정으로 남은 qty=0 행을 배치로 지우고 회수량을 기록한다.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from typing import Mapping, Optional
+
+from utils.db import Tx, fetchone, transaction
+from utils.log import get_logger
+
+log = get_logger("inventory")
+
+COMPACT_INTERVAL = int(os.getenv("INVENTORY_COMPACT_S", "3600"))
+COMPACT_BATCH = int(os.getenv("INVENTORY_COMPACT_BATCH", "5000"))
+
+# 두 CTE는 같은 스냅샷에서 qty=n / qty>n 으로 갈리므로 한 행에 둘 다 걸리지 않는다
+_DEBIT = """
+WITH del AS (
+  DELETE FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id=$3 AND qty=$4
+  RETURNING 0::bigint AS qty
+), upd AS (
+  UPDATE inventory SET qty=qty-$4 WHERE country_id=$1 AND user_id=$2 AND item_id=$3 AND qty>$4
+  RETURNING qty
+)
+SELECT qty FROM del UNION ALL SELECT qty FROM upd
+"""
+
+_DEBIT_MANY = """
+WITH d AS (
+  SELECT * FROM unnest($3::text[], $4::bigint[]) AS d(item_id, n)
+), del AS (
+  DELETE FROM inventory i USING d
+  WHERE i.country_id=$1 AND i.user_id=$2 AND i.item_id=d.item_id AND i.qty=d.n
+  RETURNING i.item_id
+), upd AS (
+  UPDATE inventory i SET qty=i.qty-d.n FROM d
+  WHERE i.country_id=$1 AND i.user_id=$2 AND i.item_id=d.item_id AND i.qty>d.n
+  RETURNING i.item_id
+)
+SELECT (SELECT count(*) FROM del) + (SELECT count(*) FROM upd)
+"""
+
+_COMPACT_BATCH = """
+WITH z AS (
+  SELECT ctid FROM inventory WHERE qty = 0 LIMIT $1 FOR UPDATE SKIP LOCKED
+), d AS (
+  DELETE FROM inventory i USING z WHERE i.ctid = z.ctid AND i.qty = 0 RETURNING 1
+)
+SELECT count(*) AS n FROM d
+"""
+
+last_run: dict = {}   # 마지막 정리 결과 (관리 보고용)
+
+
+class InsufficientStock(Exception):
+    pass
+
+
+async def debit(cid: int, uid: int, item_id: str, qty: int, tx: Optional[Tx] = None) -> Optional[int]:
+    """qty만큼 차감하고 남은 수량을 반환. 보유량이 모자라면 None (변경 없음)"""
+    if qty <= 0:
+        return None
+    params = (cid, uid, item_id, qty)
+    row = await (tx.fetchone(_DEBIT, params) if tx is not None else fetchone(_DEBIT, params))
+    return None if row is None else int(row["qty"])
+
+
+async def debit_many(tx: Tx, cid: int, uid: int, amounts: Mapping[str, int]) -> None:
+    """
+    여러 품목을 한 문장으로 차감. 하나라도 모자라면 InsufficientStock을 던지므로
+    호출자의 트랜잭션이 통째로 롤백된다. (어느 품목인지는 호출자가 미리 검사해 안내)
+    """
+    amounts = {k: int(v) for k, v in amounts.items() if v > 0}
+    if not amounts:
+        return
+    done = await tx.fetchval(_DEBIT_MANY, (cid, uid, list(amounts), list(amounts.values())))
+    if done != len(amounts):
+        raise InsufficientStock()
+
+
+async def drop_empty(tx: Tx, cid: int, uid: int, item_ids: list[str]) -> None:
+    """증감을 한꺼번에 반영한 뒤(연쇄 제작 등) 0이 된 행 제거"""
+    await tx.execute(
+        "DELETE FROM inventory WHERE country_id=$1 AND user_id=$2 AND item_id = ANY($3::text[]) AND qty=0",
+        (cid, uid, item_ids),
+    )
+
+
+async def compact() -> dict:
+    """qty=0 행을 COMPACT_BATCH개씩 지운다. 배치 사이에 양보해 다른 쿼리를 막지 않는다."""
+    before = await fetchone(
+        "SELECT pg_total_relation_size('inventory') AS bytes, "
+        "GREATEST(c.reltuples, 1) AS tuples FROM pg_class c WHERE c.oid = 'inventory'::regclass"
+    )
+    removed = 0
+    while True:
+        n = int((await fetchone(_COMPACT_BATCH, (COMPACT_BATCH,)))["n"])
+        removed += n
+        if n < COMPACT_BATCH:
+            break
+        await asyncio.sleep(0.05)
+    # 지운 행이 차지하던 공간(평균 행 크기 × 행 수, 인덱스 포함 추정). autovacuum 후 재사용된다
+    table_bytes = int(before["bytes"]) if before else 0
+    per_row = table_bytes / float(before["tuples"]) if before else 0.0
+    last_run.update(rows=removed, approx_bytes=int(per_row * removed), table_bytes=table_bytes)
+    return dict(last_run)
+
+
+async def validate_constraint() -> bool:
+    """init_db가 NOT VALID로 붙인 CHECK(qty>=0)를 검증. 이미 검증됐으면 아무것도 안 함"""
+    row = await fetchone("SELECT convalidated FROM pg_constraint WHERE conname='inventory_qty_nonneg'")
+    if row is None or row["convalidated"]:
+        return False
+    async with transaction() as tx:
+        # 예전 검사-후-차감 레이스로 생긴 음수는 0으로 맞춘다(아래 정리에서 지워짐)
+        fixed = await tx.execute("UPDATE inventory SET qty=0 WHERE qty<0")
+        await tx.execute("ALTER TABLE inventory VALIDATE CONSTRAINT inventory_qty_nonneg")
+    log.info("인벤토리 CHECK(qty>=0) 검증 완료", extra={"fixed": fixed})
+    return True
+
+
+async def run_job() -> None:
+    try:
+        await validate_constraint()
+    except Exception:
+        log.exception("인벤토리 제약 검증 실패")
+    while True:
+        try:
+            res = await compact()
+            if res["rows"]:
+                log.info("인벤토리 0수량 행 정리", extra=res)
+        except Exception:
+            log.exception("인벤토리 정리 실패")
+        await asyncio.sleep(COMPACT_INTERVAL)
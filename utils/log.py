@@ -0,0 +1,129 @@
+# utils/log.py
+"""구조화(JSON) 로깅. 실제 stdout/파일 I/O는 QueueListener 스레드에서 처리한다."""
+from __future__ import annotations
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Optional
+
+# 현재 처리 중인 인터랙션의 guild/user/command (KingdomTree가 설정)
+log_ctx: ContextVar[dict] = ContextVar("kingdom_log_ctx", default={})
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# LogRecord 기본 속성(구조화 필드 추출 시 제외)
+_RESERVED = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "sample"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    return logging.getLogger(f"kingdom.{name}")
+
+
+def set_context(**fields: Any):
+    """log_ctx에 필드를 덧붙이고 reset용 토큰을 돌려준다"""
+    return log_ctx.set({**log_ctx.get(), **fields})
+
+
+class ContextFilter(logging.Filter):
+    """emit 시점(이벤트 루프 스레드)의 contextvar를 레코드에 복사"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        for k, v in log_ctx.get().items():
+            if not hasattr(record, k):
+                setattr(record, k, v)
+        return True
+
+
+class SampleFilter(logging.Filter):
+    """INFO 이하 레코드 중 `extra={"sample": 0.1}`이 붙은 것은 해당 확률로만 통과"""
+
+    def __init__(self, default_rate: float = 1.0):
+        super().__init__()
+        self.default_rate = default_rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.INFO:
+            return True
+        rate = getattr(record, "sample", None)
+        if rate is None:
+            rate = self.default_rate if record.name.startswith("discord") else 1.0
+        return rate >= 1.0 or random.random() < rate
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """
+    기본 prepare()는 루프 스레드에서 전체 포맷팅을 수행한다.
+    여기서는 메시지/트레이스백 문자열만 확정하고 JSON 직렬화는 리스너 스레드로 미룬다.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg = record.message
+        record.args = None
+        record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        out = {
+            "ts": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for k, v in record.__dict__.items():
+            if k not in _RESERVED and not k.startswith("_"):
+                out[k] = v
+        if record.exc_text:
+            out["exc"] = record.exc_text
+        return json.dumps(out, ensure_ascii=False, default=str)
+
+
+def setup_logging(level: str | int | None = None, file: str | None = None) -> None:
+    """
+    루트 로거에 QueueHandler 하나만 달고, stdout/파일 핸들러는 리스너 스레드에서 돌린다.
+    LOG_LEVEL, LOG_FILE, LOG_INFO_SAMPLE(discord.* INFO 샘플링 비율) 환경변수를 따른다.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    file = file or os.getenv("LOG_FILE")
+
+    fmt = JsonFormatter()
+    sinks: list[logging.Handler] = [logging.StreamHandler(sys.stdout)]
+    if file:
+        sinks.append(logging.handlers.RotatingFileHandler(
+            file, maxBytes=20 * 1024 * 1024, backupCount=5, encoding="utf-8"
+        ))
+    for h in sinks:
+        h.setFormatter(fmt)
+
+    q: queue.SimpleQueue = queue.SimpleQueue()
+    qh = _QueueHandler(q)
+    qh.addFilter(SampleFilter(float(os.getenv("LOG_INFO_SAMPLE", "1.0"))))
+    qh.addFilter(ContextFilter())
+
+    root = logging.getLogger()
+    root.handlers[:] = [qh]
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(q, *sinks, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """큐에 남은 레코드를 모두 내보내고 리스너 스레드를 종료"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,84 @@
+# utils/market_global.py
+"""
+전 국가 통합 시장 요약 (market_global 머티리얼라이즈드 뷰).
+
+- 실시간 전체 스캔 대신 MARKET_GLOBAL_REFRESH_S 주기로 REFRESH ... CONCURRENTLY
+- 여러 봇 프로세스가 있어도 advisory lock을 잡은 하나만 REFRESH하고, 모두 결과를 메모리에 읽어 둔다
+  (REFRESH한 쪽이 'market_global' 이벤트를 보내면 나머지는 주기를 기다리지 않고 바로 다시 읽는다)
+- get()/all()은 메모리 스냅샷만 보므로 DB 왕복이 없다
+"""
+from __future__ import annotations
+import asyncio
+import os
+from datetime import datetime
+from typing import Optional
+
+from utils import invalidation
+from utils.db import fetchall, transaction
+from utils.log import get_logger
+
+log = get_logger("market_global")
+
+REFRESH_INTERVAL = int(os.getenv("MARKET_GLOBAL_REFRESH_S", "300"))
+_LOCK_KEY = 0x4B474D31  # 'KGM1'
+
+_snapshot: dict[str, dict] = {}
+refreshed_at: Optional[datetime] = None
+
+
+def get(item_id: str) -> Optional[dict]:
+    """item_id의 통합 요약: open_qty, best_ask, countries, volume_24h, vwap_24h"""
+    return _snapshot.get(item_id)
+
+
+def all_items() -> list[dict]:
+    return list(_snapshot.values())
+
+
+def reference_price(item_id: str) -> Optional[int]:
+    """국가별 시세의 참고가: 24시간 거래 가중평균, 없으면 최저 호가"""
+    row = _snapshot.get(item_id)
+    if not row:
+        return None
+    return row["vwap_24h"] or row["best_ask"]
+
+
+async def load() -> None:
+    global _snapshot, refreshed_at
+    rows = await fetchall(
+        "SELECT item_id, open_qty, best_ask, countries, volume_24h, vwap_24h, refreshed_at FROM market_global"
+    )
+    _snapshot = {r["item_id"]: dict(r) for r in rows}
+    refreshed_at = rows[0]["refreshed_at"] if rows else None
+
+
+async def refresh() -> bool:
+    """REFRESH 수행(다른 프로세스가 진행 중이면 건너뜀) 후 스냅샷 재적재"""
+    did = False
+    async with transaction() as tx:
+        if await tx.fetchval("SELECT pg_try_advisory_xact_lock($1)", (_LOCK_KEY,)):
+            await tx.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY market_global")
+            did = True
+    await load()
+    if did:
+        invalidation.publish("market_global")
+    return did
+
+
+async def _reload(country_id: Optional[int], key: object) -> None:
+    try:
+        await load()
+    except Exception:
+        log.exception("통합 시장 요약 재적재 실패")
+
+
+invalidation.on("market_global", _reload)
+
+
+async def run_job() -> None:
+    while True:
+        try:
+            await refresh()
+        except Exception:
+            log.exception("통합 시장 요약 갱신 실패")
+        await asyncio.sleep(REFRESH_INTERVAL)
@@ -0,0 +1,149 @@
+# utils/metrics.py
+"""명령별 지연/DB 왕복 계측 (프로세스 메모리 내)."""
+from __future__ import annotations
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Optional
+
+WINDOW = 512  # 명령별로 유지하는 최근 지연 샘플 수
+
+class Invocation:
+    """명령 1회 실행 동안 누적되는 DB 통계"""
+    __slots__ = ("name", "db_calls", "db_time", "failed")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.db_calls = 0
+        self.db_time = 0.0
+        self.failed = False
+
+
+class CommandStats:
+    __slots__ = ("samples", "count", "errors", "db_calls", "db_time", "max_db_calls")
+
+    def __init__(self):
+        self.samples: deque[float] = deque(maxlen=WINDOW)
+        self.count = 0
+        self.errors = 0
+        self.db_calls = 0
+        self.db_time = 0.0
+        self.max_db_calls = 0
+
+
+_current: ContextVar[Optional[Invocation]] = ContextVar("kingdom_invocation", default=None)
+STATS: dict[str, CommandStats] = {}
+# 명령 밖(백그라운드 태스크, init_db 등)에서 발생한 DB 호출
+BACKGROUND = Invocation("(background)")
+
+
+def record_db(elapsed: float, calls: int = 1) -> None:
+    """utils.db 헬퍼가 왕복마다 호출"""
+    inv = _current.get() or BACKGROUND
+    inv.db_calls += calls
+    inv.db_time += elapsed
+
+
+def current() -> Optional[Invocation]:
+    return _current.get()
+
+
+def fail() -> None:
+    """지금 계측 중인 명령을 오류로 센다. discord.py는 명령 예외를 삼키고 on_error로만 넘기므로
+    예외가 track 밖으로 나오지 않는다 (KingdomTree.on_error가 호출)"""
+    inv = _current.get()
+    if inv is not None:
+        inv.failed = True
+
+
+class track:
+    """`async with track("길드 정산"):` 블록의 지연과 DB 사용량을 기록"""
+    __slots__ = ("inv", "t0", "token")
+
+    def __init__(self, name: str):
+        self.inv = Invocation(name)
+
+    async def __aenter__(self) -> Invocation:
+        self.token = _current.set(self.inv)
+        self.t0 = time.perf_counter()
+        return self.inv
+
+    async def __aexit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.t0
+        _current.reset(self.token)
+        st = STATS.get(self.inv.name)
+        if st is None:
+            st = STATS[self.inv.name] = CommandStats()
+        st.samples.append(elapsed)
+        st.count += 1
+        if exc_type is not None or self.inv.failed:
+            st.errors += 1
+        st.db_calls += self.inv.db_calls
+        st.db_time += self.inv.db_time
+        if self.inv.db_calls > st.max_db_calls:
+            st.max_db_calls = self.inv.db_calls
+        return False
+
+
+def _pct(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, round(q * (len(sorted_vals) - 1))))
+    return sorted_vals[k]
+
+
+def snapshot() -> list[dict]:
+    """명령별 요약. 평균 DB 왕복이 많은 순으로 정렬"""
+    out = []
+    for name, st in STATS.items():
+        vals = sorted(st.samples)
+        n = max(st.count, 1)
+        out.append({
+            "name": name,
+            "count": st.count,
+            "errors": st.errors,
+            "p50": _pct(vals, 0.50),
+            "p95": _pct(vals, 0.95),
+            "p99": _pct(vals, 0.99),
+            "db_calls_avg": st.db_calls / n,
+            "db_calls_max": st.max_db_calls,
+            "db_ms_avg": st.db_time * 1000 / n,
+        })
+    out.sort(key=lambda r: (r["db_calls_avg"], r["p99"]), reverse=True)
+    return out
+
+
+def reset() -> None:
+    STATS.clear()
+    BACKGROUND.db_calls = 0
+    BACKGROUND.db_time = 0.0
+
+
+def _label(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """Prometheus 텍스트 노출 형식 덤프"""
+    lines = [
+        "# TYPE kingdom_command_latency_seconds summary",
+    ]
+    rows = snapshot()
+    for r in rows:
+        lbl = f'command="{_label(r["name"])}"'
+        for q in ("0.5", "0.95", "0.99"):
+            key = {"0.5": "p50", "0.95": "p95", "0.99": "p99"}[q]
+            lines.append(f'kingdom_command_latency_seconds{{{lbl},quantile="{q}"}} {r[key]:.6f}')
+        lines.append(f"kingdom_command_latency_seconds_count{{{lbl}}} {r['count']}")
+    lines.append("# TYPE kingdom_command_errors_total counter")
+    for r in rows:
+        lines.append(f'kingdom_command_errors_total{{command="{_label(r["name"])}"}} {r["errors"]}')
+    lines.append("# TYPE kingdom_db_roundtrips_total counter")
+    for name, st in STATS.items():
+        lines.append(f'kingdom_db_roundtrips_total{{command="{_label(name)}"}} {st.db_calls}')
+    lines.append(f'kingdom_db_roundtrips_total{{command="{BACKGROUND.name}"}} {BACKGROUND.db_calls}')
+    lines.append("# TYPE kingdom_db_seconds_total counter")
+    for name, st in STATS.items():
+        lines.append(f'kingdom_db_seconds_total{{command="{_label(name)}"}} {st.db_time:.6f}')
+    lines.append(f'kingdom_db_seconds_total{{command="{BACKGROUND.name}"}} {BACKGROUND.db_time:.6f}')
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,150 @@
+# utils/orderbook.py
+"""
+(country_id, item_id)별 호가창 스냅샷.
+
+- 앞쪽 SNAPSHOT_ROWS건(가격·ID 오름차순)과 가격대별 깊이를 ORDERBOOK_TTL_S 동안 메모리에 둔다
+- 페이지는 (unit_price, listing_id) 키셋 커서로 자른다. 스냅샷 범위 밖이면 같은 커서로 DB를 읽는다
+- 등록/구매/취소 시 invalidate()로 바로 버린다(다른 프로세스에도 'listings' 이벤트로 전파).
+  같은 키를 동시에 요청하면 적재는 한 번만
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+from bisect import bisect_right
+from dataclasses import dataclass
+from typing import Optional
+
+from utils import invalidation
+from utils.db import fetchall, fetchone
+
+TTL = float(os.getenv("ORDERBOOK_TTL_S", "15"))
+SNAPSHOT_ROWS = 200
+DEPTH_LEVELS = 15
+
+Cursor = tuple[int, int]   # (unit_price, listing_id)
+
+_OPEN = "FROM listings WHERE country_id=$1 AND resource_id=$2 AND status='open'"
+
+
+@dataclass(frozen=True)
+class Listing:
+    unit_price: int
+    listing_id: int
+    seller_id: int
+    qty: int
+
+    @property
+    def cursor(self) -> Cursor:
+        return (self.unit_price, self.listing_id)
+
+
+@dataclass
+class Book:
+    rows: list[Listing]                    # 앞쪽 SNAPSHOT_ROWS건
+    levels: list[tuple[int, int, int]]     # (가격, 수량 합, 매물 수) — 싼 순 DEPTH_LEVELS개
+    total_qty: int
+    total_listings: int
+    complete: bool                         # rows가 모든 매물을 담고 있는지
+    loaded_at: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.loaded_at
+
+
+_books: dict[tuple[int, str], Book] = {}
+_inflight: dict[tuple[int, str], asyncio.Future] = {}
+loads = 0
+
+
+async def _load(cid: int, item_id: str) -> Book:
+    global loads
+    recs = await fetchall(
+        f"SELECT unit_price, listing_id, seller_id, qty {_OPEN} ORDER BY unit_price, listing_id LIMIT $3",
+        (cid, item_id, SNAPSHOT_ROWS + 1),
+    )
+    rows = [Listing(r["unit_price"], r["listing_id"], r["seller_id"], int(r["qty"])) for r in recs]
+    complete = len(rows) <= SNAPSHOT_ROWS
+    rows = rows[:SNAPSHOT_ROWS]
+    if complete:
+        agg: dict[int, list[int]] = {}
+        for li in rows:
+            lv = agg.setdefault(li.unit_price, [0, 0])
+            lv[0] += li.qty
+            lv[1] += 1
+        levels = [(p, q, n) for p, (q, n) in sorted(agg.items())]
+        total_qty, total_listings = sum(li.qty for li in rows), len(rows)
+    else:
+        lv_rows = await fetchall(
+            f"SELECT unit_price, SUM(qty)::bigint AS qty, COUNT(*) AS n {_OPEN} "
+            "GROUP BY unit_price ORDER BY unit_price LIMIT $3",
+            (cid, item_id, DEPTH_LEVELS),
+        )
+        levels = [(r["unit_price"], int(r["qty"]), int(r["n"])) for r in lv_rows]
+        tot = await fetchone(f"SELECT COUNT(*) AS n, COALESCE(SUM(qty),0)::bigint AS qty {_OPEN}", (cid, item_id))
+        total_qty, total_listings = int(tot["qty"]), int(tot["n"])
+    loads += 1
+    return Book(rows, levels[:DEPTH_LEVELS], total_qty, total_listings, complete, time.monotonic())
+
+
+async def get(cid: int, item_id: str) -> Book:
+    key = (cid, item_id)
+    book = _books.get(key)
+    if book is not None and book.age < TTL:
+        return book
+    fut = _inflight.get(key)
+    if fut is not None:
+        return await asyncio.shield(fut)
+    fut = asyncio.ensure_future(_load(cid, item_id))
+    _inflight[key] = fut
+    try:
+        book = await fut
+    finally:
+        _inflight.pop(key, None)
+    _books[key] = book
+    return book
+
+
+def _evict(cid: Optional[int], item_id: Optional[str]) -> None:
+    if cid is None:
+        _books.clear()
+    elif item_id is None:
+        for key in [k for k in _books if k[0] == cid]:
+            del _books[key]
+    else:
+        _books.pop((cid, item_id), None)
+
+
+def invalidate(cid: int, item_id: Optional[str] = None) -> None:
+    """item_id가 없으면 그 국가 전체"""
+    _evict(cid, item_id)
+    invalidation.publish("listings", cid, item_id)
+
+
+invalidation.on("listings", _evict)
+
+
+async def page(cid: int, item_id: str, after: Optional[Cursor], size: int) -> tuple[Book, list[Listing], bool]:
+    """after 다음부터 size건과 다음 페이지 존재 여부"""
+    book = await get(cid, item_id)
+    start = 0 if after is None else bisect_right([li.cursor for li in book.rows], after)
+    chunk = book.rows[start:start + size + 1]
+    if len(chunk) > size or book.complete:
+        return book, chunk[:size], len(chunk) > size
+    # 스냅샷 뒤쪽: 같은 커서로 DB에서 이어 읽는다
+    cur = chunk[-1].cursor if chunk else after
+    need = size + 1 - len(chunk)
+    if cur is None:
+        recs = await fetchall(
+            f"SELECT unit_price, listing_id, seller_id, qty {_OPEN} ORDER BY unit_price, listing_id LIMIT $3",
+            (cid, item_id, need),
+        )
+    else:
+        recs = await fetchall(
+            f"SELECT unit_price, listing_id, seller_id, qty {_OPEN} AND (unit_price, listing_id) > ($3, $4) "
+            "ORDER BY unit_price, listing_id LIMIT $5",
+            (cid, item_id, cur[0], cur[1], need),
+        )
+    chunk += [Listing(r["unit_price"], r["listing_id"], r["seller_id"], int(r["qty"])) for r in recs]
+    return book, chunk[:size], len(chunk) > size
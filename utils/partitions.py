@@ -0,0 +1,157 @@
+# utils/partitions.py
+"""
+treasury_ledger / trades 월 단위 파티션 관리.
+
+- 파티션 이름: {table}_pYYYYMM, 경계는 KST 월초
+- ensure_months(): 현재 달 ~ PARTITION_AHEAD_MONTHS 만큼 미리 생성
+  (DEFAULT 파티션에 이미 그 달 행이 들어가 있으면 옮긴 뒤 ATTACH)
+- apply_retention(): PARTITION_RETAIN_MONTHS(0=무기한)보다 오래된 파티션을
+  DETACH (PARTITION_ARCHIVE=drop이면 DROP까지)
+"""
+from __future__ import annotations
+import asyncio
+import os
+import re
+from datetime import date, datetime
+
+from utils import db
+from utils.db import Tx
+from utils.log import get_logger
+from utils.timezone import KST
+
+log = get_logger("partitions")
+
+# 테이블 → 기본키 컬럼 (BIGSERIAL)
+PARTITIONED = {"treasury_ledger": "id", "trades": "trade_id"}
+
+AHEAD_MONTHS = int(os.getenv("PARTITION_AHEAD_MONTHS", "2"))
+RETAIN_MONTHS = int(os.getenv("PARTITION_RETAIN_MONTHS", "0"))
+ARCHIVE_MODE = os.getenv("PARTITION_ARCHIVE", "detach")  # detach | drop
+JOB_INTERVAL = 6 * 3600
+
+_NAME_RE = re.compile(r"_p(\d{4})(\d{2})$")
+
+
+def add_months(d: date, n: int) -> date:
+    y, m = divmod(d.month - 1 + n, 12)
+    return date(d.year + y, m + 1, 1)
+
+
+def _bound(d: date) -> datetime:
+    return datetime(d.year, d.month, d.day, tzinfo=KST)
+
+
+async def ensure_month(tx: Tx, table: str, month: date) -> bool:
+    """해당 월 파티션이 없으면 만든다. 새로 만들었으면 True"""
+    name = f"{table}_p{month:%Y%m}"
+    if await tx.fetchval("SELECT to_regclass($1) IS NOT NULL", (name,)):
+        return False
+    lo, hi = _bound(month), _bound(add_months(month, 1))
+    await tx.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+    # DEFAULT 파티션에 이미 들어간 그 달 행은 ATTACH 전에 옮겨야 한다
+    await tx.execute(
+        f"WITH moved AS (DELETE FROM {table}_default WHERE created_at >= $1 AND created_at < $2 RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved",
+        (lo, hi),
+    )
+    await tx.execute(
+        f"ALTER TABLE {table} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{lo.isoformat()}') TO ('{hi.isoformat()}')"
+    )
+    return True
+
+
+async def ensure_months(tx: Tx, start: date | None = None, ahead: int = AHEAD_MONTHS) -> list[str]:
+    start = (start or datetime.now(KST).date()).replace(day=1)
+    created = []
+    for table in PARTITIONED:
+        for i in range(ahead + 1):
+            m = add_months(start, i)
+            if await ensure_month(tx, table, m):
+                created.append(f"{table}_p{m:%Y%m}")
+    return created
+
+
+async def list_partitions(tx: Tx, table: str) -> list[tuple[str, date]]:
+    rows = await tx.fetchall(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = $1::regclass",
+        (table,),
+    )
+    out = []
+    for r in rows:
+        m = _NAME_RE.search(r["relname"])
+        if m:
+            out.append((r["relname"], date(int(m.group(1)), int(m.group(2)), 1)))
+    return sorted(out, key=lambda x: x[1])
+
+
+async def apply_retention(tx: Tx, retain: int = RETAIN_MONTHS, mode: str = ARCHIVE_MODE) -> list[str]:
+    if retain <= 0:
+        return []
+    cutoff = add_months(datetime.now(KST).date().replace(day=1), -retain)
+    done = []
+    for table in PARTITIONED:
+        for name, month in await list_partitions(tx, table):
+            if month >= cutoff:
+                break
+            await tx.execute(f"ALTER TABLE {table} DETACH PARTITION {name}")
+            if mode == "drop":
+                await tx.execute(f"DROP TABLE {name}")
+            done.append(name)
+    return done
+
+
+# ---------- 분할 이전(일반 힙) 테이블 이관 ----------
+async def rename_legacy(tx: Tx) -> None:
+    """SCHEMA_SQL 적용 전: 일반 테이블로 존재하면 *_legacy로 비켜둔다"""
+    for table, pk in PARTITIONED.items():
+        kind = await tx.fetchval("SELECT relkind::text FROM pg_class WHERE oid = to_regclass($1)", (table,))
+        if kind != "r":
+            continue
+        log.info("분할 이관: 기존 테이블 보관", extra={"table": table})
+        await tx.execute(f"ALTER TABLE {table} RENAME TO {table}_legacy")
+        await tx.execute(f"ALTER INDEX IF EXISTS {table}_pkey RENAME TO {table}_legacy_pkey")
+        await tx.execute(f"ALTER SEQUENCE IF EXISTS {table}_{pk}_seq RENAME TO {table}_legacy_{pk}_seq")
+
+
+async def copy_legacy(tx: Tx) -> None:
+    """SCHEMA_SQL 적용 후: *_legacy 행을 월 파티션으로 옮기고 시퀀스를 이어 붙인다"""
+    for table, pk in PARTITIONED.items():
+        legacy = f"{table}_legacy"
+        if not await tx.fetchval("SELECT to_regclass($1) IS NOT NULL", (legacy,)):
+            continue
+        span = await tx.fetchone(f"SELECT min(created_at) AS lo, max(created_at) AS hi FROM {legacy}")
+        if span["lo"] is not None:
+            m = span["lo"].astimezone(KST).date().replace(day=1)
+            last = span["hi"].astimezone(KST).date().replace(day=1)
+            while m <= last:
+                await ensure_month(tx, table, m)
+                m = add_months(m, 1)
+        cols = [r["attname"] for r in await tx.fetchall(
+            "SELECT attname FROM pg_attribute WHERE attrelid = $1::regclass AND attnum > 0 AND NOT attisdropped "
+            "ORDER BY attnum",
+            (table,),
+        )]
+        collist = ",".join(cols)
+        await tx.execute(f"INSERT INTO {table}({collist}) SELECT {collist} FROM {legacy}")
+        await tx.execute(
+            f"SELECT setval(pg_get_serial_sequence('{table}', '{pk}'), "
+            f"GREATEST((SELECT max({pk}) FROM {table}), 1))"
+        )
+        await tx.execute(f"DROP TABLE {legacy}")
+        log.info("분할 이관 완료", extra={"table": table})
+
+
+async def run_job() -> None:
+    """파티션 선생성 + 보존 정책 (setup_hook에서 백그라운드로 시작)"""
+    while True:
+        try:
+            async with db.transaction() as tx:
+                created = await ensure_months(tx)
+                removed = await apply_retention(tx)
+            if created or removed:
+                log.info("파티션 정비", extra={"created": created, "archived": removed, "mode": ARCHIVE_MODE})
+        except Exception:
+            log.exception("파티션 정비 실패")
+        await asyncio.sleep(JOB_INTERVAL)
@@ -0,0 +1,103 @@
+# utils/prices.py
+"""
+일일 시세 엔진: 하루치 trades → price_indices_daily(평균가·거래량·EMA) + market_prices(EMA) 갱신.
+KST 자정이 지나면 전날을 확정한다. 재시작 시 빠진 날짜를 이어서 채운다.
+"""
+from __future__ import annotations
+import asyncio
+from datetime import date, datetime, timedelta
+from typing import Awaitable, Callable
+
+from utils.constants import EMA_ALPHA
+from utils.db import fetchone, transaction
+from utils.log import get_logger
+from utils.timezone import KST
+
+log = get_logger("prices")
+
+# 하루치 집계. 직전 EMA는 (country_id,item_id,date) PK를 역순으로 1건만 읽는다
+_ROLLUP_DAY = """
+WITH agg AS (
+  SELECT country_id, resource_id AS item_id,
+         ROUND(SUM(unit_price::numeric * qty) / SUM(qty))::int AS avg_price,
+         SUM(qty)::int AS volume
+  FROM trades
+  WHERE created_at >= $1 AND created_at < $2
+  GROUP BY 1, 2
+), calc AS (
+  SELECT a.country_id, a.item_id, a.avg_price, a.volume, i.base_price,
+         COALESCE($4::numeric * a.avg_price + (1 - $4::numeric) * p.ema_price, a.avg_price) AS ema
+  FROM agg a
+  JOIN items i ON i.item_id = a.item_id
+  LEFT JOIN LATERAL (
+    SELECT ema_price FROM price_indices_daily d
+    WHERE d.country_id = a.country_id AND d.item_id = a.item_id AND d.date < $3
+    ORDER BY d.date DESC LIMIT 1
+  ) p ON TRUE
+)
+INSERT INTO price_indices_daily(country_id, item_id, date, avg_price, volume, ema_price, price_index)
+SELECT country_id, item_id, $3, avg_price, volume, ROUND(ema, 4),
+       LEAST(ROUND(ema / NULLIF(base_price, 0), 4), 99.9999)
+FROM calc
+ON CONFLICT (country_id, item_id, date) DO UPDATE SET
+  avg_price = EXCLUDED.avg_price, volume = EXCLUDED.volume,
+  ema_price = EXCLUDED.ema_price, price_index = EXCLUDED.price_index
+RETURNING country_id, item_id, ema_price
+"""
+
+_SYNC_EMA = (
+    "INSERT INTO market_prices(country_id, item_id, ema_price, last_updated) "
+    "SELECT country_id, item_id, ROUND(ema_price)::int, NOW() FROM price_indices_daily WHERE date = $1 "
+    "ON CONFLICT (country_id, item_id) DO UPDATE SET ema_price = EXCLUDED.ema_price, last_updated = NOW()"
+)
+
+# 하루 확정 후 호출되는 훅 (차트 캐시·가격 알림 등). 인자: (date, [(country_id, item_id, ema), ...])
+on_day_closed: list[Callable[[date, list[tuple[int, str, float]]], Awaitable[None]]] = []
+
+
+def _day_bounds(d: date) -> tuple[datetime, datetime]:
+    lo = datetime(d.year, d.month, d.day, tzinfo=KST)
+    return lo, lo + timedelta(days=1)
+
+
+async def close_day(d: date) -> int:
+    lo, hi = _day_bounds(d)
+    async with transaction() as tx:
+        rows = await tx.fetchall(_ROLLUP_DAY, (lo, hi, d, EMA_ALPHA))
+        await tx.execute(_SYNC_EMA, (d,))
+    updates = [(r["country_id"], r["item_id"], float(r["ema_price"])) for r in rows]
+    for hook in on_day_closed:
+        try:
+            await hook(d, updates)
+        except Exception:
+            log.exception("시세 확정 훅 실패")
+    return len(updates)
+
+
+async def catch_up() -> None:
+    """마지막으로 확정된 날 다음부터 어제까지 순서대로 확정"""
+    yesterday = datetime.now(KST).date() - timedelta(days=1)
+    row = await fetchone("SELECT max(date) AS d FROM price_indices_daily")
+    if row and row["d"]:
+        start = row["d"] + timedelta(days=1)
+    else:
+        first = await fetchone("SELECT min(created_at) AS t FROM trades")
+        if not first or first["t"] is None:
+            return
+        start = first["t"].astimezone(KST).date()
+    d = start
+    while d <= yesterday:
+        n = await close_day(d)
+        log.info("일일 시세 확정", extra={"date": d.isoformat(), "items": n, "sample": 0.2})
+        d += timedelta(days=1)
+
+
+async def run_job() -> None:
+    while True:
+        try:
+            await catch_up()
+        except Exception:
+            log.exception("일일 시세 확정 실패")
+        now = datetime.now(KST)
+        nxt = datetime(now.year, now.month, now.day, tzinfo=KST) + timedelta(days=1, minutes=5)
+        await asyncio.sleep(max(60.0, (nxt - now).total_seconds()))
@@ -0,0 +1,167 @@
+# utils/ratelimit.py
+"""
+명령 호출 속도 제한 (토큰 버킷).
+
+- 버킷: 유저별 · 서버별 · 전체, 각각 명령 등급(expensive / autocomplete / default)마다 따로
+- 세 버킷이 모두 1토큰 이상일 때만 통과하고 그때만 차감한다(한 버킷에 막히면 나머지는 안 깎음)
+- 저장소: 기본은 프로세스 메모리. RATE_LIMIT_BACKEND=postgres면 UNLOGGED 테이블 rate_buckets를
+  공유해 여러 샤드 프로세스가 같은 한도를 본다(호출당 왕복 1회). DB 오류 시 메모리로 대체
+- RATE_LIMIT=0 이면 끈다
+"""
+from __future__ import annotations
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+from utils import db
+from utils.log import get_logger
+
+log = get_logger("ratelimit")
+
+ENABLED = os.getenv("RATE_LIMIT", "1") != "0"
+BACKEND = os.getenv("RATE_LIMIT_BACKEND", "memory")  # memory | postgres
+MAX_BUCKETS = 50_000
+
+# 전체 스캔/정렬이나 렌더링이 있는 명령
+EXPENSIVE = {
+    "순위 국가", "순위 개인", "순위 서버",
+    "상점 세계시세", "길드 시세차트", "길드 제작계획", "길드 시세",
+    "관리 내보내기",
+}
+
+
+@dataclass(frozen=True)
+class Limit:
+    rate: float    # 초당 충전 토큰
+    burst: float   # 최대 토큰
+
+
+# 등급 → 범위(user/guild/global) → 한도. None이면 그 범위는 제한 없음
+LIMITS: dict[str, dict[str, Optional[Limit]]] = {
+    "expensive":    {"user": Limit(0.2, 3),  "guild": Limit(1, 10),  "global": Limit(10, 40)},
+    "autocomplete": {"user": Limit(5, 10),   "guild": Limit(30, 60), "global": None},
+    "default":      {"user": Limit(1, 6),    "guild": Limit(15, 40), "global": None},
+}
+
+rejections: dict[str, int] = {}   # 등급별 거절 수
+
+
+def command_class(name: str, autocomplete: bool) -> str:
+    if autocomplete:
+        return "autocomplete"
+    return "expensive" if name in EXPENSIVE else "default"
+
+
+def _keys(cls: str, guild_id: Optional[int], user_id: int) -> list[tuple[str, Limit]]:
+    out = []
+    for scope, ident in (("user", user_id), ("guild", guild_id), ("global", 0)):
+        lim = LIMITS[cls].get(scope)
+        if lim is not None and ident is not None:
+            out.append((f"{cls}:{scope}:{ident}", lim))
+    return out
+
+
+# ---------- 메모리 저장소 ----------
+_buckets: dict[str, list[float]] = {}   # key → [tokens, updated(monotonic)]
+
+
+def _take_memory(keys: list[tuple[str, Limit]]) -> float:
+    now = time.monotonic()
+    wait = 0.0
+    states = []
+    for key, lim in keys:
+        st = _buckets.get(key)
+        if st is None:
+            st = _buckets[key] = [lim.burst, now]
+        st[0] = min(lim.burst, st[0] + (now - st[1]) * lim.rate)
+        st[1] = now
+        states.append(st)
+        if st[0] < 1:
+            wait = max(wait, (1 - st[0]) / lim.rate)
+    if wait == 0.0:
+        for st in states:
+            st[0] -= 1
+    if len(_buckets) > MAX_BUCKETS:
+        _prune(now)
+    return wait
+
+
+def _prune(now: float) -> None:
+    # 가장 오래 안 쓰인 절반을 버린다(버려진 버킷은 다음 호출 때 가득 찬 상태로 다시 생김)
+    for key, _ in sorted(_buckets.items(), key=lambda kv: kv[1][1])[: len(_buckets) // 2]:
+        del _buckets[key]
+
+
+# ---------- Postgres 공유 저장소 ----------
+# 동시 호출이 같은 스냅샷을 보면 잠깐 한도를 살짝 넘을 수 있지만, 차감은 현재 행 기준이라 곧 보정된다
+_TAKE_PG = """
+WITH req AS (
+  SELECT * FROM unnest($1::text[], $2::float8[], $3::float8[]) AS r(key, rate, burst)
+), cur AS (
+  SELECT r.key, r.rate, r.burst,
+         LEAST(r.burst, COALESCE(b.tokens + EXTRACT(EPOCH FROM clock_timestamp() - b.updated_at) * r.rate, r.burst)) AS tokens
+  FROM req r LEFT JOIN rate_buckets b ON b.key = r.key
+), verdict AS (
+  SELECT bool_and(tokens >= 1) AS ok FROM cur
+), up AS (
+  INSERT INTO rate_buckets(key, rate, burst, tokens, updated_at)
+  SELECT c.key, c.rate, c.burst, c.tokens - CASE WHEN v.ok THEN 1 ELSE 0 END, clock_timestamp()
+  FROM cur c, verdict v
+  ON CONFLICT (key) DO UPDATE SET
+    rate = EXCLUDED.rate, burst = EXCLUDED.burst,
+    tokens = LEAST(EXCLUDED.burst,
+                   rate_buckets.tokens + EXTRACT(EPOCH FROM clock_timestamp() - rate_buckets.updated_at) * EXCLUDED.rate)
+             - CASE WHEN (SELECT ok FROM verdict) THEN 1 ELSE 0 END,
+    updated_at = clock_timestamp()
+)
+SELECT COALESCE(MAX(CASE WHEN tokens < 1 THEN (1 - tokens) / rate END), 0) AS wait FROM cur
+"""
+
+
+async def _take_pg(keys: list[tuple[str, Limit]]) -> float:
+    row = await db.fetchone(_TAKE_PG, (
+        [k for k, _ in keys], [lim.rate for _, lim in keys], [lim.burst for _, lim in keys],
+    ))
+    return float(row["wait"])
+
+
+async def check(name: str, guild_id: Optional[int], user_id: int, autocomplete: bool = False) -> float:
+    """통과하면 0, 막히면 다시 시도할 수 있을 때까지의 초"""
+    if not ENABLED:
+        return 0.0
+    cls = command_class(name, autocomplete)
+    keys = _keys(cls, guild_id, user_id)
+    if not keys:
+        return 0.0
+    wait = None
+    if BACKEND == "postgres":
+        try:
+            wait = await _take_pg(keys)
+        except Exception:
+            log.warning("공유 속도 제한 조회 실패 — 메모리 버킷으로 대체", exc_info=True, extra={"sample": 0.1})
+    if wait is None:
+        wait = _take_memory(keys)
+    if wait > 0:
+        rejections[cls] = rejections.get(cls, 0) + 1
+    return wait
+
+
+async def run_job() -> None:
+    """공유 저장소에서 한 시간 넘게 안 쓰인 버킷 삭제(가득 찬 상태와 같으므로 지워도 무방)"""
+    if not ENABLED or BACKEND != "postgres":
+        return
+    while True:
+        try:
+            await db.execute("DELETE FROM rate_buckets WHERE updated_at < NOW() - INTERVAL '1 hour'")
+        except Exception:
+            log.exception("속도 제한 버킷 정리 실패")
+        await asyncio.sleep(600)
+
+
+def render_prometheus() -> str:
+    out = ["# TYPE kingdom_ratelimit_rejections_total counter"]
+    for cls, n in sorted(rejections.items()):
+        out.append(f'kingdom_ratelimit_rejections_total{{class="{cls}"}} {n}')
+    return "\n".join(out) + "\n"
@@ -0,0 +1,420 @@
+# utils/repository.py
+"""
+경제 저장소 계층: 수확·제작·판매·등록·목록·구매·순위·국고를 타입 있는 연산으로.
+
+- PgRepository: 운영용. 코그에 있던 SQL을 그대로 옮겨 왔고, tx를 주면 호출자 트랜잭션(run_once 등)에
+  묶이고 없으면 자체 트랜잭션을 연다 (inventory.debit / TREASURY.credit과 같은 규칙)
+- MemoryRepository: 순수 파이썬. 테이블마다 열 배열(dict of lists) + 키 인덱스로 같은 의미를 흉내 낸다.
+  await 사이에 끼어드는 작업이 없으므로 연산 하나가 곧 원자적. tx는 무시한다.
+  단위 테스트·마이크로벤치·부하 생성기(bench/loadgen.py --backend memory)용
+- get()은 REPO_BACKEND(postgres | memory)에 따라 만든 싱글턴, use()로 갈아 끼운다
+
+검사는 모두 쓰기 전에 한다. 실패는 TradeError(사용자에게 보일 문구) 또는 inventory.InsufficientStock.
+"""
+from __future__ import annotations
+import os
+from abc import ABC, abstractmethod
+from bisect import bisect_right, insort
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from datetime import date
+from typing import AsyncIterator, Mapping, Optional
+
+from utils import claims, orderbook, users
+from utils import inventory as stock
+from utils.db import Tx, fetchall, fetchone, transaction
+from utils.inventory import InsufficientStock
+from utils.treasury import TREASURY
+
+
+class TradeError(Exception):
+    """구매 등 거래 조건 불충족. str(e)를 그대로 안내한다"""
+
+
+@dataclass(frozen=True)
+class Land:
+    tier: int
+    resource_bias: str
+
+
+@dataclass(frozen=True)
+class Purchase:
+    listing_id: int
+    item_id: str
+    seller_id: int
+    qty: int
+    unit_price: int
+
+    @property
+    def cost(self) -> int:
+        return self.unit_price * self.qty
+
+
+@dataclass(frozen=True)
+class RankRow:
+    country_id: int
+    country_name: str
+    user_id: int
+    balance: int
+
+
+class Repository(ABC):
+    """연산 목록. 두 백엔드가 같은 의미를 지켜야 한다 (tests/test_repository.py가 같은 시나리오로 둘 다 검사)"""
+
+    @abstractmethod
+    async def land(self, cid: int, channel_id: int) -> Optional[Land]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def ensure_user(self, cid: int, uid: int, tx: Optional[Tx] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def balance(self, cid: int, uid: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def inventory(self, cid: int, uid: int) -> dict[str, int]:
+        """qty>0인 품목만"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim(self, cid: int, uid: int, channel_id: int, day: date, drops: Mapping[str, int],
+                    tx: Optional[Tx] = None) -> bool:
+        """오늘 이 채널 첫 수확이면 기록 + 지급 후 True, 이미 했으면 아무것도 안 하고 False"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def craft(self, cid: int, uid: int, inputs: Mapping[str, int], product: str, qty: int,
+                    tx: Optional[Tx] = None) -> None:
+        """재료 전부 차감 + 산출 지급. 하나라도 모자라면 InsufficientStock, 아무것도 안 바뀜
+        수량이 0 이하인 재료는 무시한다 (inventory.debit_many와 같게)"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def sell(self, cid: int, uid: int, item_id: str, qty: int, unit_price: int, tax: int = 0,
+                   tx: Optional[Tx] = None) -> bool:
+        """NPC 매입: 재고 차감 + (매각액 - tax) 입금 + tax 국고 적립을 한 트랜잭션에서. 재고 부족이면 False"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def register(self, cid: int, uid: int, item_id: str, qty: int, unit_price: int) -> Optional[int]:
+        """재고를 빼서 매물 등록 → listing_id. 재고 부족이거나 수량·단가가 0 이하면 None"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def list_open(self, cid: int, item_id: str, after: Optional[orderbook.Cursor],
+                        size: int) -> list[orderbook.Listing]:
+        """(unit_price, listing_id) 키셋 순서로 after 다음 size건"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def buy(self, cid: int, uid: int, listing_id: int, qty: int, tx: Optional[Tx] = None) -> Purchase:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rank_users(self, cid: Optional[int], limit: int) -> list[RankRow]:
+        """cid가 None이면 전체 서버 통합"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rank_countries(self, limit: int) -> list[tuple[int, str, int]]:
+        """(country_id, name, 국고) — 국고는 아직 반영 안 된 입금까지 포함"""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def treasury_credit(self, cid: int, amount: int, reason: str, tx: Optional[Tx] = None) -> None:
+        raise NotImplementedError
+
+
+# ---------- Postgres ----------
+@asynccontextmanager
+async def _within(tx: Optional[Tx]) -> AsyncIterator[Tx]:
+    if tx is not None:
+        yield tx
+    else:
+        async with transaction() as own:
+            yield own
+
+
+_GRANT = (
+    "INSERT INTO inventory(country_id,user_id,item_id,qty) "
+    "SELECT $1,$2,i,q FROM unnest($3::text[],$4::bigint[]) AS t(i,q) "
+    "ON CONFLICT (country_id,user_id,item_id) DO UPDATE SET qty=inventory.qty+EXCLUDED.qty"
+)
+
+
+class PgRepository(Repository):
+    async def land(self, cid, channel_id):
+        row = await fetchone("SELECT tier,resource_bias FROM lands WHERE country_id=$1 AND channel_id=$2",
+                             (cid, channel_id))
+        return Land(int(row["tier"]), row["resource_bias"]) if row else None
+
+    async def ensure_user(self, cid, uid, tx=None):
+        await users.ensure(cid, uid, tx=tx)
+
+    async def balance(self, cid, uid):
+        row = await fetchone("SELECT balance FROM users WHERE country_id=$1 AND user_id=$2", (cid, uid))
+        return int(row["balance"]) if row else 0
+
+    async def inventory(self, cid, uid):
+        rows = await fetchall("SELECT item_id, qty FROM inventory WHERE country_id=$1 AND user_id=$2 AND qty>0",
+                              (cid, uid))
+        return {r["item_id"]: int(r["qty"]) for r in rows}
+
+    async def claim(self, cid, uid, channel_id, day, drops, tx=None):
+        async with _within(tx) as t:
+            if not await claims.try_claim(t, cid, uid, channel_id, day):
+                return False
+            if drops:
+                await t.execute(_GRANT, (cid, uid, list(drops), list(drops.values())))
+            return True
+
+    async def craft(self, cid, uid, inputs, product, qty, tx=None):
+        async with _within(tx) as t:
+            await stock.debit_many(t, cid, uid, dict(inputs))
+            await t.execute(_GRANT, (cid, uid, [product], [qty]))
+
+    async def sell(self, cid, uid, item_id, qty, unit_price, tax=0, tx=None):
+        async with _within(tx) as t:
+            if await stock.debit(cid, uid, item_id, qty, tx=t) is None:
+                return False
+            await t.execute("UPDATE users SET balance=balance+$1 WHERE country_id=$2 AND user_id=$3",
+                            (max(unit_price * qty - tax, 0), cid, uid))
+            await self.treasury_credit(cid, tax, "아이템 매입세", tx=t)
+            return True
+
+    async def register(self, cid, uid, item_id, qty, unit_price):
+        if qty <= 0 or unit_price <= 0:
+            return None
+        async with transaction() as t:
+            if await stock.debit(cid, uid, item_id, qty, tx=t) is None:
+                return None
+            return await t.fetchval(
+                "INSERT INTO listings(country_id,seller_id,resource_id,qty,unit_price) "
+                "VALUES ($1,$2,$3,$4,$5) RETURNING listing_id",
+                (cid, uid, item_id, qty, unit_price),
+            )
+
+    async def list_open(self, cid, item_id, after, size):
+        _, rows, _ = await orderbook.page(cid, item_id, after, size)
+        return rows
+
+    async def buy(self, cid, uid, listing_id, qty, tx=None):
+        async with _within(tx) as t:
+            # 매물 행을 잠가 동시 구매끼리 수량을 나눠 갖지 않게 한다
+            li = await t.fetchone(
+                "SELECT * FROM listings WHERE listing_id=$1 AND country_id=$2 AND status='open' FOR UPDATE",
+                (listing_id, cid),
+            )
+            if not li:
+                raise TradeError("해당 매물이 없습니다.")
+            if qty > li["qty"]:
+                raise TradeError("수량 부족")
+            p = Purchase(li["listing_id"], li["resource_id"], li["seller_id"], qty, li["unit_price"])
+            paid = await t.fetchval(
+                "UPDATE users SET balance=balance-$1 WHERE country_id=$2 AND user_id=$3 AND balance>=$1 RETURNING balance",
+                (p.cost, cid, uid),
+            )
+            if paid is None:
+                raise TradeError("잔액 부족")
+            await t.execute("UPDATE users SET balance=balance+$1 WHERE country_id=$2 AND user_id=$3",
+                            (p.cost, cid, p.seller_id))
+            await t.execute(_GRANT, (cid, uid, [p.item_id], [qty]))
+            await t.execute(
+                "INSERT INTO trades(country_id,listing_id,buyer_id,seller_id,resource_id,qty,unit_price,fee_paid) "
+                "VALUES ($1,$2,$3,$4,$5,$6,$7,0)",
+                (cid, p.listing_id, uid, p.seller_id, p.item_id, qty, p.unit_price),
+            )
+            # 전량 구매면 qty는 그대로 두고 sold 처리 (CHECK qty>0 때문에 0으로 줄일 수 없음)
+            await t.execute(
+                "UPDATE listings SET qty=CASE WHEN qty=$1 THEN qty ELSE qty-$1 END, "
+                "status=CASE WHEN qty=$1 THEN 'sold' ELSE status END WHERE listing_id=$2",
+                (qty, p.listing_id),
+            )
+            return p
+
+    async def rank_users(self, cid, limit):
+        q = ("SELECT u.country_id, c.name, u.user_id, u.balance FROM users u "
+             "JOIN countries c ON c.country_id = u.country_id ")
+        if cid is None:
+            rows = await fetchall(q + "ORDER BY u.balance DESC, u.user_id ASC LIMIT $1", (limit,))
+        else:
+            rows = await fetchall(q + "WHERE u.country_id=$1 ORDER BY u.balance DESC, u.user_id ASC LIMIT $2",
+                                  (cid, limit))
+        return [RankRow(r["country_id"], r["name"], r["user_id"], int(r["balance"])) for r in rows]
+
+    async def rank_countries(self, limit):
+        rows = await fetchall(
+            "SELECT country_id, name, treasury FROM countries ORDER BY treasury DESC, country_id ASC LIMIT $1",
+            (limit,),
+        )
+        return [(r["country_id"], r["name"], int(r["treasury"]) + TREASURY.pending_for(r["country_id"]))
+                for r in rows]
+
+    async def treasury_credit(self, cid, amount, reason, tx=None):
+        await TREASURY.credit(cid, amount, reason, tx=tx)
+
+
+# ---------- 메모리 ----------
+class _Columns:
+    """행 번호로 접근하는 열 배열. 삭제는 하지 않고 상태 열로 표시한다"""
+
+    def __init__(self, *names: str):
+        self.names = names
+        self.cols: dict[str, list] = {n: [] for n in names}
+
+    def append(self, **values) -> int:
+        for n in self.names:
+            self.cols[n].append(values[n])
+        return len(self.cols[self.names[0]]) - 1
+
+    def __getitem__(self, name: str) -> list:
+        return self.cols[name]
+
+    def __len__(self) -> int:
+        return len(self.cols[self.names[0]])
+
+
+class MemoryRepository(Repository):
+    def __init__(self):
+        self.countries: dict[int, list] = {}                          # cid → [name, treasury]
+        self.lands: dict[tuple[int, int], Land] = {}
+        self.balances: dict[tuple[int, int], int] = {}                # users
+        self.stock: dict[tuple[int, int], dict[str, int]] = {}        # inventory (qty>0만)
+        self.claimed: dict[tuple[int, int, date], set[int]] = {}      # user_claim_days
+        self.listings = _Columns("country_id", "seller_id", "item_id", "qty", "unit_price", "status")
+        self.books: dict[tuple[int, str], list[tuple[int, int]]] = {}  # 열린 매물 (unit_price, row) 정렬
+        self.trades = _Columns("country_id", "listing_id", "buyer_id", "seller_id", "item_id", "qty", "unit_price")
+
+    # 준비용 (코그의 국가 생성/토지 지정에 해당)
+    def add_country(self, cid: int, name: str, treasury: int = 0) -> None:
+        self.countries[cid] = [name, treasury]
+
+    def add_land(self, cid: int, channel_id: int, tier: int, resource_bias: str) -> None:
+        self.lands[(cid, channel_id)] = Land(tier, resource_bias)
+
+    def _debit(self, cid: int, uid: int, amounts: Mapping[str, int]) -> bool:
+        """전부 있으면 차감 후 True. 0 이하 수량은 건너뜀 (inventory.debit_many와 같게)"""
+        amounts = {k: n for k, n in amounts.items() if n > 0}
+        inv = self.stock.get((cid, uid), {})
+        if any(inv.get(k, 0) < n for k, n in amounts.items()):
+            return False
+        for k, n in amounts.items():
+            left = inv[k] - n
+            if left:
+                inv[k] = left
+            else:
+                del inv[k]
+        return True
+
+    def _grant(self, cid: int, uid: int, items: Mapping[str, int]) -> None:
+        inv = self.stock.setdefault((cid, uid), {})
+        for k, n in items.items():
+            inv[k] = inv.get(k, 0) + n
+
+    async def land(self, cid, channel_id):
+        return self.lands.get((cid, channel_id))
+
+    async def ensure_user(self, cid, uid, tx=None):
+        self.balances.setdefault((cid, uid), 0)
+
+    async def balance(self, cid, uid):
+        return self.balances.get((cid, uid), 0)
+
+    async def inventory(self, cid, uid):
+        return dict(self.stock.get((cid, uid), {}))
+
+    async def claim(self, cid, uid, channel_id, day, drops, tx=None):
+        done = self.claimed.setdefault((cid, uid, day), set())
+        if channel_id in done:
+            return False
+        done.add(channel_id)
+        self._grant(cid, uid, drops)
+        return True
+
+    async def craft(self, cid, uid, inputs, product, qty, tx=None):
+        if not self._debit(cid, uid, inputs):
+            raise InsufficientStock()
+        self._grant(cid, uid, {product: qty})
+
+    async def sell(self, cid, uid, item_id, qty, unit_price, tax=0, tx=None):
+        # 단건 차감은 inventory.debit처럼 qty<=0을 거절
+        if qty <= 0 or not self._debit(cid, uid, {item_id: qty}):
+            return False
+        if (cid, uid) in self.balances:
+            self.balances[(cid, uid)] += max(unit_price * qty - tax, 0)
+        await self.treasury_credit(cid, tax, "아이템 매입세")
+        return True
+
+    async def register(self, cid, uid, item_id, qty, unit_price):
+        if qty <= 0 or unit_price <= 0 or not self._debit(cid, uid, {item_id: qty}):
+            return None
+        row = self.listings.append(country_id=cid, seller_id=uid, item_id=item_id, qty=qty,
+                                   unit_price=unit_price, status="open")
+        insort(self.books.setdefault((cid, item_id), []), (unit_price, row))
+        return row + 1   # listing_id는 1부터 (BIGSERIAL과 같게)
+
+    def _listing(self, row: int) -> orderbook.Listing:
+        L = self.listings
+        return orderbook.Listing(L["unit_price"][row], row + 1, L["seller_id"][row], L["qty"][row])
+
+    async def list_open(self, cid, item_id, after, size):
+        book = self.books.get((cid, item_id), [])
+        start = 0 if after is None else bisect_right(book, (after[0], after[1] - 1))
+        return [self._listing(row) for _, row in book[start:start + size]]
+
+    async def buy(self, cid, uid, listing_id, qty, tx=None):
+        L = self.listings
+        row = listing_id - 1
+        if not (0 <= row < len(L)) or L["country_id"][row] != cid or L["status"][row] != "open":
+            raise TradeError("해당 매물이 없습니다.")
+        if qty > L["qty"][row]:
+            raise TradeError("수량 부족")
+        p = Purchase(listing_id, L["item_id"][row], L["seller_id"][row], qty, L["unit_price"][row])
+        if (cid, uid) not in self.balances or self.balances[(cid, uid)] < p.cost:
+            raise TradeError("잔액 부족")
+        self.balances[(cid, uid)] -= p.cost
+        if (cid, p.seller_id) in self.balances:
+            self.balances[(cid, p.seller_id)] += p.cost
+        self._grant(cid, uid, {p.item_id: qty})
+        self.trades.append(country_id=cid, listing_id=listing_id, buyer_id=uid, seller_id=p.seller_id,
+                           item_id=p.item_id, qty=qty, unit_price=p.unit_price)
+        if qty == L["qty"][row]:
+            L["status"][row] = "sold"
+            self.books[(cid, p.item_id)].remove((p.unit_price, row))
+        else:
+            L["qty"][row] -= qty
+        return p
+
+    async def rank_users(self, cid, limit):
+        rows = [RankRow(c, self.countries[c][0], u, b) for (c, u), b in self.balances.items()
+                if (cid is None or c == cid) and c in self.countries]
+        rows.sort(key=lambda r: (-r.balance, r.user_id))
+        return rows[:limit]
+
+    async def rank_countries(self, limit):
+        rows = [(cid, name, t) for cid, (name, t) in self.countries.items()]
+        rows.sort(key=lambda r: (-r[2], r[0]))
+        return rows[:limit]
+
+    async def treasury_credit(self, cid, amount, reason, tx=None):
+        if amount > 0 and cid in self.countries:
+            self.countries[cid][1] += amount
+
+
+_current: Optional[Repository] = None
+
+
+def get() -> Repository:
+    global _current
+    if _current is None:
+        _current = MemoryRepository() if os.getenv("REPO_BACKEND", "postgres") == "memory" else PgRepository()
+    return _current
+
+
+def use(repo: Repository) -> Repository:
+    """백엔드 교체 (테스트/벤치). 이전 것을 돌려준다"""
+    global _current
+    prev, _current = _current, repo
+    return prev
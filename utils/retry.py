@@ -0,0 +1,111 @@
+# utils/retry.py
+"""
+트랜잭션 단위 작업의 재시도 정책.
+
+- 재시도 대상: 직렬화 실패(40001), 교착(40P01), 연결 끊김/장애 조치(08xxx, 57P01~03), 연결 수 초과(53300)
+- 지터 포함 지수 백오프(full jitter). 인터랙션 응답 기한을 넘길 것 같으면 더 기다리지 않고 포기
+- 오류 분류별 재시도/포기 횟수를 센다 (/관리 성능, 프로메테우스 덤프)
+
+재시도는 작업 전체(트랜잭션 시작부터)를 다시 실행하므로, 부작용이 트랜잭션 밖으로 새지 않는
+작업에만 쓴다. 멱등 키(utils/idempotency.py)와 묶인 작업은 이중 반영 걱정 없이 재시도된다.
+"""
+from __future__ import annotations
+import asyncio
+import os
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Optional, TypeVar
+
+import asyncpg
+import discord
+
+from utils.log import get_logger
+
+log = get_logger("retry")
+
+T = TypeVar("T")
+
+MAX_ATTEMPTS = int(os.getenv("DB_RETRY_ATTEMPTS", "5"))
+BASE_DELAY = float(os.getenv("DB_RETRY_BASE_MS", "20")) / 1000
+MAX_DELAY = float(os.getenv("DB_RETRY_MAX_MS", "1000")) / 1000
+
+# 첫 응답은 3초 안에, defer 이후 후속 응답은 15분 안에 보내야 한다. 응답 보낼 여유를 남긴다
+_INITIAL_WINDOW = timedelta(seconds=3)
+_FOLLOWUP_WINDOW = timedelta(minutes=15)
+_REPLY_MARGIN = 0.5
+
+_SQLSTATE_CLASS = {
+    "40001": "serialization",
+    "40P01": "deadlock",
+    "53300": "too_many_connections",
+    "57P01": "admin_shutdown",
+    "57P02": "crash_shutdown",
+    "57P03": "cannot_connect_now",
+}
+
+# 분류 → {"retried": n, "gave_up": n}
+COUNTERS: dict[str, dict[str, int]] = {}
+
+
+def classify(exc: BaseException) -> Optional[str]:
+    """재시도할 만한 오류면 분류 이름, 아니면 None"""
+    if isinstance(exc, asyncpg.PostgresError):
+        state = getattr(exc, "sqlstate", None) or ""
+        if state in _SQLSTATE_CLASS:
+            return _SQLSTATE_CLASS[state]
+        if state.startswith("08"):
+            return "connection"
+        return None
+    if isinstance(exc, asyncpg.ConnectionDoesNotExistError):
+        return "connection"
+    if isinstance(exc, (ConnectionError, OSError)):
+        return "connection"
+    return None
+
+
+def _count(kind: str, outcome: str) -> None:
+    c = COUNTERS.setdefault(kind, {"retried": 0, "gave_up": 0})
+    c[outcome] += 1
+
+
+def deadline_for(inter: discord.Interaction) -> float:
+    """인터랙션 응답 기한을 time.monotonic() 기준으로 환산"""
+    window = _FOLLOWUP_WINDOW if inter.response.is_done() else _INITIAL_WINDOW
+    left = (inter.created_at + window - datetime.now(timezone.utc)).total_seconds()
+    return time.monotonic() + left - _REPLY_MARGIN
+
+
+async def run(
+    fn: Callable[[], Awaitable[T]],
+    *,
+    deadline: Optional[float] = None,
+    attempts: int = MAX_ATTEMPTS,
+) -> T:
+    """fn()을 실행하고 일시적 DB 오류면 백오프 후 다시 실행"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return await fn()
+        except Exception as e:
+            kind = classify(e)
+            if kind is None:
+                raise
+            delay = random.uniform(0, min(MAX_DELAY, BASE_DELAY * 2 ** (attempt - 1)))
+            if attempt == attempts or (deadline is not None and time.monotonic() + delay > deadline):
+                _count(kind, "gave_up")
+                log.warning("DB 재시도 포기", extra={"kind": kind, "attempt": attempt})
+                raise
+            _count(kind, "retried")
+            log.info("DB 일시 오류 재시도", extra={"kind": kind, "attempt": attempt, "sample": 0.2})
+            await asyncio.sleep(delay)
+    raise AssertionError("unreachable")
+
+
+def render_prometheus() -> str:
+    out = [
+        "# TYPE kingdom_db_retries_total counter",
+    ]
+    for kind, c in sorted(COUNTERS.items()):
+        for outcome, n in c.items():
+            out.append(f'kingdom_db_retries_total{{kind="{kind}",outcome="{outcome}"}} {n}')
+    return "\n".join(out) + "\n"
@@ -0,0 +1,168 @@
+# utils/treasury.py
+"""
+국고(countries.treasury) 입출금.
+
+TREASURY_COALESCE=1이면 입금(세금 등)을 국가별로 메모리에 모았다가
+TREASURY_FLUSH_MS 주기 또는 TREASURY_FLUSH_SIZE 건이 쌓이면
+UPDATE 1회 + 장부 INSERT 1회로 한꺼번에 반영한다(write-behind).
+꺼져 있으면 호출마다 바로 기록한다.
+
+- 조회: balance()/pending_for()는 아직 반영 안 된 버퍼 금액을 더해서 보여준다.
+- 출금: 잔액 검사가 필요하므로 항상 즉시 기록한다(먼저 버퍼를 비움).
+- 종료: close()가 마지막 flush를 보장한다. 비정상 종료 시 최대 한 주기분이 유실될 수 있다.
+"""
+from __future__ import annotations
+import asyncio
+import os
+from typing import Optional
+
+from utils.db import Tx, fetchone, transaction
+from utils.log import get_logger
+
+log = get_logger("treasury")
+
+_FLUSH_UPDATE = (
+    "UPDATE countries c SET treasury = c.treasury + v.delta "
+    "FROM unnest($1::bigint[], $2::bigint[]) AS v(country_id, delta) "
+    "WHERE c.country_id = v.country_id"
+)
+_FLUSH_LEDGER = (
+    "INSERT INTO treasury_ledger(country_id,typ,reason,amount) "
+    "SELECT * FROM unnest($1::bigint[], $2::text[], $3::text[], $4::bigint[])"
+)
+
+
+class TreasuryWriter:
+    def __init__(self, coalesce: bool, flush_ms: int = 250, flush_size: int = 200):
+        self.coalesce = coalesce
+        self.flush_interval = flush_ms / 1000
+        self.flush_size = flush_size
+        self._pending: dict[int, int] = {}                 # country_id → 순증감
+        self._ledger: dict[tuple[int, str], int] = {}      # (country_id, reason) → 입금 합계
+        self._buffered = 0                                  # 마지막 flush 이후 입금 건수
+        self._inflight: dict[int, int] = {}                 # flush 중(커밋 전)인 금액
+        self._lock = asyncio.Lock()
+        self._wake = asyncio.Event()
+        self._closed = False
+        self.flushes = 0
+
+    # ---------- 조회 ----------
+    def pending_for(self, cid: int) -> int:
+        return self._pending.get(cid, 0) + self._inflight.get(cid, 0)
+
+    async def balance(self, cid: int) -> Optional[int]:
+        row = await fetchone("SELECT treasury FROM countries WHERE country_id=$1", (cid,))
+        return None if row is None else int(row["treasury"]) + self.pending_for(cid)
+
+    # ---------- 입출금 ----------
+    async def credit(self, cid: int, amount: int, reason: str, tx: Optional[Tx] = None) -> None:
+        """
+        tx를 주면 호출자의 트랜잭션에 묶인다: 즉시 기록 모드면 같은 트랜잭션에서 기록하고,
+        버퍼 모드면 그 트랜잭션이 커밋된 뒤에야 버퍼에 담는다(롤백되면 입금도 없음).
+        """
+        if amount <= 0:
+            return
+        if not self.coalesce or self._closed:
+            if tx is not None:
+                await self._write_credit(tx, cid, amount, reason)
+                return
+            async with transaction() as tx:
+                await self._write_credit(tx, cid, amount, reason)
+            return
+        if tx is not None:
+            tx.after_commit.append(lambda: self._buffer(cid, amount, reason))
+            return
+        self._buffer(cid, amount, reason)
+
+    @staticmethod
+    async def _write_credit(tx: Tx, cid: int, amount: int, reason: str) -> None:
+        await tx.execute("UPDATE countries SET treasury=treasury+$1 WHERE country_id=$2", (amount, cid))
+        await tx.execute(
+            "INSERT INTO treasury_ledger(country_id,typ,reason,amount) VALUES ($1,'in',$2,$3)",
+            (cid, reason, amount),
+        )
+
+    def _buffer(self, cid: int, amount: int, reason: str) -> None:
+        self._pending[cid] = self._pending.get(cid, 0) + amount
+        key = (cid, reason)
+        self._ledger[key] = self._ledger.get(key, 0) + amount
+        self._buffered += 1
+        if self._buffered >= self.flush_size:
+            self._wake.set()
+
+    async def debit(self, cid: int, amount: int, reason: str) -> bool:
+        """잔액이 충분하면 차감하고 True. 부족하면 아무것도 하지 않고 False."""
+        await self.flush()
+        async with transaction() as tx:
+            row = await tx.fetchone(
+                "UPDATE countries SET treasury=treasury-$1 WHERE country_id=$2 AND treasury>=$1 "
+                "RETURNING treasury",
+                (amount, cid),
+            )
+            if row is None:
+                return False
+            await tx.execute(
+                "INSERT INTO treasury_ledger(country_id,typ,reason,amount) VALUES ($1,'out',$2,$3)",
+                (cid, reason, amount),
+            )
+        return True
+
+    # ---------- 반영 ----------
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            pending, ledger = self._pending, self._ledger
+            self._pending, self._ledger, self._buffered = {}, {}, 0
+            self._inflight = pending
+            try:
+                async with transaction() as tx:
+                    await tx.execute(_FLUSH_UPDATE, (list(pending), list(pending.values())))
+                    await tx.execute(_FLUSH_LEDGER, (
+                        [c for c, _ in ledger], ["in"] * len(ledger), [r for _, r in ledger], list(ledger.values()),
+                    ))
+            except Exception:
+                # 실패분은 버퍼로 되돌려 다음 주기에 재시도
+                for cid, d in pending.items():
+                    self._pending[cid] = self._pending.get(cid, 0) + d
+                for k, a in ledger.items():
+                    self._ledger[k] = self._ledger.get(k, 0) + a
+                raise
+            finally:
+                self._inflight = {}
+            self.flushes += 1
+
+    async def run(self) -> None:
+        """백그라운드 flush 루프 (coalesce 꺼져 있으면 바로 종료)"""
+        if not self.coalesce:
+            return
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self.flush()
+            except Exception:
+                log.exception("국고 일괄 반영 실패 (재시도 예정)")
+                await asyncio.sleep(1)
+
+    async def close(self) -> None:
+        """이후 입금은 즉시 기록으로 전환하고 남은 버퍼를 반영"""
+        self._closed = True
+        self._wake.set()
+        for _ in range(3):
+            try:
+                await self.flush()
+                return
+            except Exception:
+                log.exception("종료 시 국고 반영 실패")
+                await asyncio.sleep(0.5)
+
+
+TREASURY = TreasuryWriter(
+    coalesce=os.getenv("TREASURY_COALESCE") == "1",
+    flush_ms=int(os.getenv("TREASURY_FLUSH_MS", "250")),
+    flush_size=int(os.getenv("TREASURY_FLUSH_SIZE", "200")),
+)
@@ -0,0 +1,65 @@
+# utils/tree.py
+import math
+
+import discord
+from discord import app_commands
+
+from utils import metrics, ratelimit
+from utils.embeds import send_err
+from utils.log import log_ctx, set_context
+from utils.retry import classify
+
+
+def qualified_name(data: dict) -> str:
+    """인터랙션 payload에서 '그룹 하위명령' 형태의 이름을 복원"""
+    parts = [data.get("name", "?")]
+    options = data.get("options", [])
+    # type 1 = SUB_COMMAND, 2 = SUB_COMMAND_GROUP
+    while options and options[0].get("type") in (1, 2):
+        parts.append(options[0]["name"])
+        options = options[0].get("options", [])
+    return " ".join(parts)
+
+
+class KingdomTree(app_commands.CommandTree):
+    """모든 슬래시 명령/자동완성 호출을 한 곳에서 계측하는 커맨드 트리"""
+
+    async def _call(self, interaction: discord.Interaction) -> None:
+        name = qualified_name(interaction.data or {})
+        if interaction.type is discord.InteractionType.autocomplete:
+            name = f"{name} (자동완성)"
+        token = set_context(guild_id=interaction.guild_id, user_id=interaction.user.id, command=name)
+        try:
+            async with metrics.track(name):
+                await super()._call(interaction)
+        finally:
+            log_ctx.reset(token)
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        """속도 제한: 막히면 자동완성은 빈 목록, 명령은 짧은 안내로 바로 끝낸다(DB 접근 없음)"""
+        auto = interaction.type is discord.InteractionType.autocomplete
+        wait = await ratelimit.check(
+            qualified_name(interaction.data or {}), interaction.guild_id, interaction.user.id, auto
+        )
+        if not wait:
+            return True
+        try:
+            if auto:
+                await interaction.response.autocomplete([])
+            else:
+                await send_err(interaction, f"요청이 너무 잦습니다. {math.ceil(wait)}초 후 다시 시도해 주세요.")
+        except discord.HTTPException:
+            pass
+        return False
+
+    async def on_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError) -> None:
+        # 예외는 super()._call() 안에서 여기로 넘어오고 밖으로 나가지 않으므로 오류 수는 여기서 센다
+        metrics.fail()
+        # 재시도로도 못 넘긴 일시적 DB 오류는 '상호작용 실패' 대신 안내 메시지로
+        original = getattr(error, "original", error)
+        if classify(original) is not None and interaction.type is discord.InteractionType.application_command:
+            try:
+                await send_err(interaction, "왕국 서고가 잠시 혼잡합니다. 잠시 후 다시 시도해 주세요.")
+            except discord.HTTPException:
+                pass
+        await super().on_error(interaction, error)
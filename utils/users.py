@@ -0,0 +1,104 @@
+# utils/users.py
+"""
+users 행 존재 여부 캐시.
+
+명령마다 `INSERT INTO users ... ON CONFLICT DO NOTHING`을 보내면 읽기 명령도 쓰기(WAL·행 잠금)가 된다.
+한 번 확인한 (country_id, user_id)는 크기 제한 LRU 집합에 기억해 두고 다시 묻지 않는다.
+
+- ensure(): 캐시에 있으면 왕복 0회, 없으면 upsert 1회 후 기억
+- note(): 다른 경로(잔액 upsert 등)로 행이 생긴 게 확실할 때 기억만
+- forget(): 국가 삭제 등으로 행이 사라질 때 (다른 프로세스에도 전파)
+- warm(): 재시작 직후 최근 활동 유저를 미리 채워 초반 miss를 줄인다
+"""
+from __future__ import annotations
+import os
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional
+
+from utils import invalidation
+from utils.db import Tx, execute, fetchall
+from utils.log import get_logger
+from utils.timezone import KST
+
+log = get_logger("users")
+
+MAX_SIZE = int(os.getenv("KNOWN_USERS_MAX", "200000"))
+WARM_DAYS = int(os.getenv("KNOWN_USERS_WARM_DAYS", "7"))
+
+_known: "OrderedDict[tuple[int, int], None]" = OrderedDict()
+hits = 0
+misses = 0
+
+
+def _remember(key: tuple[int, int]) -> None:
+    _known[key] = None
+    _known.move_to_end(key)
+    while len(_known) > MAX_SIZE:
+        _known.popitem(last=False)
+
+
+def is_known(cid: int, uid: int) -> bool:
+    key = (cid, uid)
+    if key in _known:
+        _known.move_to_end(key)
+        return True
+    return False
+
+
+async def ensure(cid: int, uid: int, tx: Optional[Tx] = None) -> None:
+    """users 행을 보장. tx를 주면 그 트랜잭션에서 만들고 커밋 후에 기억한다"""
+    global hits, misses
+    if is_known(cid, uid):
+        hits += 1
+        return
+    misses += 1
+    q = "INSERT INTO users(country_id,user_id) VALUES ($1,$2) ON CONFLICT DO NOTHING"
+    if tx is not None:
+        await tx.execute(q, (cid, uid))
+        tx.after_commit.append(lambda: _remember((cid, uid)))
+    else:
+        await execute(q, (cid, uid))
+        _remember((cid, uid))
+
+
+def note(cid: int, uid: int) -> None:
+    _remember((cid, uid))
+
+
+def _evict(cid: Optional[int], uid: Optional[int]) -> None:
+    if cid is None:
+        _known.clear()
+    elif uid is not None:
+        _known.pop((cid, uid), None)
+    else:
+        for key in [k for k in _known if k[0] == cid]:
+            del _known[key]
+
+
+def forget(cid: int, uid: Optional[int] = None) -> None:
+    _evict(cid, uid)
+    invalidation.publish("users", cid, uid)
+
+
+invalidation.on("users", _evict)
+
+
+def stats() -> dict:
+    total = hits + misses
+    return {"size": len(_known), "hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+
+async def warm() -> int:
+    """최근 WARM_DAYS일 안에 수확한 유저(= users 행이 있는 유저)로 캐시를 채운다"""
+    since = datetime.now(KST).date() - timedelta(days=WARM_DAYS)
+    rows = await fetchall(
+        "SELECT DISTINCT u.country_id, u.user_id FROM users u "
+        "JOIN user_claim_days c ON c.country_id=u.country_id AND c.user_id=u.user_id "
+        "WHERE c.claim_date >= $1 LIMIT $2",
+        (since, MAX_SIZE),
+    )
+    for r in rows:
+        _remember((r["country_id"], r["user_id"]))
+    log.info("유저 캐시 예열", extra={"users": len(rows)})
+    return len(rows)
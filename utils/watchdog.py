@@ -0,0 +1,140 @@
+# utils/watchdog.py
+"""이벤트 루프 지연 감시 + 블로킹 콜백 스택 샘플링"""
+from __future__ import annotations
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+from utils.log import get_logger
+
+log = get_logger("watchdog")
+
+
+@dataclass
+class Stall:
+    at: float               # time.time() 기준 감지 시각
+    duration: float         # 루프가 멈춰 있던 시간(초). 진행 중이면 감지 시점까지의 값
+    task: str               # 감지 시점에 실행 중이던 태스크 이름/코루틴
+    stack: str              # 루프 스레드의 스택 샘플
+
+
+class LoopWatchdog:
+    """
+    - run(): interval마다 깨어나 '예정 시각 대비 지연'을 링 버퍼에 기록
+    - 샘플러 스레드: 하트비트가 threshold 넘게 멈추면 루프 스레드의 스택을 떠서 보관
+    """
+
+    def __init__(self, interval: float = 0.25, threshold: float = 0.1,
+                 history: int = 1200, max_stalls: int = 20):
+        self.interval = interval
+        self.threshold = threshold
+        self.lags: deque[float] = deque(maxlen=history)
+        self.stalls: deque[Stall] = deque(maxlen=max_stalls)
+        self.stall_count = 0
+        self.max_lag = 0.0
+        self._beat = time.monotonic()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._open: Optional[Stall] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    async def run(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        # asyncio 자체의 느린 콜백 경고 기준도 맞춘다 (LOOP_DEBUG=1일 때 asyncio 로거로 출력)
+        self._loop.slow_callback_duration = self.threshold
+        if os.getenv("LOOP_DEBUG") == "1":
+            self._loop.set_debug(True)
+        self._start_sampler()
+
+        while not self._stop.is_set():
+            self._beat = time.monotonic()
+            t0 = self._loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, self._loop.time() - t0 - self.interval)
+            self.lags.append(lag)
+            if lag > self.max_lag:
+                self.max_lag = lag
+            if lag > self.threshold:
+                self.stall_count += 1
+                if self._open is not None:
+                    self._open.duration = lag
+                    log.warning(
+                        "이벤트 루프 지연",
+                        extra={"lag_ms": round(lag * 1000), "task": self._open.task, "stack": self._open.stack},
+                    )
+                else:
+                    log.warning("이벤트 루프 지연", extra={"lag_ms": round(lag * 1000)})
+            self._open = None
+
+    def _start_sampler(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._sample_loop, name="loop-watchdog", daemon=True)
+        self._thread.start()
+
+    def _sample_loop(self):
+        limit = self.interval + self.threshold
+        while not self._stop.wait(self.threshold / 2):
+            stalled = time.monotonic() - self._beat
+            if stalled < limit or self._open is not None:
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=25))
+            stall = Stall(at=time.time(), duration=stalled - self.interval, task=self._running_task(), stack=stack)
+            self._open = stall
+            self.stalls.append(stall)
+
+    def _running_task(self) -> str:
+        # 다른 스레드에서 읽으므로 best-effort
+        try:
+            task = asyncio.tasks._current_tasks.get(self._loop)  # type: ignore[attr-defined]
+        except Exception:
+            task = None
+        if task is None:
+            return "(콜백)"
+        coro = task.get_coro()
+        return f"{task.get_name()} {getattr(coro, '__qualname__', coro)}"
+
+    def stop(self):
+        self._stop.set()
+
+    # ---------- 보고 ----------
+    def stats(self) -> dict:
+        vals = sorted(self.lags)
+
+        def pct(q: float) -> float:
+            return vals[min(len(vals) - 1, round(q * (len(vals) - 1)))] if vals else 0.0
+
+        return {
+            "samples": len(vals),
+            "p50": pct(0.50),
+            "p99": pct(0.99),
+            "max": self.max_lag,
+            "stalls": self.stall_count,
+            "last_stall": self.stalls[-1] if self.stalls else None,
+        }
+
+    def render_prometheus(self) -> str:
+        st = self.stats()
+        return (
+            "# TYPE kingdom_loop_lag_seconds summary\n"
+            f'kingdom_loop_lag_seconds{{quantile="0.5"}} {st["p50"]:.6f}\n'
+            f'kingdom_loop_lag_seconds{{quantile="0.99"}} {st["p99"]:.6f}\n'
+            "# TYPE kingdom_loop_lag_max_seconds gauge\n"
+            f"kingdom_loop_lag_max_seconds {st['max']:.6f}\n"
+            "# TYPE kingdom_loop_stalls_total counter\n"
+            f"kingdom_loop_stalls_total {st['stalls']}\n"
+        )
+
+
+WATCHDOG = LoopWatchdog(threshold=float(os.getenv("LOOP_SLOW_MS", "100")) / 1000)